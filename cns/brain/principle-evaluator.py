@@ -4,17 +4,59 @@ Prime Principle Evaluation Framework
 Analyzes learning patterns and evaluates principle validity
 """
 
+import io
 import os
+import sys
 import json
-import glob
 from datetime import datetime, timedelta
+from functools import lru_cache, partial
 from pathlib import Path
+from collections import Counter
+from operator import itemgetter
+import heapq
+import math
 import re
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cnslib.budget import Budget, Checkpoint, checkpoint_key, get_checkpoint_path
+from cnslib.episodic import list_memory_files
+from cnslib.features import FeatureTable, get_feature_store_path
+from cnslib.insights import (MATCHER_EDGE_CASES, LearningSidecars, check_keyword_matchers, classify_insight_type,
+                             extract_learning_features, extract_patterns_from_content, find_principle_references,
+                             get_sidecar_dir, scan_insight_type, scan_principle_references)
+from cnslib.parallel import DEFAULT_CHUNK_SIZE, default_worker_count, parse_in_parallel
+from cnslib.results import ResultChannel
+from cnslib.vocabulary import DEFAULT_VOCABULARY, load_vocabulary
+
+# Theme extraction: words of 4+ characters, minus common filler words
+THEME_WORD_PATTERN = re.compile(r'\b\w{4,}\b')
+THEME_STOPWORDS = frozenset(['that', 'this', 'with', 'from', 'they', 'were', 'been', 'have'])
 
 def get_cns_path():
     """Get the ~/.personal-cns directory path"""
     return os.path.expanduser("~/.personal-cns")
 
+# Keyword vocabularies: the built-in ones until main() loads the installation's
+# (defaults + memory/vocabularies.json); worker processes are passed them
+VOCABULARY = DEFAULT_VOCABULARY
+
+def use_installed_vocabulary():
+    """Analyze with the installation's vocabularies from here on"""
+    global VOCABULARY
+    VOCABULARY = load_vocabulary(get_cns_path())
+
+def insight_feature_columns():
+    """Feature-store columns: insight counts per type, then 0/1 per principle keyword"""
+    return ([f"type:{t}" for t in VOCABULARY.insight_types] +
+            [f"ref:{k}" for k in VOCABULARY.principle_keywords])
+
+def open_insight_table():
+    """Open the per-learning insight counts table in the CNS feature store"""
+    return FeatureTable(get_feature_store_path(get_cns_path()), 'insights', insight_feature_columns(),
+                        VOCABULARY.digest)
+
 def load_prime_principles():
     """Load current prime principles from CNS brain"""
     principles_path = os.path.join(get_cns_path(), "cns", "brain", "prime-principles.md")
@@ -22,45 +64,52 @@ def load_prime_principles():
     if not os.path.exists(principles_path):
         return []
     
-    with open(principles_path, 'r') as f:
-        content = f.read()
-    
     principles = []
-    lines = content.split('\n')
     current_principle = None
     
-    for line in lines:
-        if line.startswith('### ') and '. ' in line:
-            if current_principle:
-                principles.append(current_principle)
-            
-            # Extract principle number and title
-            title = line.replace('### ', '').strip()
-            current_principle = {
-                'title': title,
-                'content': [],
-                'validation_status': 'Unknown',
-                'last_validated': None,
-                'confidence': 'Unknown'
-            }
-        elif current_principle and line.strip():
-            if line.startswith('**Validation Status**:'):
-                current_principle['validation_status'] = line.split(':', 1)[1].strip()
-            elif line.startswith('**Last Validated**:'):
-                current_principle['last_validated'] = line.split(':', 1)[1].strip()
-            elif line.startswith('**Confidence**:'):
-                current_principle['confidence'] = line.split(':', 1)[1].strip()
-            elif not line.startswith('**') and not line.strip() == '---':
-                current_principle['content'].append(line.strip())
+    # Stream lines rather than holding the file and a split copy in memory
+    with open(principles_path, 'r') as f:
+        for raw_line in f:
+            line = raw_line.rstrip('\n')
+            if line.startswith('### ') and '. ' in line:
+                if current_principle:
+                    principles.append(current_principle)
+                
+                # Extract principle number and title
+                title = line.replace('### ', '').strip()
+                current_principle = {
+                    'title': title,
+                    'content': [],
+                    'validation_status': 'Unknown',
+                    'last_validated': None,
+                    'confidence': 'Unknown'
+                }
+            elif current_principle and line.strip():
+                if line.startswith('**Validation Status**:'):
+                    current_principle['validation_status'] = line.split(':', 1)[1].strip()
+                elif line.startswith('**Last Validated**:'):
+                    current_principle['last_validated'] = line.split(':', 1)[1].strip()
+                elif line.startswith('**Confidence**:'):
+                    current_principle['confidence'] = line.split(':', 1)[1].strip()
+                elif not line.startswith('**') and not line.strip() == '---':
+                    current_principle['content'].append(line.strip())
     
     if current_principle:
         principles.append(current_principle)
     
     return principles
 
-def load_all_learnings(days_back=90):
-    """Load all learning entries from the specified time period"""
-    episodic_path = os.path.join(get_cns_path(), "cns", "memory", "episodic")
+def load_all_learnings(days_back=90, workers=None, episodic_path=None, record_features=True, budget=None,
+                       use_sidecars=True):
+    """Load all learning entries from the specified time period
+    
+    Files are parsed across `workers` processes (default: CNS_WORKERS or one per CPU).
+    With a budget they are parsed in batches and loading stops once it expires.
+    Features stored in sidecars at capture are reused; learnings without a
+    current sidecar are extracted here and their sidecars backfilled.
+    """
+    if episodic_path is None:
+        episodic_path = os.path.join(get_cns_path(), "cns", "memory", "episodic")
     
     if not os.path.exists(episodic_path):
         return []
@@ -68,39 +117,113 @@ def load_all_learnings(days_back=90):
     # Get cutoff date
     cutoff_date = datetime.now() - timedelta(days=days_back)
     
-    learnings = []
-    learning_files = glob.glob(os.path.join(episodic_path, "*.md"))
+    # Filename timestamps drive the cutoff; only irregular names are stat'ed
+    learning_files = list_memory_files(episodic_path, since=cutoff_date)
+    sidecars = LearningSidecars(get_sidecar_dir(get_cns_path()), VOCABULARY) if use_sidecars else None
+    stored = sidecars.load(since=cutoff_date) if sidecars else {}
+    items = [(memory_file, stored.get(memory_file.name)) for memory_file in learning_files]
+    # Passed along explicitly: spawned worker processes start with the built-in vocabularies
+    parse_item = partial(parse_learning_item, vocabulary=VOCABULARY)
+    if budget is None:
+        learnings = parse_in_parallel(parse_item, items, workers)
+    else:
+        learnings = []
+        batch_size = (workers or default_worker_count()) * DEFAULT_CHUNK_SIZE
+        for start in range(0, len(items), batch_size):
+            if budget.expired():
+                break
+            learnings.extend(parse_in_parallel(parse_item, items[start:start + batch_size], workers))
+    
+    if sidecars:
+        extracted = [(learning['filename'], learning['date'], learning['features'])
+                     for learning in learnings if learning['filename'] not in stored]
+        try:
+            sidecars.backfill(extracted)
+        except OSError as e:
+            print(f"Warning: Could not store learning features: {e}", file=sys.stderr)
     
-    for file_path in learning_files:
+    if record_features:
+        table = open_insight_table()
+        for learning in learnings:
+            if learning['filename'] not in table:
+                table.append(learning['filename'], learning['date'], learning_feature_row(learning))
         try:
-            # Check file modification time
-            file_time = datetime.fromtimestamp(os.path.getmtime(file_path))
-            if file_time < cutoff_date:
-                continue
-            
-            with open(file_path, 'r') as f:
-                content = f.read()
-            
-            filename = os.path.basename(file_path)
-            
-            # Extract learning metadata
-            learning = {
-                'filename': filename,
-                'path': file_path,
-                'content': content,
-                'date': file_time,
-                'activity': extract_activity_from_filename(filename),
-                'patterns': extract_patterns_from_content(content),
-                'principle_references': find_principle_references(content)
-            }
-            
-            learnings.append(learning)
-            
-        except Exception as e:
-            print(f"Error processing {file_path}: {e}")
-            continue
+            table.flush()
+        except OSError as e:
+            print(f"Warning: Could not update feature store: {e}", file=sys.stderr)
     
-    return sorted(learnings, key=lambda x: x['date'], reverse=True)
+    return learnings
+
+def parse_learning_file(memory_file, features=None, vocabulary=None):
+    """Parse one episodic learning file into a learning record (None on error)
+    
+    With `features` (its sidecar record) the content is only read, not re-analyzed.
+    """
+    file_path = memory_file.path
+    try:
+        with open(file_path, 'r') as f:
+            content = f.read()
+        
+        filename = memory_file.name
+        from_sidecar = features is not None
+        features = features or extract_learning_features(content, vocabulary or VOCABULARY)
+        
+        # Extract learning metadata
+        return {
+            'filename': filename,
+            'path': file_path,
+            'content': content,
+            'date': memory_file.timestamp,
+            'activity': extract_activity_from_filename(filename),
+            'patterns': features['patterns'],
+            'principle_references': features['principle_references'],
+            'features': features,
+            'from_sidecar': from_sidecar
+        }
+        
+    except Exception as e:
+        print(f"Error processing {file_path}: {e}", file=sys.stderr)
+        return None
+
+def parse_learning_item(item, vocabulary=None):
+    """parse_learning_file for a (memory_file, sidecar features or None) pair"""
+    return parse_learning_file(*item, vocabulary=vocabulary)
+
+def learning_feature_row(learning):
+    """Feature-store row for a parsed learning, aligned with insight_feature_columns()"""
+    type_counts = dict.fromkeys(VOCABULARY.insight_types, 0)
+    for pattern in learning['patterns']:
+        type_counts[pattern['type']] += 1
+    
+    references = set(learning['principle_references'])
+    return ([type_counts[t] for t in VOCABULARY.insight_types] +
+            [1 if k in references else 0 for k in VOCABULARY.principle_keywords])
+
+def summarize_learning_history():
+    """Aggregate insight types and principle references across the whole feature store"""
+    table = open_insight_table()
+    totals = table.sums()
+    
+    return {
+        'learnings': len(table),
+        'insight_types': {t: totals[f"type:{t}"] for t in VOCABULARY.insight_types},
+        'principle_references': {k: totals[f"ref:{k}"] for k in VOCABULARY.principle_keywords}
+    }
+
+def count_insight_types(learnings):
+    """Insights per type across `learnings`, totalled from the feature store
+
+    Learnings the store has no row for (loaded with record_features=False, or
+    a failed flush) are counted from their parsed patterns.
+    """
+    table = open_insight_table()
+    totals = table.sums(rows=table.row_numbers(learning['filename'] for learning in learnings))
+    counts = {t: totals[f"type:{t}"] for t in VOCABULARY.insight_types}
+    for learning in learnings:
+        if learning['filename'] not in table:
+            for pattern in learning['patterns']:
+                counts[pattern['type']] += 1
+    return counts
 
 def extract_activity_from_filename(filename):
     """Extract activity name from learning filename"""
@@ -112,115 +235,74 @@ def extract_activity_from_filename(filename):
     
     return filename.replace('.md', '').replace('-', ' ').title()
 
-def extract_patterns_from_content(content):
-    """Extract key patterns and insights from learning content"""
-    patterns = []
+def analyze_principle_validity(principles, learnings):
+    """Analyze each principle's validity based on recent learnings"""
+    return [evaluate_principle(principle, learnings) for principle in principles]
+
+def principle_mentions(principle, learnings):
+    """{filename: [support level, evidence]} for the learnings that mention a principle
     
-    # Look for key sections
-    lines = content.split('\n')
-    current_section = None
+    Each learning is assessed on its own, so mentions found in earlier runs can
+    be combined with those of learnings captured since.
+    """
+    mentions = {}
+    for learning in learnings:
+        if principle_mentioned_in_learning(principle, learning):
+            support_level = assess_learning_support(principle, learning)
+            evidence = extract_relevant_evidence(principle, learning) if support_level else []
+            mentions[learning['filename']] = [support_level, evidence]
+    return mentions
+
+def evaluate_principle(principle, learnings, mentions=None):
+    """Evaluate one principle against recent learnings
+    
+    `mentions` (from principle_mentions) are looked up instead of re-assessing
+    each learning when they are already known.
+    """
+    if mentions is None:
+        mentions = principle_mentions(principle, learnings)
+    
+    evaluation = {
+        'principle': principle,
+        'status': 'active',
+        'confidence': 'high',
+        'supporting_evidence': [],
+        'contradicting_evidence': [],
+        'proposed_changes': [],
+        'last_referenced': None
+    }
     
-    for line in lines:
-        line = line.strip()
-        
-        if line.startswith('# ') or line.startswith('## '):
-            current_section = line.replace('#', '').strip().lower()
-        elif current_section in ['what went well', 'what didn\'t work', 'what to do differently', 'key learning']:
-            if line.startswith('- ') or line.startswith('* '):
-                patterns.append({
-                    'section': current_section,
-                    'insight': line[2:].strip(),
-                    'type': classify_insight_type(line[2:].strip())
+    # Analyze learnings for this principle
+    for learning in learnings:
+        mention = mentions.get(learning['filename'])
+        if mention is not None:
+            evaluation['last_referenced'] = learning['date']
+            
+            # Check if learning supports or contradicts principle
+            support_level, evidence = mention
+            
+            if support_level > 0:
+                evaluation['supporting_evidence'].append({
+                    'learning': learning['filename'],
+                    'evidence': evidence,
+                    'strength': support_level
+                })
+            elif support_level < 0:
+                evaluation['contradicting_evidence'].append({
+                    'learning': learning['filename'],
+                    'evidence': evidence,
+                    'strength': abs(support_level)
                 })
     
-    return patterns
-
-def classify_insight_type(insight):
-    """Classify the type of insight for pattern detection"""
-    insight_lower = insight.lower()
-    
-    if any(word in insight_lower for word in ['interface', 'display', 'output', 'ui']):
-        return 'interface'
-    elif any(word in insight_lower for word in ['architecture', 'design', 'structure']):
-        return 'architecture' 
-    elif any(word in insight_lower for word in ['process', 'workflow', 'methodology']):
-        return 'process'
-    elif any(word in insight_lower for word in ['startup', 'initialization', 'loading']):
-        return 'startup'
-    elif any(word in insight_lower for word in ['context', 'memory', 'continuity']):
-        return 'context'
-    else:
-        return 'general'
-
-def find_principle_references(content):
-    """Find references to principles in learning content"""
-    references = []
-    
-    # Look for principle-related keywords
-    principle_keywords = [
-        'source control', 'ci', 'pr', 'merge',
-        'change hygiene', 'commit', 'changelog', 
-        'jira', 'confluence', 'integration',
-        'methodology', 'documentation',
-        'secrets', 'safety', 'security',
-        'context continuity', 'session',
-        'self-evaluation', 'learning'
-    ]
-    
-    content_lower = content.lower()
-    for keyword in principle_keywords:
-        if keyword in content_lower:
-            references.append(keyword)
-    
-    return references
-
-def analyze_principle_validity(principles, learnings):
-    """Analyze each principle's validity based on recent learnings"""
-    evaluations = []
-    
-    for principle in principles:
-        evaluation = {
-            'principle': principle,
-            'status': 'active',
-            'confidence': 'high',
-            'supporting_evidence': [],
-            'contradicting_evidence': [],
-            'proposed_changes': [],
-            'last_referenced': None
-        }
-        
-        # Analyze learnings for this principle
-        for learning in learnings:
-            if principle_mentioned_in_learning(principle, learning):
-                evaluation['last_referenced'] = learning['date']
-                
-                # Check if learning supports or contradicts principle
-                support_level = assess_learning_support(principle, learning)
-                
-                if support_level > 0:
-                    evaluation['supporting_evidence'].append({
-                        'learning': learning['filename'],
-                        'evidence': extract_relevant_evidence(principle, learning),
-                        'strength': support_level
-                    })
-                elif support_level < 0:
-                    evaluation['contradicting_evidence'].append({
-                        'learning': learning['filename'],
-                        'evidence': extract_relevant_evidence(principle, learning),
-                        'strength': abs(support_level)
-                    })
-        
-        # Determine overall status
-        if evaluation['contradicting_evidence']:
-            evaluation['status'] = 'under_review'
-            evaluation['confidence'] = 'medium'
-        elif not evaluation['supporting_evidence'] and not evaluation['last_referenced']:
-            evaluation['status'] = 'unused'
-            evaluation['confidence'] = 'low'
-        
-        evaluations.append(evaluation)
+    # Determine overall status
+    if evaluation['contradicting_evidence']:
+        evaluation['status'] = 'under_review'
+        evaluation['confidence'] = 'medium'
+    elif not evaluation['supporting_evidence'] and not evaluation['last_referenced']:
+        evaluation['status'] = 'unused'
+        evaluation['confidence'] = 'low'
     
-    return evaluations
+    return evaluation
 
 def principle_mentioned_in_learning(principle, learning):
     """Check if a principle is mentioned or relevant to a learning"""
@@ -236,8 +318,13 @@ def principle_mentioned_in_learning(principle, learning):
     
     return False
 
+@lru_cache(maxsize=256)
 def extract_keywords(text):
-    """Extract key terms from principle text"""
+    """Extract key terms from principle text
+    
+    Cached: it is called with the same principle text for every learning.
+    Returns a tuple so the cached result cannot be modified by a caller.
+    """
     # Simple keyword extraction - could be enhanced
     keywords = []
     
@@ -246,12 +333,12 @@ def extract_keywords(text):
     keywords.extend([term.lower() for term in technical_terms])
     
     # Important phrases
-    important_phrases = ['source control', 'change hygiene', 'jira', 'confluence', 'secrets', 'documentation']
-    for phrase in important_phrases:
-        if phrase in text.lower():
+    text_lower = text.lower()
+    for phrase in VOCABULARY.important_phrases:
+        if phrase in text_lower:
             keywords.append(phrase)
     
-    return list(set(keywords))
+    return tuple(set(keywords))
 
 def assess_learning_support(principle, learning):
     """Assess how much a learning supports (+) or contradicts (-) a principle"""
@@ -262,18 +349,16 @@ def assess_learning_support(principle, learning):
     
     support_score = 0
     
-    # Look for positive indicators
-    positive_indicators = ['worked well', 'successful', 'improved', 'effective', 'better']
-    negative_indicators = ['failed', 'didn\'t work', 'problem', 'issue', 'worse']
+    principle_keywords = extract_keywords(principle_text)
     
     for pattern in learning['patterns']:
         insight = pattern['insight'].lower()
         
-        # Check if insight relates to this principle
-        if any(keyword in insight for keyword in extract_keywords(principle_text)):
-            if any(pos in insight for pos in positive_indicators):
+        # Check if insight relates to this principle, then look for positive or negative indicators
+        if any(keyword in insight for keyword in principle_keywords):
+            if any(pos in insight for pos in VOCABULARY.positive_indicators):
                 support_score += 1
-            elif any(neg in insight for neg in negative_indicators):
+            elif any(neg in insight for neg in VOCABULARY.negative_indicators):
                 support_score -= 1
     
     return support_score
@@ -295,69 +380,177 @@ def extract_relevant_evidence(principle, learning):
     
     return evidence
 
-def detect_new_principle_candidates(learnings):
-    """Analyze learning patterns to identify potential new principles"""
+def detect_new_principle_candidates(learnings, use_tfidf=False, type_counts=None):
+    """Analyze learning patterns to identify potential new principles
     
-    # Group patterns by type and frequency
-    pattern_frequency = {}
-    pattern_examples = {}
+    type_counts (insights per type, from count_insight_types) decides which
+    types are frequent enough to be candidates; only their insights are then
+    gathered. Without it the parsed patterns are counted.
+    
+    With use_tfidf, candidate themes are ranked by TF-IDF against all analyzed
+    insights instead of raw frequency, favouring terms distinctive to a type.
+    """
+    
+    if type_counts is None:
+        type_counts = Counter(pattern['type'] for learning in learnings for pattern in learning['patterns'])
+    
+    # Increased threshold for principle quality
+    frequent_types = {pattern_type for pattern_type, frequency in type_counts.items() if frequency >= 5}
     
+    # Group insights by type (every type when the TF-IDF corpus needs them all)
+    pattern_examples = {}
     for learning in learnings:
         for pattern in learning['patterns']:
             pattern_type = pattern['type']
-            insight = pattern['insight']
-            
-            if pattern_type not in pattern_frequency:
-                pattern_frequency[pattern_type] = 0
-                pattern_examples[pattern_type] = []
-            
-            pattern_frequency[pattern_type] += 1
-            pattern_examples[pattern_type].append({
-                'insight': insight,
-                'learning': learning['filename'],
-                'date': learning['date']
-            })
+            if use_tfidf or pattern_type in frequent_types:
+                pattern_examples.setdefault(pattern_type, []).append({
+                    'insight': pattern['insight'],
+                    'learning': learning['filename'],
+                    'date': learning['date']
+                })
+    
+    # Term statistics are computed once per candidate pattern type; the corpus
+    # (document frequencies for TF-IDF) covers every insight of every type
+    term_statistics, corpus = build_term_statistics(pattern_examples, track_documents=use_tfidf,
+                                                    pattern_types=frequent_types)
     
     # Identify patterns that appear frequently
     candidates = []
     
-    for pattern_type, frequency in pattern_frequency.items():
-        if frequency >= 5:  # Increased threshold for principle quality
-            examples = pattern_examples[pattern_type]
+    for pattern_type, examples in pattern_examples.items():
+        if pattern_type in frequent_types:
+            frequency = type_counts[pattern_type]
             
             # Analyze the examples for commonalities
-            common_themes = extract_common_themes(examples)
+            common_themes = extract_common_themes(examples, corpus, term_statistics[pattern_type])
             
-            if common_themes and passes_principle_quality_gates(pattern_type, frequency, examples):
+            # Keyword incidence is built once and shared by every gate and score
+            incidence = InsightIncidence(examples)
+            
+            if common_themes and passes_principle_quality_gates(pattern_type, frequency, examples, incidence):
                 candidates.append({
                     'type': pattern_type,
                     'frequency': frequency,
                     'themes': common_themes,
                     'examples': examples[:3],  # Top 3 examples
                     'proposed_principle': generate_principle_proposal(pattern_type, common_themes),
-                    'quality_score': calculate_principle_quality_score(pattern_type, frequency, examples)
+                    'quality_score': calculate_principle_quality_score(pattern_type, frequency, examples,
+                                                                       incidence, common_themes)
                 })
     
     # Sort by quality score and limit candidates
     candidates.sort(key=lambda x: x['quality_score'], reverse=True)
     return candidates[:3]  # Maximum 3 new principles per evaluation
 
-def extract_common_themes(examples):
-    """Extract common themes from a set of learning examples"""
-    # Simplified theme extraction
-    all_text = ' '.join([ex['insight'] for ex in examples]).lower()
+class InsightIncidence:
+    """Insight x keyword incidence for one pattern type's examples
+    
+    Insights are lowercased once and joined with a separator they cannot contain.
+    A keyword's column total (how many insights contain it) is then one regex
+    scan in which each match consumes the rest of its insight, so repeated
+    occurrences within an insight count once. Gates and scores read these totals
+    instead of rescanning every insight for every keyword.
+    """
+    
+    SEPARATOR = '\x00'
+    
+    def __init__(self, examples, vocabularies=None):
+        texts = [ex['insight'].lower().replace(self.SEPARATOR, ' ') for ex in examples]
+        self.size = len(texts)
+        self.unique_learnings = len(set(ex['learning'] for ex in examples))
+        self.dates = [ex['date'] for ex in examples if 'date' in ex]
+        self._joined = self.SEPARATOR.join(texts)
+        self.column_totals = {}
+        if vocabularies is None:
+            vocabularies = (VOCABULARY.specific_tools, VOCABULARY.behavioral_indicators,
+                            VOCABULARY.fundamental_keywords)
+        for vocabulary in vocabularies:
+            self._add_keywords(vocabulary)
+    
+    def _add_keywords(self, keywords):
+        for keyword in keywords:
+            if keyword not in self.column_totals:
+                pattern = re.escape(keyword) + '[^' + self.SEPARATOR + ']*'
+                self.column_totals[keyword] = len(re.findall(pattern, self._joined))
+    
+    def hits(self, keywords):
+        """Number of (insight, keyword) pairs where the insight contains the keyword"""
+        self._add_keywords(keywords)
+        return sum(self.column_totals[keyword] for keyword in keywords)
+
+class TermStatistics:
+    """Theme term counts for a group of insights
+    
+    With track_documents, also keeps per-insight document frequencies so the
+    group can serve as the corpus for TF-IDF ranking.
+    """
+    
+    def __init__(self, texts=(), track_documents=False):
+        self.counts = Counter()
+        self.document_frequency = Counter() if track_documents else None
+        self.documents = 0
+        if track_documents:
+            for text in texts:
+                self.add(text)
+        else:
+            # One scan over the joined text; insights are separated by spaces
+            self.counts.update(self._terms(' '.join(texts)))
+            self.documents = len(texts)
+    
+    @staticmethod
+    def _terms(text):
+        return [word for word in THEME_WORD_PATTERN.findall(text.lower()) if word not in THEME_STOPWORDS]
+    
+    def add(self, text):
+        """Add one insight's terms"""
+        terms = self._terms(text)
+        self.counts.update(terms)
+        if self.document_frequency is not None:
+            self.document_frequency.update(set(terms))
+        self.documents += 1
+    
+    def idf(self, term):
+        """Smoothed inverse document frequency of a term in this corpus"""
+        return math.log((1 + self.documents) / (1 + self.document_frequency[term])) + 1
+    
+    def top_terms(self, k=5, min_count=2, corpus=None):
+        """The k highest-ranked terms occurring at least min_count times
+        
+        Ranked by raw frequency, or by TF-IDF against `corpus` (a TermStatistics
+        built with track_documents=True). Ties keep first-seen order.
+        """
+        eligible = [(term, count) for term, count in self.counts.items() if count >= min_count]
+        if corpus is None:
+            ranked = heapq.nlargest(k, eligible, key=itemgetter(1))
+        else:
+            ranked = heapq.nlargest(k, eligible, key=lambda item: item[1] * corpus.idf(item[0]))
+        return [term for term, count in ranked]
+
+def build_term_statistics(pattern_examples, track_documents=False, pattern_types=None):
+    """Term statistics per pattern type, plus the whole-corpus statistics when requested
     
-    # Look for repeated concepts
-    common_words = {}
-    words = re.findall(r'\b\w{4,}\b', all_text)  # Words 4+ chars
+    pattern_types limits the per-type statistics; the corpus always covers every example.
+    """
+    by_type = {pattern_type: TermStatistics([ex['insight'] for ex in examples])
+               for pattern_type, examples in pattern_examples.items()
+               if pattern_types is None or pattern_type in pattern_types}
     
-    for word in words:
-        if word not in ['that', 'this', 'with', 'from', 'they', 'were', 'been', 'have']:
-            common_words[word] = common_words.get(word, 0) + 1
+    corpus = None
+    if track_documents:
+        corpus = TermStatistics([ex['insight'] for examples in pattern_examples.values() for ex in examples],
+                                track_documents=True)
     
-    # Return most frequent meaningful words
-    themes = [word for word, count in common_words.items() if count >= 2]
-    return themes[:5]  # Top 5 themes
+    return by_type, corpus
+
+def extract_common_themes(examples, corpus=None, statistics=None):
+    """Extract common themes from a set of learning examples
+    
+    Returns up to five of the most frequent meaningful words (TF-IDF ranked when
+    a corpus is given). Pass precomputed `statistics` to avoid rescanning.
+    """
+    if statistics is None:
+        statistics = TermStatistics([ex['insight'] for ex in examples])
+    return statistics.top_terms(5, corpus=corpus)
 
 def generate_principle_proposal(pattern_type, themes):
     """Generate a proposed principle based on pattern analysis"""
@@ -375,231 +568,581 @@ def generate_principle_proposal(pattern_type, themes):
     
     return proposals.get(pattern_type, f"New principle needed for {pattern_type}: {theme_text}")
 
-def passes_principle_quality_gates(pattern_type, frequency, examples):
+def passes_principle_quality_gates(pattern_type, frequency, examples, incidence=None):
     """Apply strict quality gates for principle candidacy"""
     
     # Quality Gate 1: Minimum frequency threshold
     if frequency < 5:
         return False
     
+    if incidence is None:
+        incidence = InsightIncidence(examples)
+    
     # Quality Gate 2: Must span multiple learning sessions (not just one activity)
-    unique_learnings = set(ex['learning'] for ex in examples)
-    if len(unique_learnings) < 3:
+    if incidence.unique_learnings < 3:
         return False
     
     # Quality Gate 3: Must span reasonable time period
-    dates = [ex['date'] for ex in examples if 'date' in ex]
+    dates = incidence.dates
     if len(dates) >= 2:
-        from datetime import timedelta
         date_span = max(dates) - min(dates)
         if date_span < timedelta(days=7):  # Must span at least a week
             return False
     
     # Quality Gate 4: Must be fundamental enough (not too specific)
-    insight_texts = [ex['insight'].lower() for ex in examples]
-    
     # Reject if too specific to one technology/tool
-    specific_tools = ['jira', 'confluence', 'bitbucket', 'vscode', 'python', 'javascript']
-    tool_mentions = sum(1 for insight in insight_texts for tool in specific_tools if tool in insight)
-    if tool_mentions / len(insight_texts) > 0.7:  # More than 70% tool-specific
+    tool_mentions = incidence.hits(VOCABULARY.specific_tools)
+    if tool_mentions / incidence.size > 0.7:  # More than 70% tool-specific
         return False
     
     # Quality Gate 5: Must represent behavioral/process patterns, not just technical details
-    behavioral_indicators = ['workflow', 'process', 'approach', 'method', 'pattern', 'practice', 'habit']
-    behavioral_score = sum(1 for insight in insight_texts for indicator in behavioral_indicators if indicator in insight)
-    if behavioral_score / len(insight_texts) < 0.3:  # Less than 30% behavioral
+    behavioral_score = incidence.hits(VOCABULARY.behavioral_indicators)
+    if behavioral_score / incidence.size < 0.3:  # Less than 30% behavioral
         return False
     
     return True
 
-def calculate_principle_quality_score(pattern_type, frequency, examples):
+def calculate_principle_quality_score(pattern_type, frequency, examples, incidence=None, themes=None):
     """Calculate quality score for principle candidates"""
     score = 0
     
+    if incidence is None:
+        incidence = InsightIncidence(examples)
+    
     # Frequency component (max 25 points)
     score += min(frequency * 3, 25)
     
     # Diversity component (max 25 points) 
-    unique_learnings = len(set(ex['learning'] for ex in examples))
-    score += min(unique_learnings * 5, 25)
+    score += min(incidence.unique_learnings * 5, 25)
     
     # Fundamentalness component (max 25 points)
-    insight_texts = [ex['insight'].lower() for ex in examples]
-    fundamental_keywords = ['always', 'never', 'consistent', 'systematic', 'principle', 'standard', 'approach']
-    fundamental_score = sum(1 for insight in insight_texts for keyword in fundamental_keywords if keyword in insight)
+    fundamental_score = incidence.hits(VOCABULARY.fundamental_keywords)
     score += min(fundamental_score * 8, 25)
     
     # Pattern strength component (max 25 points)
-    theme_consistency = len(extract_common_themes(examples))
+    if themes is None:
+        themes = extract_common_themes(examples)
+    theme_consistency = len(themes)
     score += min(theme_consistency * 3, 25)
     
     return score
 
-def enforce_principle_limits(current_principles, new_candidates):
-    """Enforce soft maximum of 15 principles with quality prioritization"""
+def enforce_principle_limits(current_principles, new_candidates, progress=print):
+    """Enforce soft maximum of 15 principles with quality prioritization
+    
+    Warnings go through `progress` (main's progress stream, stderr in JSON mode).
+    """
     MAX_PRINCIPLES = 15
     WARN_THRESHOLD = 12
     
     current_count = len(current_principles)
     
     if current_count >= MAX_PRINCIPLES:
-        print(f"⚠️  Maximum principle limit reached ({MAX_PRINCIPLES})")
-        print("   Consider consolidating or deprecating existing principles before adding new ones")
+        progress(f"⚠️  Maximum principle limit reached ({MAX_PRINCIPLES})")
+        progress("   Consider consolidating or deprecating existing principles before adding new ones")
         return []
     
     available_slots = MAX_PRINCIPLES - current_count
     
     if current_count >= WARN_THRESHOLD:
-        print(f"⚠️  Approaching principle limit ({current_count}/{MAX_PRINCIPLES})")
-        print("   New principles must meet higher quality standards")
+        progress(f"⚠️  Approaching principle limit ({current_count}/{MAX_PRINCIPLES})")
+        progress("   New principles must meet higher quality standards")
         # Apply stricter quality filtering
         high_quality_candidates = [c for c in new_candidates if c.get('quality_score', 0) >= 80]
         return high_quality_candidates[:available_slots]
     
     return new_candidates[:available_slots]
 
-def generate_evaluation_report(principles, learnings, evaluations, candidates):
-    """Generate a comprehensive evaluation report"""
-    
-    report = []
-    report.append("# Prime Principle Evaluation Report")
-    report.append(f"**Generated**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    report.append(f"**Analysis Period**: Last 90 days")
-    report.append(f"**Learnings Analyzed**: {len(learnings)}")
-    report.append("")
-    
-    # Summary
-    active_count = len([e for e in evaluations if e['status'] == 'active'])
-    review_count = len([e for e in evaluations if e['status'] == 'under_review'])
-    unused_count = len([e for e in evaluations if e['status'] == 'unused'])
-    
-    report.append("## Executive Summary")
-    report.append(f"- **Active Principles**: {active_count}")
-    report.append(f"- **Under Review**: {review_count}")
-    report.append(f"- **Unused/Stale**: {unused_count}")
-    report.append(f"- **New Candidates**: {len(candidates)}")
-    report.append("")
-    
-    # Individual principle evaluations
-    report.append("## Principle Evaluations")
-    report.append("")
-    
+def count_evaluation_statuses(evaluations):
+    """Number of evaluations per status"""
+    return {status: len([e for e in evaluations if e['status'] == status])
+            for status in ('active', 'under_review', 'unused')}
+
+# Recommendation kinds, in report order
+RECOMMENDATION_HEADINGS = {
+    'review': "Principles Requiring Review",
+    'unused': "Unused Principles",
+    'candidate': "New Principles to Consider"
+}
+
+def report_recommendations(evaluations, candidates):
+    """Recommendations for the report: {kind, subject, action}, grouped by kind"""
+    recommendations = []
     for evaluation in evaluations:
+        if evaluation['status'] == 'under_review':
+            recommendations.append({'kind': 'review', 'subject': evaluation['principle']['title'],
+                                    'action': "Review conflicting evidence and update if necessary"})
+    for evaluation in evaluations:
+        if evaluation['status'] == 'unused':
+            recommendations.append({'kind': 'unused', 'subject': evaluation['principle']['title'],
+                                    'action': "Consider deprecation or find opportunities to apply"})
+    for candidate in candidates:
+        recommendations.append({'kind': 'candidate', 'subject': candidate['type'].title(),
+                                'action': candidate['proposed_principle']})
+    return recommendations
+
+def evidence_insight(evidence, fallback):
+    """First insight quoted by an evidence entry"""
+    return evidence['evidence'][0]['insight'] if evidence['evidence'] else fallback
+
+class MarkdownReportWriter:
+    """Writes the evaluation report as Markdown, one section at a time
+    
+    The Executive Summary stays at the top, under the header, but counts every
+    evaluation and candidate. So the header is written straight away and the
+    sections after it are spooled (to a temporary file past SPOOL_BYTES) as
+    they are evaluated; write_summary writes the summary and then the spooled
+    sections, and the recommendations follow.
+    """
+    
+    SPOOL_BYTES = 1024 * 1024
+    
+    def __init__(self, stream):
+        self.stream = stream
+        self.spool = tempfile.SpooledTemporaryFile(max_size=self.SPOOL_BYTES, mode='w+')
+        self._evaluations_started = False
+    
+    def _write(self, *lines):
+        self.stream.write(''.join(line + '\n' for line in lines))
+        self.stream.flush()
+    
+    def _spool(self, *lines):
+        self.spool.write(''.join(line + '\n' for line in lines))
+    
+    def write_header(self, learning_count, days_back=90):
+        self._write("# Prime Principle Evaluation Report",
+                    f"**Generated**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+                    f"**Analysis Period**: Last {days_back} days",
+                    f"**Learnings Analyzed**: {learning_count}",
+                    "")
+    
+    def write_summary(self, evaluations, candidates):
+        counts = count_evaluation_statuses(evaluations)
+        self._write("## Executive Summary",
+                    f"- **Active Principles**: {counts['active']}",
+                    f"- **Under Review**: {counts['under_review']}",
+                    f"- **Unused/Stale**: {counts['unused']}",
+                    f"- **New Candidates**: {len(candidates)}",
+                    "")
+        self.spool.seek(0)
+        shutil.copyfileobj(self.spool, self.stream)
+        self.spool.close()
+        self.stream.flush()
+    
+    def write_evaluation(self, evaluation):
+        if not self._evaluations_started:
+            self._spool("## Principle Evaluations", "")
+            self._evaluations_started = True
+        
         principle = evaluation['principle']
-        report.append(f"### {principle['title']}")
-        report.append(f"**Status**: {evaluation['status'].replace('_', ' ').title()}")
-        report.append(f"**Confidence**: {evaluation['confidence'].title()}")
+        lines = [f"### {principle['title']}",
+                 f"**Status**: {evaluation['status'].replace('_', ' ').title()}",
+                 f"**Confidence**: {evaluation['confidence'].title()}"]
         
         if evaluation['last_referenced']:
-            report.append(f"**Last Referenced**: {evaluation['last_referenced'].strftime('%Y-%m-%d')}")
+            lines.append(f"**Last Referenced**: {evaluation['last_referenced'].strftime('%Y-%m-%d')}")
         else:
-            report.append("**Last Referenced**: Not found in recent learnings")
+            lines.append("**Last Referenced**: Not found in recent learnings")
         
         if evaluation['supporting_evidence']:
-            report.append(f"**Supporting Evidence**: {len(evaluation['supporting_evidence'])} instances")
+            lines.append(f"**Supporting Evidence**: {len(evaluation['supporting_evidence'])} instances")
             for evidence in evaluation['supporting_evidence'][:2]:  # Top 2
-                report.append(f"  - {evidence['learning']}: {evidence['evidence'][0]['insight'] if evidence['evidence'] else 'General support'}")
+                lines.append(f"  - {evidence['learning']}: {evidence_insight(evidence, 'General support')}")
         
         if evaluation['contradicting_evidence']:
-            report.append(f"**Contradicting Evidence**: {len(evaluation['contradicting_evidence'])} instances")
+            lines.append(f"**Contradicting Evidence**: {len(evaluation['contradicting_evidence'])} instances")
             for evidence in evaluation['contradicting_evidence']:
-                report.append(f"  - {evidence['learning']}: {evidence['evidence'][0]['insight'] if evidence['evidence'] else 'General contradiction'}")
+                lines.append(f"  - {evidence['learning']}: {evidence_insight(evidence, 'General contradiction')}")
         
-        report.append("")
+        lines.append("")
+        self._spool(*lines)
     
-    # New principle candidates
-    if candidates:
-        report.append("## New Principle Candidates")
-        report.append("")
-        
+    def write_candidates(self, candidates):
+        if not candidates:
+            return
+        lines = ["## New Principle Candidates", ""]
         for candidate in candidates:
-            report.append(f"### Proposed: {candidate['type'].title()} Principle")
-            report.append(f"**Frequency**: {candidate['frequency']} occurrences")
-            report.append(f"**Themes**: {', '.join(candidate['themes'])}")
-            report.append(f"**Proposed Text**: {candidate['proposed_principle']}")
-            report.append("**Supporting Examples**:")
+            lines.extend([f"### Proposed: {candidate['type'].title()} Principle",
+                          f"**Frequency**: {candidate['frequency']} occurrences",
+                          f"**Themes**: {', '.join(candidate['themes'])}",
+                          f"**Proposed Text**: {candidate['proposed_principle']}",
+                          "**Supporting Examples**:"])
             for example in candidate['examples']:
-                report.append(f"  - {example['learning']}: {example['insight']}")
-            report.append("")
-    
-    # Recommendations
-    report.append("## Recommendations")
-    report.append("")
-    
-    if review_count > 0:
-        report.append("### Principles Requiring Review")
-        for evaluation in evaluations:
-            if evaluation['status'] == 'under_review':
-                report.append(f"- **{evaluation['principle']['title']}**: Review conflicting evidence and update if necessary")
-    
-    if unused_count > 0:
-        report.append("### Unused Principles")
-        for evaluation in evaluations:
-            if evaluation['status'] == 'unused':
-                report.append(f"- **{evaluation['principle']['title']}**: Consider deprecation or find opportunities to apply")
-    
-    if candidates:
-        report.append("### New Principles to Consider")
-        for candidate in candidates:
-            report.append(f"- **{candidate['type'].title()}**: {candidate['proposed_principle']}")
-    
-    return '\n'.join(report)
+                lines.append(f"  - {example['learning']}: {example['insight']}")
+            lines.append("")
+        self._spool(*lines)
+    
+    def write_history(self, history):
+        # Whole-history aggregates from the feature store
+        if not history or not history['learnings']:
+            return
+        insight_types = sorted(history['insight_types'].items(), key=lambda x: x[1], reverse=True)
+        references = sorted(history['principle_references'].items(), key=lambda x: x[1], reverse=True)
+        self._spool("## Learning History",
+                    f"**Learnings Recorded**: {history['learnings']}",
+                    f"**Insight Types**: {', '.join(f'{t} ({c})' for t, c in insight_types if c)}",
+                    f"**Top Principle References**: {', '.join(f'{k} ({c})' for k, c in references[:5] if c)}",
+                    "")
+    
+    def write_partial(self, pending, reason):
+        lines = ["## ⏳ Partial Evaluation",
+                 f"Stopped early ({reason}). Finished evaluations are checkpointed and the next run resumes from them.",
+                 "- **New Candidates**: not detected in this run"]
+        if pending:
+            lines.append(f"- **Not Evaluated**: {', '.join(pending)}")
+        lines.append("")
+        self._spool(*lines)
+    
+    def write_recommendations(self, evaluations, candidates):
+        lines = ["## Recommendations", ""]
+        heading = None
+        for recommendation in report_recommendations(evaluations, candidates):
+            if recommendation['kind'] != heading:
+                heading = recommendation['kind']
+                lines.append(f"### {RECOMMENDATION_HEADINGS[heading]}")
+            lines.append(f"- **{recommendation['subject']}**: {recommendation['action']}")
+        
+        self._write(*lines)
 
-def main():
-    """Main evaluation function"""
-    print("🔍 PRIME PRINCIPLE EVALUATION STARTING...")
-    print()
+class JsonReportWriter:
+    """Writes the evaluation report as JSON Lines: one record per section
     
-    # Load data
-    print("📚 Loading prime principles...")
-    principles = load_prime_principles()
-    print(f"   Loaded {len(principles)} principles")
+    Each record carries a 'record' field (header, evaluation, candidate, history,
+    partial, summary, recommendation) so consumers such as update-cns.py can
+    read results directly. Records stream as they are produced; the summary
+    record comes after the evaluations it counts.
+    """
     
-    print("🧠 Loading recent learnings...")
-    learnings = load_all_learnings(90)  # Last 90 days
-    print(f"   Loaded {len(learnings)} learning entries")
-    print()
+    def __init__(self, stream):
+        self.stream = stream
     
-    # Perform analysis
-    print("🔍 Analyzing principle validity...")
-    evaluations = analyze_principle_validity(principles, learnings)
+    def _emit(self, record_type, **fields):
+        self.stream.write(json.dumps({'record': record_type, **fields}, default=str) + '\n')
+        self.stream.flush()
     
-    print("🔍 Detecting new principle candidates...")
-    raw_candidates = detect_new_principle_candidates(learnings)
+    def write_header(self, learning_count, days_back=90):
+        self._emit('header', generated=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                   analysis_period_days=days_back, learnings_analyzed=learning_count)
     
-    # Apply quality gates and limits
-    print("🚪 Applying quality gates and principle limits...")
-    candidates = enforce_principle_limits(principles, raw_candidates)
+    def write_summary(self, evaluations, candidates):
+        self._emit('summary', new_candidates=len(candidates), **count_evaluation_statuses(evaluations))
     
-    # Generate report
-    print("📊 Generating evaluation report...")
-    report = generate_evaluation_report(principles, learnings, evaluations, candidates)
+    def write_evaluation(self, evaluation):
+        def evidence_records(entries, fallback):
+            return [{'learning': e['learning'], 'strength': e['strength'], 'insight': evidence_insight(e, fallback)}
+                    for e in entries]
+        
+        last_referenced = evaluation['last_referenced']
+        self._emit('evaluation',
+                   title=evaluation['principle']['title'],
+                   status=evaluation['status'],
+                   confidence=evaluation['confidence'],
+                   last_referenced=last_referenced.strftime('%Y-%m-%d') if last_referenced else None,
+                   supporting_evidence=evidence_records(evaluation['supporting_evidence'], 'General support'),
+                   contradicting_evidence=evidence_records(evaluation['contradicting_evidence'], 'General contradiction'))
+    
+    def write_candidates(self, candidates):
+        for candidate in candidates:
+            self._emit('candidate',
+                       type=candidate['type'],
+                       frequency=candidate['frequency'],
+                       themes=candidate['themes'],
+                       proposed_principle=candidate['proposed_principle'],
+                       quality_score=candidate['quality_score'],
+                       examples=[{'learning': ex['learning'], 'insight': ex['insight']} for ex in candidate['examples']])
+    
+    def write_history(self, history):
+        if history and history['learnings']:
+            self._emit('history', **history)
+    
+    def write_partial(self, pending, reason):
+        self._emit('partial', reason=reason, pending=pending, candidates_detected=False)
+    
+    def write_recommendations(self, evaluations, candidates):
+        for recommendation in report_recommendations(evaluations, candidates):
+            self._emit('recommendation', **recommendation)
+
+REPORT_WRITERS = {
+    'markdown': MarkdownReportWriter,
+    'json': JsonReportWriter
+}
+
+def generate_evaluation_report(principles, learnings, evaluations, candidates, history=None):
+    """Generate a comprehensive evaluation report"""
+    buffer = io.StringIO()
+    writer = MarkdownReportWriter(buffer)
     
-    # Print report instead of saving to file
-    print("✅ Evaluation complete! Results:")
-    print()
-    print(report)
-    print()
+    # Same calls as main(); the writer puts the summary under the header
+    writer.write_header(len(learnings))
+    for evaluation in evaluations:
+        writer.write_evaluation(evaluation)
+    writer.write_candidates(candidates)
+    writer.write_history(history)
+    writer.write_summary(evaluations, candidates)
+    writer.write_recommendations(evaluations, candidates)
     
-    # Summary output
-    print("📊 EVALUATION SUMMARY:")
-    active_count = len([e for e in evaluations if e['status'] == 'active'])
-    review_count = len([e for e in evaluations if e['status'] == 'under_review'])
-    unused_count = len([e for e in evaluations if e['status'] == 'unused'])
+    return buffer.getvalue().rstrip('\n')
+
+def get_evaluation_checkpoint():
+    """Checkpoint of principle mentions found by a run that stopped early
+    
+    Keyed on the vocabularies only: each saved principle carries its own
+    digest and the learnings it was assessed against, so new learnings and
+    the moving analysis window cost only the difference.
+    """
+    return Checkpoint(get_checkpoint_path(get_cns_path(), 'principle_evaluation'),
+                      checkpoint_key('mentions', VOCABULARY.digest))
+
+def principle_digest(principle):
+    return checkpoint_key(json.dumps(principle, sort_keys=True))
+
+def save_mentions(checkpoint, learnings, mentions):
+    """Checkpoint each evaluated principle's mentions ({title: (principle, mentions)})"""
+    checkpoint.save({'learnings': [learning['filename'] for learning in learnings],
+                     'principles': {title: {'digest': principle_digest(principle), 'mentions': found}
+                                    for title, (principle, found) in mentions.items()}})
+
+def resume_mentions(checkpoint, principles, learnings):
+    """{title: mentions} restored from a checkpoint and brought up to date with `learnings`
+    
+    Saved mentions of learnings that left the window are dropped and learnings
+    captured since are assessed; principles whose text changed are not restored.
+    """
+    saved = checkpoint.load()
+    saved_principles = saved.get('principles', {})
+    covered = set(saved.get('learnings', ()))
+    current = {learning['filename'] for learning in learnings}
+    new_learnings = [learning for learning in learnings if learning['filename'] not in covered]
+    
+    restored = {}
+    for principle in principles:
+        entry = saved_principles.get(principle['title'])
+        if not entry or entry.get('digest') != principle_digest(principle):
+            continue
+        found = {filename: mention for filename, mention in entry['mentions'].items() if filename in current}
+        found.update(principle_mentions(principle, new_learnings))
+        restored[principle['title']] = found
+    return restored
+
+def main(output_format='markdown', output_path=None, results=None, budget=None):
+    """Main evaluation function
+    
+    JSON records stream to stdout (or output_path) as each principle is
+    evaluated; the Markdown report is written out once its Executive Summary
+    is known, the summary under the header. With JSON output on stdout, progress messages go to stderr so stdout stays
+    machine-readable. Counters and files written are sent to `results` (a
+    ResultChannel) when given.
+    
+    When `budget` expires the run stops between principles: finished evaluations
+    are reported and checkpointed, candidate detection is skipped and the result
+    status is 'partial'. The next run resumes from there, assessing only the
+    learnings captured since for the principles already evaluated.
+    """
+    results = results or ResultChannel('principle_evaluation')
+    budget = budget or Budget()
+    use_installed_vocabulary()
+    progress_stream = sys.stderr if output_format == 'json' and not output_path else sys.stdout
+    
+    def progress(message=""):
+        print(message, file=progress_stream, flush=True)
+    
+    report_stream = open(output_path, 'w') if output_path else sys.stdout
+    writer = REPORT_WRITERS[output_format](report_stream)
+    
+    try:
+        progress("🔍 PRIME PRINCIPLE EVALUATION STARTING...")
+        progress()
+        
+        # Load data
+        progress("📚 Loading prime principles...")
+        principles = load_prime_principles()
+        progress(f"   Loaded {len(principles)} principles")
+        
+        progress("🧠 Loading recent learnings...")
+        learnings = load_all_learnings(90, budget=budget)  # Last 90 days
+        loaded_all = not budget.expired()
+        progress(f"   Loaded {len(learnings)} learning entries{'' if loaded_all else ' (stopped early)'}")
+        progress()
+        
+        # Principles a run that stopped early already evaluated, updated for the learnings since
+        checkpoint = get_evaluation_checkpoint()
+        saved = resume_mentions(checkpoint, principles, learnings) if loaded_all else {}
+        if saved:
+            progress(f"♻️  Resuming: {len(saved)} evaluations restored from checkpoint")
+        
+        # Perform analysis, streaming each evaluation as it completes
+        progress("🔍 Analyzing principle validity...")
+        progress()
+        writer.write_header(len(learnings))
+        evaluations = []
+        pending = []
+        mentions = {}
+        for principle in principles:
+            found = saved.get(principle['title'])
+            if found is None:
+                if not loaded_all or budget.expired():
+                    pending.append(principle['title'])
+                    continue
+                found = principle_mentions(principle, learnings)
+            mentions[principle['title']] = (principle, found)
+            evaluation = evaluate_principle(principle, learnings, found)
+            writer.write_evaluation(evaluation)
+            evaluations.append(evaluation)
+        
+        if pending or budget.expired():
+            progress(f"⏳ Stopped early ({budget.reason()}): {len(pending)} principles not evaluated")
+            candidates = []
+            if loaded_all:
+                save_mentions(checkpoint, learnings, mentions)
+            writer.write_partial(pending, budget.reason())
+        else:
+            progress("🔍 Detecting new principle candidates...")
+            raw_candidates = detect_new_principle_candidates(learnings, type_counts=count_insight_types(learnings))
+            
+            # Apply quality gates and limits
+            progress("🚪 Applying quality gates and principle limits...")
+            candidates = enforce_principle_limits(principles, raw_candidates, progress)
+            writer.write_candidates(candidates)
+            checkpoint.clear()
+        writer.write_history(summarize_learning_history())
+        
+        progress("📊 Generating evaluation report...")
+        writer.write_summary(evaluations, candidates)
+        writer.write_recommendations(evaluations, candidates)
+    finally:
+        if output_path:
+            report_stream.close()
+    
+    if output_path:
+        results.file_written(os.path.abspath(output_path))
     
-    print(f"   ✅ Active: {active_count}")
-    print(f"   ⚠️  Under Review: {review_count}")
-    print(f"   💤 Unused: {unused_count}")
-    print(f"   🆕 New Candidates: {len(candidates)}")
+    progress("✅ Evaluation complete!")
+    progress()
+    
+    # Summary output
+    counts = count_evaluation_statuses(evaluations)
+    review_count = counts['under_review']
+    
+    results.count('principles', len(principles))
+    results.count('learnings', len(learnings))
+    results.count('sidecar_hits', sum(1 for learning in learnings if learning['from_sidecar']))
+    for status, count in counts.items():
+        results.count(status, count)
+    results.count('new_candidates', len(candidates))
+    if pending or budget.expired():
+        results.count('not_evaluated', len(pending))
+        results.finish('partial', reason=budget.reason())
+    
+    progress("📊 EVALUATION SUMMARY:")
+    progress(f"   ✅ Active: {counts['active']}")
+    progress(f"   ⚠️  Under Review: {review_count}")
+    progress(f"   💤 Unused: {counts['unused']}")
+    progress(f"   🆕 New Candidates: {len(candidates)}")
     
     if review_count > 0 or candidates:
-        print()
-        print("⚠️  USER ATTENTION REQUIRED:")
+        progress()
+        progress("⚠️  USER ATTENTION REQUIRED:")
         if review_count > 0:
-            print(f"   - {review_count} principles need review")
+            progress(f"   - {review_count} principles need review")
         if candidates:
-            print(f"   - {len(candidates)} new principle candidates identified")
-        print(f"   - Review the full report output above")
+            progress(f"   - {len(candidates)} new principle candidates identified")
+        progress(f"   - Review the full report {'in ' + output_path if output_path else 'output above'}")
+
+def benchmark_learning_ingestion(file_count=20000):
+    """Time learning ingestion on a synthetic episodic memory at increasing worker counts"""
+    import tempfile
+    import time
+    
+    insights = [
+        "Consistent workflow process kept the interface output predictable",
+        "Architecture design review caught the structure problem early",
+        "Startup loading was slow until context memory continuity was cached",
+        "Always commit small changes and keep the changelog current",
+        "Systematic testing approach improved release quality"
+    ]
+    
+    with tempfile.TemporaryDirectory() as episodic_path:
+        start = datetime.now() - timedelta(days=80)
+        for i in range(file_count):
+            timestamp = start + timedelta(seconds=i * 300)
+            lines = [f"# Learning {i}", "", "## What Went Well"]
+            lines.extend(f"- {insights[(i + j) % len(insights)]}" for j in range(4))
+            lines.extend(["", "## Key Learning", f"- {insights[i % len(insights)]}", ""])
+            with open(os.path.join(episodic_path, f"learning-{timestamp.strftime('%Y-%m-%d-%H%M%S')}.md"), 'w') as f:
+                f.write('\n'.join(lines))
+        
+        print(f"📊 Ingesting {file_count} synthetic learnings")
+        worker_counts = sorted({1, 2, 4, default_worker_count()})
+        baseline = None
+        for workers in worker_counts:
+            began = time.perf_counter()
+            learnings = load_all_learnings(90, workers, episodic_path, record_features=False, use_sidecars=False)
+            elapsed = time.perf_counter() - began
+            baseline = baseline or elapsed
+            print(f"   {workers} worker(s): {elapsed:.2f}s for {len(learnings)} learnings ({baseline / elapsed:.1f}x)")
+
+def benchmark_keyword_matchers(rounds=5):
+    """Check the compiled keyword matchers against the reference scans, then time both
+    
+    Runs over the installed episodic learnings plus edge cases (overlapping and
+    nested keywords, mixed case); returns False if any result differs.
+    """
+    import time
+    
+    episodic_path = os.path.join(get_cns_path(), "cns", "memory", "episodic")
+    contents = []
+    for memory_file in list_memory_files(episodic_path) if os.path.isdir(episodic_path) else []:
+        try:
+            with open(memory_file.path, 'r') as f:
+                contents.append(f.read())
+        except OSError:
+            continue
+    contents.extend(MATCHER_EDGE_CASES)
+    insights = [pattern['insight'] for content in contents
+                for pattern in extract_patterns_from_content(content, VOCABULARY)]
+    insights.extend(MATCHER_EDGE_CASES)
+    
+    mismatches = check_keyword_matchers(insights, contents, VOCABULARY)
+    print(f"🔍 Checked {len(insights)} insights and {len(contents)} learnings against the reference scans")
+    for kind, text in mismatches[:10]:
+        print(f"   ❌ {kind}: {text[:80]!r}")
+    if mismatches:
+        print(f"❌ {len(mismatches)} mismatches")
+        return False
+    print("✅ Compiled matchers agree with the reference scans")
+    
+    cases = [("classify_insight_type", insights, scan_insight_type, classify_insight_type),
+             ("find_principle_references", contents, scan_principle_references, find_principle_references)]
+    for name, texts, reference, compiled in cases:
+        timings = []
+        for function in (reference, compiled):
+            began = time.perf_counter()
+            for _ in range(rounds):
+                for text in texts:
+                    function(text, VOCABULARY)
+            timings.append((time.perf_counter() - began) / rounds)
+        print(f"   {name}: reference {timings[0] * 1000:.1f}ms, compiled {timings[1] * 1000:.1f}ms "
+              f"({timings[0] / max(timings[1], 1e-9):.1f}x) per pass over {len(texts)} inputs")
+    return True
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Evaluate prime principles against recent learnings")
+    parser.add_argument('--format', choices=sorted(REPORT_WRITERS), default='markdown',
+                        help="report format (json emits one JSON record per line)")
+    parser.add_argument('--output', help="write the report to this file instead of stdout")
+    parser.add_argument('--benchmark', action='store_true', help="benchmark parallel learning ingestion")
+    parser.add_argument('--check-matchers', action='store_true',
+                        help="check the compiled keyword matchers against the reference scans and time both")
+    args = parser.parse_args()
+    
+    if args.benchmark:
+        use_installed_vocabulary()
+        benchmark_learning_ingestion()
+    elif args.check_matchers:
+        use_installed_vocabulary()
+        sys.exit(0 if benchmark_keyword_matchers() else 1)
+    else:
+        with ResultChannel.from_environment('principle_evaluation') as results:
+            main(args.format, args.output, results, Budget.from_environment())
\ No newline at end of file
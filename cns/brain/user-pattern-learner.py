@@ -5,16 +5,38 @@ Identifies user behavior patterns and proposes updates to user-patterns.md
 """
 
 import os
+import sys
 import json
 import glob
 from datetime import datetime, timedelta
 from pathlib import Path
 import re
+from functools import partial
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cnslib.budget import Budget
+from cnslib.episodic import list_learnings
+from cnslib.features import FeatureTable, get_feature_store_path
+from cnslib.insights import LearningSidecars, extract_behavior_counts, extract_learning_features, get_sidecar_dir
+from cnslib.parallel import DEFAULT_CHUNK_SIZE, default_worker_count, parse_in_parallel
+from cnslib.results import ResultChannel
+from cnslib.retention import count_archived_learnings
+from cnslib.storage import update_file
+from cnslib.vocabulary import DEFAULT_VOCABULARY, load_vocabulary
 
 def get_cns_path():
     """Get the ~/.personal-cns directory path"""
     return os.path.expanduser("~/.personal-cns")
 
+# Behavioral vocabularies: the built-in ones until main() loads the installation's
+# (defaults + memory/vocabularies.json); their order defines the feature-store columns
+VOCABULARY = DEFAULT_VOCABULARY
+
+def use_installed_vocabulary():
+    """Analyze with the installation's vocabularies from here on"""
+    global VOCABULARY
+    VOCABULARY = load_vocabulary(get_cns_path())
+
 def is_new_workspace():
     """Detect if this is a new CNS installation with minimal learning history"""
     
@@ -29,109 +51,121 @@ def is_new_workspace():
     episodic_path = os.path.join(get_cns_path(), "cns", "memory", "episodic")
     if os.path.exists(episodic_path):
         learning_files = glob.glob(os.path.join(episodic_path, "*.md"))
-        if len(learning_files) < 3:
+        if len(learning_files) + count_archived_learnings(episodic_path) < 3:
             return True
     
     return False
 
-def analyze_recent_interactions(days_back=7):
-    """Analyze recent episodic learnings for user behavior patterns"""
+def open_behavior_table():
+    """Open the per-learning behavior counts table in the CNS feature store"""
+    return FeatureTable(get_feature_store_path(get_cns_path()), 'behavior', VOCABULARY.behavior_columns, VOCABULARY.digest)
+
+def analyze_recent_interactions(days_back=7, workers=None, budget=None):
+    """Analyze recent episodic learnings for user behavior patterns
+    
+    New files are parsed in batches, each recorded in the feature store, so when
+    `budget` expires the counts gathered so far are kept for the next run and
+    the patterns cover only the learnings analyzed.
+    """
     
     episodic_path = os.path.join(get_cns_path(), "cns", "memory", "episodic")
     if not os.path.exists(episodic_path):
         return []
     
     cutoff_date = datetime.now() - timedelta(days=days_back)
-    patterns = []
-    
-    learning_files = glob.glob(os.path.join(episodic_path, "learning-*.md"))
-    
-    for file_path in learning_files:
-        try:
-            # Check file age
-            file_time = datetime.fromtimestamp(os.path.getmtime(file_path))
-            if file_time < cutoff_date:
-                continue
-            
-            with open(file_path, 'r') as f:
-                content = f.read()
-            
-            # Extract patterns from learning content
-            detected_patterns = extract_patterns_from_learning(content, file_time)
-            patterns.extend(detected_patterns)
-            
-        except Exception as e:
-            print(f"Error analyzing {file_path}: {e}")
-            continue
     
-    return consolidate_patterns(patterns)
+    # Learnings are write-once, so counts already in the feature store are reused
+    # and only newly captured files are read and parsed (across worker processes)
+    table = open_behavior_table()
+    
+    # Filename timestamps drive the cutoff; only irregular names are stat'ed
+    learning_files = list_learnings(episodic_path, since=cutoff_date, newest_first=False)
+    new_files = [learning_file for learning_file in learning_files if learning_file.name not in table]
+    
+    # Counts extracted at capture are in the learning's sidecar; only files
+    # without one (captured before sidecars, or an older schema) are parsed
+    sidecars = LearningSidecars(get_sidecar_dir(get_cns_path()), VOCABULARY)
+    stored = sidecars.load(since=cutoff_date) if new_files else {}
+    unparsed = []
+    for learning_file in new_files:
+        features = stored.get(learning_file.name)
+        if features is None:
+            unparsed.append(learning_file)
+        else:
+            table.append(learning_file.name, learning_file.timestamp, [features['behavior'][c] for c in VOCABULARY.behavior_columns])
+    
+    extracted = []
+    # Passed along explicitly: spawned worker processes start with the built-in vocabularies
+    read_features = partial(read_learning_features, vocabulary=VOCABULARY)
+    batch_size = (workers or default_worker_count()) * DEFAULT_CHUNK_SIZE
+    for start in range(0, len(unparsed), batch_size):
+        if budget is not None and budget.expired():
+            print(f"⏳ Stopped early ({budget.reason()}): {len(unparsed) - start} learnings left for the next run")
+            break
+        for learning_file, features in parse_in_parallel(read_features, unparsed[start:start + batch_size], workers):
+            table.append(learning_file.name, learning_file.timestamp, [features['behavior'][c] for c in VOCABULARY.behavior_columns])
+            extracted.append((learning_file.name, learning_file.timestamp, features))
+    
+    try:
+        table.flush()
+        sidecars.backfill(extracted)
+    except OSError as e:
+        print(f"Warning: Could not update feature store: {e}")
+    
+    # Aggregated column by column over the window's rows, oldest first
+    return consolidate_behavior_columns(table, table.row_numbers(f.name for f in learning_files))
 
-def extract_patterns_from_learning(content, timestamp):
-    """Extract behavioral patterns from learning file content"""
+def read_learning_features(learning_file, vocabulary=None):
+    """Read one learning file and extract its sidecar features (None on error)"""
+    try:
+        with open(learning_file.path, 'r') as f:
+            content = f.read()
+        return learning_file, extract_learning_features(content, vocabulary or VOCABULARY)
+    except Exception as e:
+        print(f"Error analyzing {learning_file.path}: {e}", file=sys.stderr)
+        return None
+
+# Per behavior category: the count at which a learning shows the pattern, and
+# the count that gives full confidence
+BEHAVIOR_THRESHOLDS = {'communication': (3, 10.0), 'workflow': (2, 5.0), 'quality': (2, 4.0)}
+
+def behavior_pattern(column, count):
+    """(category, pattern, confidence, evidence) a behavior column's count shows, or None"""
+    category, name = column.split(':', 1)
+    threshold, full_confidence = BEHAVIOR_THRESHOLDS[category]
+    if count < threshold:
+        return None
+    
+    confidence = min(count / full_confidence, 1.0)
+    if category == 'communication':
+        return category, f'prefers_{name}_communication', confidence, f"Used {name} communication indicators {count} times"
+    if category == 'workflow':
+        return category, name, confidence, f"Found {count} instances of {name} behavior"
+    return category, name, confidence, f"Demonstrated {name} in {count} instances"
+
+def patterns_from_behavior_counts(counts, timestamp):
+    """Turn behavioral indicator counts into detected patterns"""
     
     patterns = []
-    lines = content.split('\n')
-    
-    # Pattern 1: Communication Style
-    communication_indicators = {
-        'concise': ['brief', 'short', 'concise', 'direct', 'minimal'],
-        'detailed': ['detailed', 'comprehensive', 'thorough', 'complete'],
-        'technical': ['technical', 'precise', 'specific', 'exact'],
-        'collaborative': ['discuss', 'review', 'feedback', 'collaborate']
-    }
-    
-    for style, indicators in communication_indicators.items():
-        count = sum(1 for line in lines for indicator in indicators if indicator.lower() in line.lower())
-        if count >= 3:  # Pattern threshold
-            patterns.append({
-                'category': 'communication',
-                'pattern': f'prefers_{style}_communication',
-                'confidence': min(count / 10.0, 1.0),
-                'evidence': f"Used {style} communication indicators {count} times",
-                'timestamp': timestamp
-            })
     
-    # Pattern 2: Workflow Preferences  
-    workflow_patterns = {
-        'step_by_step': r'step \d|first.*then|next.*step',
-        'todo_driven': r'todo|task.*list|checklist',
-        'testing_focused': r'test.*first|verify.*before|check.*that',
-        'documentation_heavy': r'document.*this|add.*documentation|update.*docs'
-    }
-    
-    content_lower = content.lower()
-    for pattern_name, regex_pattern in workflow_patterns.items():
-        matches = re.findall(regex_pattern, content_lower)
-        if len(matches) >= 2:
+    for column in VOCABULARY.behavior_columns:
+        detected = behavior_pattern(column, counts[column])
+        if detected:
+            category, pattern, confidence, evidence = detected
             patterns.append({
-                'category': 'workflow',
-                'pattern': pattern_name,
-                'confidence': min(len(matches) / 5.0, 1.0),
-                'evidence': f"Found {len(matches)} instances of {pattern_name} behavior",
-                'timestamp': timestamp
-            })
-    
-    # Pattern 3: Quality Standards
-    quality_indicators = {
-        'high_standards': ['green.*test', 'lint.*check', 'verify.*quality', 'thorough.*review'],
-        'security_conscious': ['secret', 'security', 'permission', 'auth'],
-        'performance_aware': ['performance', 'optimize', 'efficient', 'fast']
-    }
-    
-    for standard, indicators in quality_indicators.items():
-        count = sum(1 for line in lines for indicator in indicators 
-                   if re.search(indicator, line.lower()))
-        if count >= 2:
-            patterns.append({
-                'category': 'quality',
-                'pattern': standard,
-                'confidence': min(count / 4.0, 1.0),
-                'evidence': f"Demonstrated {standard} in {count} instances",
+                'category': category,
+                'pattern': pattern,
+                'confidence': confidence,
+                'evidence': evidence,
                 'timestamp': timestamp
             })
     
     return patterns
 
+def extract_patterns_from_learning(content, timestamp):
+    """Extract behavioral patterns from learning file content"""
+    return patterns_from_behavior_counts(extract_behavior_counts(content, VOCABULARY), timestamp)
+
 def consolidate_patterns(patterns):
     """Consolidate similar patterns and calculate overall confidence"""
     
@@ -157,9 +191,52 @@ def consolidate_patterns(patterns):
         cons['evidence_list'].append(pattern['evidence'])
         cons['last_seen'] = max(cons['last_seen'], pattern['timestamp'])
     
+    return rank_consolidated_patterns(consolidated.values())
+
+def consolidate_behavior_columns(table, rows):
+    """consolidate_patterns for the behavior table's given rows, one column at a time
+    
+    Each behavior column is one candidate pattern, so its values over the rows
+    are thresholded and averaged directly instead of building a pattern record
+    per learning and regrouping them. Patterns are kept in the order they first
+    appear, as consolidate_patterns does, so ties rank the same.
+    """
+    consolidated = []
+    for column_index, column in enumerate(table.columns):
+        found = None
+        for position, (row, count) in enumerate(zip(rows, table.column(column, rows=rows))):
+            detected = behavior_pattern(column, count)
+            if detected is None:
+                continue
+            category, pattern, confidence, evidence = detected
+            seen = datetime.fromtimestamp(table.timestamps[row])
+            if found is None:
+                found = {
+                    'category': category,
+                    'pattern': pattern,
+                    'total_confidence': 0,
+                    'occurrences': 0,
+                    'evidence_list': [],
+                    'first_seen': seen,
+                    'last_seen': seen,
+                    'order': (position, column_index)
+                }
+            found['total_confidence'] += confidence
+            found['occurrences'] += 1
+            found['evidence_list'].append(evidence)
+            found['last_seen'] = max(found['last_seen'], seen)
+        if found is not None:
+            consolidated.append(found)
+    
+    consolidated.sort(key=lambda pattern: pattern.pop('order'))
+    return rank_consolidated_patterns(consolidated)
+
+def rank_consolidated_patterns(consolidated):
+    """The top 5 consolidated patterns by average confidence, frequent and confident enough"""
+    
     # Calculate final confidence scores and filter
     final_patterns = []
-    for key, pattern in consolidated.items():
+    for pattern in consolidated:
         avg_confidence = pattern['total_confidence'] / pattern['occurrences']
         
         # Only include patterns with reasonable confidence and frequency
@@ -275,98 +352,140 @@ def interactive_pattern_update(suggestions):
     return approved_updates
 
 def apply_pattern_updates(approved_updates):
-    """Apply approved pattern updates to user-patterns.md"""
+    """Apply approved pattern updates to user-patterns.md; returns the path written, or None"""
     
     if not approved_updates:
-        return
+        return None
     
     user_patterns_path = os.path.join(get_cns_path(), "cns", "brain", "user-patterns.md")
     
     if not os.path.exists(user_patterns_path):
         print("❌ user-patterns.md not found")
-        return
-    
-    # Read current content
-    with open(user_patterns_path, 'r') as f:
-        content = f.read()
+        return None
     
-    # Apply updates section by section
-    updated_content = content
-    
-    for update in approved_updates:
-        section = update['section']
-        addition = update['suggested_addition']
+    def apply_updates(content):
+        if content is None:
+            return None
         
-        # Find the section in the content
-        section_pattern = f"## {section}"
-        if section_pattern in updated_content:
-            # Find the end of the section
-            lines = updated_content.split('\n')
-            section_start = -1
-            
-            for i, line in enumerate(lines):
-                if line.strip() == section_pattern:
-                    section_start = i
-                    break
+        # Apply updates section by section
+        updated_content = content
+        
+        for update in approved_updates:
+            section = update['section']
+            addition = update['suggested_addition']
             
-            if section_start != -1:
-                # Find next section or end of content
-                next_section = len(lines)
-                for i in range(section_start + 1, len(lines)):
-                    if lines[i].startswith('## ') and lines[i] != section_pattern:
-                        next_section = i
+            # Find the section in the content
+            section_pattern = f"## {section}"
+            if section_pattern in updated_content:
+                # Find the end of the section
+                lines = updated_content.split('\n')
+                section_start = -1
+                
+                for i, line in enumerate(lines):
+                    if line.strip() == section_pattern:
+                        section_start = i
                         break
                 
-                # Insert the new pattern
-                lines.insert(next_section, addition)
-                updated_content = '\n'.join(lines)
-    
-    # Update timestamp
-    updated_content = re.sub(
-        r'\*\*Last Updated\*\*:.*',
-        f"**Last Updated**: {datetime.now().strftime('%Y-%m-%dT%H:%M:%SZ')}",
-        updated_content
-    )
-    
-    # Write back
-    with open(user_patterns_path, 'w') as f:
-        f.write(updated_content)
+                if section_start != -1:
+                    # Find next section or end of content
+                    next_section = len(lines)
+                    for i in range(section_start + 1, len(lines)):
+                        if lines[i].startswith('## ') and lines[i] != section_pattern:
+                            next_section = i
+                            break
+                    
+                    # Insert the new pattern
+                    lines.insert(next_section, addition)
+                    updated_content = '\n'.join(lines)
+        
+        # Update timestamp
+        return re.sub(
+            r'\*\*Last Updated\*\*:.*',
+            f"**Last Updated**: {datetime.now().strftime('%Y-%m-%dT%H:%M:%SZ')}",
+            updated_content
+        )
+    
+    # Read, update and replace atomically; re-applied if another session wrote first
+    if update_file(user_patterns_path, apply_updates) is None:
+        print("❌ user-patterns.md not found")
+        return None
     
     print(f"✅ Updated user-patterns.md with {len(approved_updates)} new patterns")
+    return user_patterns_path
 
-def main():
-    """Main user pattern learning function"""
+def report_pattern_suggestions(suggestions):
+    """List pattern suggestions without asking (non-interactive runs such as update-cns.py)"""
+    print(f"📋 {len(suggestions)} pattern suggestion(s) to review:")
+    for suggestion in suggestions:
+        print(f"   - {suggestion['section']}: {suggestion['suggested_addition'].lstrip('- ')} "
+              f"({suggestion['confidence']:.0%})")
+    print("   Run python3 ~/.personal-cns/cns/brain/user-pattern-learner.py to review and add them")
+
+def main(results=None, budget=None, interactive=True):
+    """Main user pattern learning function
+    
+    If `budget` expires during analysis the run reports 'partial' and proposes
+    nothing; the analysis it finished is kept in the feature store. With
+    interactive=False suggestions are listed rather than asked about,
+    user-patterns.md is left unchanged and None is returned.
+    """
+    results = results or ResultChannel('user_pattern_learning')
+    budget = budget or Budget()
+    use_installed_vocabulary()
     
     # Only run pattern learning if this appears to be a new workspace
     if not is_new_workspace():
+        results.count('new_workspace', 0)
         return False  # No new patterns detected
     
     print("🧠 Analyzing user behavior patterns...")
     
     # Analyze recent interactions
-    patterns = analyze_recent_interactions(days_back=14)  # Look back 2 weeks for new workspaces
+    patterns = analyze_recent_interactions(days_back=14, budget=budget)  # Look back 2 weeks for new workspaces
+    results.count('patterns', len(patterns))
+    
+    if budget.expired():
+        # Suggestions from part of the history would be misleading; the next run completes it
+        results.finish('partial', reason=budget.reason())
+        return False
     
     if not patterns:
         return False  # No patterns detected
     
     # Generate suggestions
     suggestions = generate_user_pattern_suggestions(patterns)
+    results.count('suggestions', len(suggestions))
     
     if not suggestions:
         return False  # No actionable suggestions
     
+    if not interactive:
+        report_pattern_suggestions(suggestions)
+        return None
+    
     # Interactive update process
     approved_updates = interactive_pattern_update(suggestions)
+    results.count('approved', len(approved_updates))
     
     if approved_updates:
-        apply_pattern_updates(approved_updates)
+        written = apply_pattern_updates(approved_updates)
+        if written:
+            results.file_written(written)
         return True
     
     return False
 
 if __name__ == "__main__":
-    success = main()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Propose user-patterns.md updates from recent learnings")
+    parser.add_argument('--no-input', action='store_true',
+                        help="list pattern suggestions instead of asking about each (for unattended runs)")
+    args = parser.parse_args()
+    
+    with ResultChannel.from_environment('user_pattern_learning') as results:
+        success = main(results, Budget.from_environment(), interactive=not args.no_input)
     if success:
         print("🎉 User pattern learning completed successfully!")
-    else:
+    elif success is not None:
         print("💭 No new user patterns detected at this time.")
\ No newline at end of file
@@ -0,0 +1,4 @@
+"""
+CNS Shared Library
+Helpers shared by the CNS scripts (startup, learning capture, maintenance and brain analyzers)
+"""
@@ -0,0 +1,113 @@
+"""
+CNS Phase Budgets
+Time budgets with cooperative cancellation for maintenance phases, and checkpoint
+files that let a phase stopped early resume where it left off
+"""
+
+import os
+import json
+import time
+import signal
+import hashlib
+import threading
+from datetime import datetime
+
+from cnslib.storage import write_atomic
+
+# Absolute deadline (epoch seconds) handed to a phase script by its launcher
+DEADLINE_ENV = 'CNS_PHASE_DEADLINE'
+CHECKPOINT_DIR = 'checkpoints'
+
+class Budget:
+    """Time budget for one phase; expired once its deadline passes or it is cancelled
+
+    Phases poll expired() between units of work (a principle, a batch of files)
+    and stop cleanly, keeping what they finished. Without a deadline it only
+    expires when cancelled.
+    """
+
+    def __init__(self, seconds=None, deadline=None):
+        if deadline is None and seconds is not None:
+            deadline = time.time() + seconds
+        self.deadline = deadline
+        self._cancelled = threading.Event()
+
+    @classmethod
+    def from_environment(cls, handle_signals=True):
+        """Budget from CNS_PHASE_DEADLINE; SIGTERM (the launcher's stop request) cancels it
+
+        Under a launcher, Ctrl-C (which reaches the whole process group) cancels
+        the budget too, so the script wraps up instead of dying mid-write.
+        """
+        try:
+            deadline = float(os.environ[DEADLINE_ENV])
+        except (KeyError, ValueError):
+            deadline = None
+        budget = cls(deadline=deadline)
+        if handle_signals and threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda signum, frame: budget.cancel())
+            if deadline is not None:
+                signal.signal(signal.SIGINT, lambda signum, frame: budget.cancel())
+        return budget
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def expired(self):
+        return self.cancelled or (self.deadline is not None and time.time() >= self.deadline)
+
+    def remaining(self):
+        """Seconds left (None if unbounded)"""
+        return None if self.deadline is None else max(0.0, self.deadline - time.time())
+
+    def reason(self):
+        if self.deadline is not None and time.time() >= self.deadline:
+            return 'time budget expired'
+        return 'cancelled'
+
+def get_checkpoint_path(cns_path, phase):
+    return os.path.join(cns_path, "cns", "memory", CHECKPOINT_DIR, f"{phase}.json")
+
+def checkpoint_key(*parts):
+    """Digest identifying the inputs a checkpoint was taken against"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode('utf-8') + b'\0')
+    return digest.hexdigest()
+
+class Checkpoint:
+    """Progress a phase saved when it stopped early
+
+    A checkpoint is only used by a run over the same inputs (same key); anything
+    else starts fresh. A run that finishes clears it.
+    """
+
+    def __init__(self, path, key):
+        self.path = path
+        self.key = key
+
+    def load(self):
+        """Saved state for this key, or {} if there is none"""
+        try:
+            with open(self.path, 'r') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(saved, dict) or saved.get('key') != self.key:
+            return {}
+        return saved.get('state') or {}
+
+    def save(self, state):
+        write_atomic(self.path, json.dumps({'key': self.key,
+                                            'saved': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                                            'state': state}, default=str))
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
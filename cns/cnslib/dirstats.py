@@ -0,0 +1,396 @@
+"""
+CNS Directory Statistics
+Cached file counts, sizes, age ranges and per-workspace breakdowns of the memory
+directories, kept current by the writers that add and remove files and checked
+against the directory's mtime, so reading them costs a few stats instead of a scan
+"""
+
+import os
+import json
+import time
+import secrets
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime
+
+from cnslib.episodic import context_group_name, parse_filename_timestamp
+from cnslib.retrieval import WORKSPACE_PATTERN
+from cnslib.storage import VersionConflict, update_file
+
+DIRSTATS_FILE = 'dirstats.json'
+DIRSTATS_VERSION = 3
+
+# A writer registered for longer than this is presumed gone (killed before it could clean up)
+WRITER_TIMEOUT = 3600
+
+# Group of files without a workspace (learnings captured outside one, unrecognised names)
+UNGROUPED = '(none)'
+
+# The **Workspace** line sits in a learning's header, well inside this
+WORKSPACE_HEAD_BYTES = 2048
+
+def _workspace_group(path, filename):
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            match = WORKSPACE_PATTERN.search(f.read(WORKSPACE_HEAD_BYTES))
+    except OSError:
+        return None
+    return match.group(1).strip() if match else None
+
+def _context_group(path, filename):
+    return context_group_name(filename)
+
+# Tracked directory -> function giving a file's group from (path, filename)
+TRACKED_DIRECTORIES = {
+    'episodic': _workspace_group,
+    'context': _context_group
+}
+
+# day: YYYY-MM-DD of the file's timestamp; group: workspace or context name
+FileEntry = namedtuple('FileEntry', ['day', 'size', 'group', 'name'])
+
+def get_dirstats_path(cns_path):
+    return os.path.join(cns_path, "cns", "memory", "index", DIRSTATS_FILE)
+
+def _is_tracked_name(filename):
+    # Same files the retention policies and list_learnings consider
+    return filename.endswith('.md') and 'template' not in filename.lower()
+
+def _mtime_ns(directory):
+    try:
+        return os.stat(directory).st_mtime_ns
+    except OSError:
+        return None
+
+def _tracked_count(directory):
+    """Tracked files in a directory, from its names alone (no per-file stat)"""
+    try:
+        return sum(1 for filename in os.listdir(directory) if _is_tracked_name(filename))
+    except OSError:
+        return None
+
+def _writer_alive(writer, now):
+    if now - writer.get('since', 0) > WRITER_TIMEOUT:
+        return False
+    if os.name == 'posix':
+        try:
+            os.kill(writer['pid'], 0)
+        except ProcessLookupError:
+            return False
+        except (OSError, KeyError, TypeError):
+            pass  # Alive but not ours, or not checkable: the timeout decides
+    return True
+
+def _has_dead_writers(stats):
+    now = time.time()
+    return any(not _writer_alive(writer, now) for writer in stats.get('writers', {}).values())
+
+def file_entry(directory_name, path, st=None):
+    """FileEntry of one file in a tracked directory (raises OSError if it cannot be stat'ed)"""
+    filename = os.path.basename(path)
+    st = st or os.stat(path)
+    timestamp = parse_filename_timestamp(filename) or datetime.fromtimestamp(st.st_mtime)
+    return FileEntry(timestamp.strftime('%Y-%m-%d'), st.st_size,
+                     TRACKED_DIRECTORIES[directory_name](path, filename) or UNGROUPED, filename)
+
+def _empty_stats():
+    return {'mtime_ns': None, 'count': 0, 'bytes': 0, 'days': {}, 'groups': {}, 'watched': {}}
+
+def _apply(stats, entry, count, size):
+    """Add `count` files and `size` bytes to the totals, the entry's day and its group"""
+    stats['count'] += count
+    stats['bytes'] += size
+    for table, key in ((stats['days'], entry.day), (stats['groups'], entry.group)):
+        key_count, key_bytes = table.get(key, (0, 0))
+        if key_count + count > 0:
+            table[key] = [key_count + count, key_bytes + size]
+        else:
+            table.pop(key, None)
+
+    # Newest file per group (names sort by time within a group) and its size
+    watched = stats.setdefault('watched', {})
+    current = watched.get(entry.group)
+    if count > 0 and (current is None or entry.name >= current[0]):
+        watched[entry.group] = [entry.name, entry.size, entry.day]
+    elif current is not None and current[0] == entry.name:
+        if count < 0:
+            del watched[entry.group]  # The next newest is unknown until a rescan
+        else:
+            current[1] += size
+
+def _refresh_watched(stats, directory):
+    """Pick up appends to the newest file of each group; returns True if a size changed
+
+    Appending to a file leaves the directory mtime alone, so this is how the
+    active session context growing shows up without a rescan.
+    """
+    changed = False
+    for group, (filename, size, day) in list(stats.get('watched', {}).items()):
+        try:
+            current = os.stat(os.path.join(directory, filename)).st_size
+        except OSError:
+            continue
+        if current != size:
+            _apply(stats, FileEntry(day, size, group, filename), 0, current - size)
+            changed = True
+    return changed
+
+def scan_directory(directory_name, directory):
+    """Statistics of a tracked directory from a full os.scandir pass"""
+    stats = _empty_stats()
+    try:
+        entries = os.scandir(directory)
+    except OSError:
+        return stats
+
+    with entries:
+        for entry in entries:
+            if not _is_tracked_name(entry.name):
+                continue
+            try:
+                if not entry.is_file():
+                    continue
+                file = file_entry(directory_name, entry.path, entry.stat())
+            except OSError:
+                continue
+            _apply(stats, file, 1, file.size)
+    return stats
+
+class DirectorySnapshot:
+    """Statistics of one memory directory as of its last recorded mtime"""
+
+    def __init__(self, stats, cached=True):
+        self.cached = cached  # False when it took a rescan
+        self.count = stats['count']
+        self.bytes = stats['bytes']
+        self.days = stats['days']
+        self.groups = stats['groups']
+        self.oldest = min(self.days) if self.days else None
+        self.newest = max(self.days) if self.days else None
+
+    def count_since(self, since):
+        """Files whose timestamp falls on or after the day of `since`"""
+        first_day = since.strftime('%Y-%m-%d')
+        return sum(count for day, (count, _) in self.days.items() if day >= first_day)
+
+    def as_dict(self):
+        return {'file_count': self.count,
+                'bytes': self.bytes,
+                'oldest': self.oldest,
+                'newest': self.newest,
+                'cached': self.cached,
+                'groups': {group: {'file_count': count, 'bytes': size}
+                           for group, (count, size) in sorted(self.groups.items())}}
+
+class DirectoryChanges:
+    """Files a writer added, removed or resized inside a DirectoryStats.tracking block
+
+    Also remembers the directory mtime seen right after the writer's latest
+    add or remove, which is what the directory's mtime should still be when
+    nothing else changed it since.
+    """
+
+    def __init__(self, directory_name, directory=None):
+        self.directory_name = directory_name
+        self.directory = directory
+        self.deltas = []
+        self.mtime_ns = None
+
+    @property
+    def tracked(self):
+        return self.directory_name in TRACKED_DIRECTORIES
+
+    def _changed(self):
+        if self.directory is not None:
+            self.mtime_ns = _mtime_ns(self.directory)
+
+    def entry(self, path):
+        """FileEntry of a file about to be removed (pass it to removed() once it is gone)"""
+        return file_entry(self.directory_name, path) if self.tracked else None
+
+    def added(self, path):
+        if self.tracked:
+            entry = file_entry(self.directory_name, path)
+            self.deltas.append((entry, 1, entry.size))
+            self._changed()
+
+    def removed(self, entry):
+        if entry is not None:
+            self.deltas.append((entry, -1, -entry.size))
+            self._changed()
+
+    def resized(self, path, old_size):
+        if self.tracked:
+            entry = file_entry(self.directory_name, path)
+            self.deltas.append((entry, 0, entry.size - old_size))
+
+class DirectoryStats:
+    """Per-directory statistics of a CNS installation, in memory/index/dirstats.json
+
+    Each directory's record carries the directory mtime it describes. A reader
+    whose stat of the directory shows that mtime uses the record as is; any
+    other mtime (a file added by hand, a writer that does not track, a crash)
+    makes it rescan once and store the result.
+
+    Writers wrap their changes in tracking(). A writer registers on the record
+    if it is current (or other writers are already registered), makes its
+    changes without holding any lock, then applies its deltas. Each step is a
+    short optimistic update of the stats file, so a long compaction never holds
+    up a learning capture. The last registered writer to finish checks that
+    nothing untracked changed the directory meanwhile: its mtime must still be
+    the one seen after the latest tracked add or remove, and its file count
+    (from the names alone) must match. If so it stamps the new mtime, and if
+    not it drops the record for the next reader to rescan.
+
+    While writers are in flight the mtime does not match and readers rescan; a
+    rescan replaces the record, and writers that find themselves no longer
+    registered leave it alone. A writer that dies without cleaning up (its pid
+    is gone, or it has been registered for WRITER_TIMEOUT) makes the record
+    untrustworthy, so it is dropped too. Relies on directory mtimes changing
+    with every create and delete, which holds for local filesystems with
+    sub-second timestamps.
+
+    Appends do not change the directory mtime either. Readers stat the newest
+    file of each group (where appends go: the active session context) and add
+    any growth; appends to older files show up at the next rescan.
+    """
+
+    def __init__(self, cns_path):
+        self.cns_path = cns_path
+        self.path = get_dirstats_path(cns_path)
+
+    def directory(self, name):
+        return os.path.join(self.cns_path, "cns", "memory", name)
+
+    def _parse(self, text):
+        try:
+            data = json.loads(text) if text else None
+        except ValueError:
+            data = None
+        if not isinstance(data, dict) or data.get('version') != DIRSTATS_VERSION:
+            return {'version': DIRSTATS_VERSION, 'directories': {}}
+        return data
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                return self._parse(f.read())['directories']
+        except OSError:
+            return {}
+
+    def _update(self, transform):
+        """Apply transform(directories) -> bool (changed) to the stats file; best effort"""
+        def update(text):
+            data = self._parse(text)
+            return json.dumps(data) if transform(data['directories']) else None
+        try:
+            update_file(self.path, update)
+        except (OSError, VersionConflict):
+            pass  # The next reader rescans whatever is not recorded
+
+    def get(self, name):
+        """DirectorySnapshot of a tracked directory, or None if it does not exist"""
+        directory = self.directory(name)
+        mtime = _mtime_ns(directory)
+        if mtime is None:
+            return None
+
+        stats = self._load().get(name)
+        if stats is not None and _has_dead_writers(stats):
+            self._drop_if_dead_writers(name)
+            stats = None
+        if stats is None or stats.get('mtime_ns') != mtime:
+            return DirectorySnapshot(self.rescan(name), cached=False)
+
+        # A registered writer records its own resizes, so only refresh sizes without one
+        if not stats.get('writers') and _refresh_watched(stats, directory):
+            def refresh(directories):
+                current = directories.get(name)
+                return (current is not None and current.get('mtime_ns') == mtime and not current.get('writers')
+                        and _refresh_watched(current, directory))
+            self._update(refresh)
+        return DirectorySnapshot(stats)
+
+    def _drop_if_dead_writers(self, name):
+        def drop(directories):
+            stats = directories.get(name)
+            return stats is not None and _has_dead_writers(stats) and directories.pop(name) is not None
+        self._update(drop)
+
+    def rescan(self, name):
+        """Rebuild a directory's record from a scan; stored only if the directory held still"""
+        directory = self.directory(name)
+        before = _mtime_ns(directory)
+        stats = scan_directory(name, directory)
+        after = _mtime_ns(directory)
+        if before is not None and before == after:
+            stats['mtime_ns'] = after
+
+            def store(directories):
+                directories[name] = stats
+                return True
+            self._update(store)
+        return stats
+
+    @contextmanager
+    def tracking(self, name):
+        """Record the files changed in a tracked directory during the block
+
+        Yields a DirectoryChanges; call added() after creating a file, entry()
+        before and removed() after deleting one, resized() after growing one.
+        Nothing is recorded for a directory that is not tracked; if the block
+        raises, the directory's record is dropped and the next reader rescans.
+        """
+        if name not in TRACKED_DIRECTORIES:
+            yield DirectoryChanges(name)
+            return
+
+        directory = self.directory(name)
+        token = f"{os.getpid()}-{secrets.token_hex(4)}"
+        registered = [False]
+
+        def register(directories):
+            # Join only a record that is current, or kept current by writers still in flight
+            stats = directories.get(name)
+            if stats is not None and _has_dead_writers(stats):
+                del directories[name]
+                return True
+            registered[0] = stats is not None and (bool(stats.get('writers')) or
+                                                   stats.get('mtime_ns') == _mtime_ns(directory))
+            if registered[0]:
+                stats.setdefault('writers', {})[token] = {'pid': os.getpid(), 'since': time.time()}
+            return registered[0]
+        self._update(register)
+
+        changes = DirectoryChanges(name, directory)
+        try:
+            yield changes
+        except BaseException:
+            def invalidate(directories):
+                return directories.pop(name, None) is not None
+            self._update(invalidate)
+            raise
+        if not registered[0]:
+            return  # The record was already stale: readers rescan it
+
+        def record(directories):
+            stats = directories.get(name)
+            if stats is None or token not in stats.get('writers', {}):
+                return False  # Replaced by a rescan in the meantime
+            for entry, count, size in changes.deltas:
+                _apply(stats, entry, count, size)
+            del stats['writers'][token]
+            if changes.mtime_ns is not None:
+                stats['expected_mtime_ns'] = max(stats.get('expected_mtime_ns') or 0, changes.mtime_ns)
+            if stats['writers']:
+                return True
+
+            # Last writer out: every tracked change is applied; anything else means a rescan
+            expected = stats.pop('expected_mtime_ns', None) or stats['mtime_ns']
+            current = _mtime_ns(directory)
+            if current != expected or _tracked_count(directory) != stats['count']:
+                del directories[name]
+            else:
+                stats['mtime_ns'] = current
+            return True
+        self._update(record)
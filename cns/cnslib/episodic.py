@@ -0,0 +1,164 @@
+"""
+CNS Memory File Enumeration
+Lists episodic learnings and context files using the timestamp encoded in their
+filenames, so time filtering and ordering do not need a stat call per file
+"""
+
+import os
+import re
+import heapq
+import secrets
+from collections import namedtuple
+from datetime import datetime
+
+# Matches the timestamp CNS writes into filenames:
+#   learning-YYYY-MM-DD-HHMMSS.md, context-YYYY-MM-DD-HHMMSS-workspace.md,
+#   [context-name]-YYYY-MM-DD-HHMMSS.md and learning-YYYY-MM-DD-activity-name.md,
+# plus the collision-free form of the first three, where HHMMSS is followed by
+# -ffffff-xxxx (microseconds and a random hex suffix)
+TIMESTAMP_PATTERN = re.compile(r'(?<!\d)(\d{4})-(\d{2})-(\d{2})'
+                               r'(?:-(\d{2})(\d{2})(\d{2})(?:-(\d{6})-[0-9a-f]{4}(?![0-9a-z]))?)?(?!\d)')
+
+# Timestamp part of a generated name, old or collision-free form
+NAME_TIMESTAMP = r'\d{4}-\d{2}-\d{2}-\d{6}(?:-\d{6}-[0-9a-f]{4})?'
+NAMED_FILE_PATTERN = re.compile(rf'^(.+?)-({NAME_TIMESTAMP})$')
+WORKSPACE_CONTEXT_PATTERN = re.compile(rf'^context-{NAME_TIMESTAMP}-(.+)$')
+
+UNIQUE_NAME_ATTEMPTS = 16
+
+MemoryFile = namedtuple('MemoryFile', ['name', 'path', 'timestamp', 'from_name'])
+
+def parse_filename_timestamp(filename):
+    """Parse the timestamp embedded in a CNS memory filename, or None if irregular"""
+    match = TIMESTAMP_PATTERN.search(filename)
+    if not match:
+        return None
+
+    year, month, day, hour, minute, second, microsecond = match.groups()
+    try:
+        if hour is None:
+            return datetime(int(year), int(month), int(day))
+        return datetime(int(year), int(month), int(day), int(hour), int(minute), int(second),
+                        int(microsecond or 0))
+    except ValueError:
+        return None
+
+def split_named_stem(stem):
+    """(name, timestamp) for a [name]-YYYY-MM-DD-HHMMSS[-ffffff-xxxx] stem, or None"""
+    match = NAMED_FILE_PATTERN.match(stem)
+    return (match.group(1), match.group(2)) if match else None
+
+def context_group_name(filename):
+    """Workspace or context name a context file belongs to, or None if unrecognised
+
+    Handles context-YYYY-MM-DD-HHMMSS-workspace.md and [context-name]-YYYY-MM-DD-HHMMSS.md,
+    with or without the -ffffff-xxxx suffix of collision-free names
+    """
+    stem = filename[:-3] if filename.endswith('.md') else filename
+    match = WORKSPACE_CONTEXT_PATTERN.match(stem) or NAMED_FILE_PATTERN.match(stem)
+    return match.group(1) if match else None
+
+def unique_memory_name(prefix, tag='', suffix='.md', now=None):
+    """Filename with a sub-second timestamp and a random suffix
+
+    prefix + YYYY-MM-DD-HHMMSS-ffffff-xxxx + tag + suffix. Names still sort
+    chronologically and parse with parse_filename_timestamp.
+    """
+    now = now or datetime.now()
+    return f"{prefix}{now.strftime('%Y-%m-%d-%H%M%S-%f')}-{secrets.token_hex(2)}{tag}{suffix}"
+
+def create_exclusive(path, content):
+    """Create a file that must not already exist (raises FileExistsError if it does)"""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(content)
+    except BaseException:
+        os.unlink(path)
+        raise
+
+def create_memory_file(directory, prefix, content, tag='', suffix='.md'):
+    """Create a new memory file under a collision-free name; returns its path
+
+    The file is created with O_EXCL, so two writers can never share a name even
+    within the same microsecond: a taken name is simply retried with a new one.
+    content is the text, or a callable taking the chosen filename and returning it.
+    """
+    os.makedirs(directory, exist_ok=True)
+    for _ in range(UNIQUE_NAME_ATTEMPTS):
+        name = unique_memory_name(prefix, tag, suffix)
+        path = os.path.join(directory, name)
+        try:
+            create_exclusive(path, content(name) if callable(content) else content)
+        except FileExistsError:
+            continue
+        return path
+    raise FileExistsError(f"No free {prefix}* name in {directory} after {UNIQUE_NAME_ATTEMPTS} attempts")
+
+def _entry_timestamp(entry):
+    """Timestamp for a directory entry, falling back to mtime for irregular names"""
+    timestamp = parse_filename_timestamp(entry.name)
+    if timestamp is not None:
+        return timestamp, True
+    return datetime.fromtimestamp(entry.stat().st_mtime), False
+
+def iter_memory_files(directory, prefix='', suffix='.md', exclude_templates=False):
+    """Yield MemoryFile records for files in a memory directory
+
+    Uses a single os.scandir pass; only files whose names carry no timestamp are stat'ed.
+    """
+    try:
+        entries = os.scandir(directory)
+    except OSError:
+        return
+
+    with entries:
+        for entry in entries:
+            name = entry.name
+            if not name.startswith(prefix) or not name.endswith(suffix):
+                continue
+            if exclude_templates and 'template' in name.lower():
+                continue
+            try:
+                timestamp, from_name = _entry_timestamp(entry)
+            except OSError:
+                continue
+            yield MemoryFile(name, entry.path, timestamp, from_name)
+
+def list_memory_files(directory, prefix='', suffix='.md', since=None, newest_first=True,
+                      exclude_templates=False):
+    """List memory files, optionally filtered by a cutoff datetime and sorted by timestamp"""
+    files = [f for f in iter_memory_files(directory, prefix, suffix, exclude_templates)
+             if since is None or f.timestamp >= since]
+    files.sort(key=lambda f: (f.timestamp, f.name), reverse=newest_first)
+    return files
+
+def list_learnings(episodic_dir, since=None, newest_first=True, prefix='learning-'):
+    """List episodic learning files, filtered and sorted by their filename timestamp"""
+    return list_memory_files(episodic_dir, prefix=prefix, since=since,
+                             newest_first=newest_first, exclude_templates=True)
+
+def iter_memory_names(directory, prefix='', suffix='.md', exclude_templates=False):
+    """Stream matching filenames from a memory directory without stat'ing them"""
+    try:
+        entries = os.scandir(directory)
+    except OSError:
+        return
+
+    with entries:
+        for entry in entries:
+            name = entry.name
+            if not name.startswith(prefix) or not name.endswith(suffix):
+                continue
+            if exclude_templates and 'template' in name.lower():
+                continue
+            yield name
+
+def newest_memory_paths(directory, k, prefix='', suffix='.md', exclude_templates=False):
+    """Paths of the k newest memory files, newest first
+
+    CNS filenames sort chronologically, so this takes the k largest names from
+    the directory stream with heapq.nlargest: O(n log k) and no full name list.
+    """
+    names = heapq.nlargest(k, iter_memory_names(directory, prefix, suffix, exclude_templates))
+    return [os.path.join(directory, name) for name in names]
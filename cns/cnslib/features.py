@@ -0,0 +1,223 @@
+"""
+CNS Learning Feature Store
+Compact columnar storage for per-learning feature counts, appended incrementally as
+learnings are ingested so analytics can aggregate the whole history without
+re-parsing markdown
+"""
+
+import os
+import json
+from array import array
+from bisect import bisect_left
+from datetime import datetime
+
+from cnslib.storage import locked, write_atomic
+
+FEATURE_STORE_VERSION = 1
+
+def get_feature_store_path(cns_path):
+    """Location of the feature store inside a CNS installation"""
+    return os.path.join(cns_path, "cns", "memory", "features")
+
+class FeatureTable:
+    """One feature family stored as fixed-width uint32 rows plus row keys and timestamps
+
+    Files per family (in the store directory):
+      <family>.meta.json  - columns, committed row count, ordering flag
+      <family>.keys       - one learning filename per line
+      <family>.ts         - float64 epoch timestamps, one per row
+      <family>.bin        - uint32 values, row-major (rows x columns)
+
+    The meta file is replaced atomically after data is appended, so rows written
+    by an interrupted flush are ignored on the next load. `signature` names what
+    the values were computed with (e.g. a vocabulary digest); like a column
+    change, a different signature invalidates the family.
+    """
+
+    def __init__(self, store_dir, family, columns, signature=None):
+        self.store_dir = store_dir
+        self.family = family
+        self.columns = list(columns)
+        self.signature = signature
+        self.keys = []
+        self.timestamps = array('d')
+        self.values = array('I')
+        self.sorted = True
+        self._key_rows = {}
+        self._pending = 0
+        self._load()
+
+    def _path(self, suffix):
+        return os.path.join(self.store_dir, f"{self.family}.{suffix}")
+
+    def _load(self):
+        """Load committed rows; a column change invalidates the family"""
+        try:
+            with open(self._path('meta.json'), 'r') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        if not self._matches(meta):
+            return
+
+        rows = meta.get('rows', 0)
+        width = len(self.columns)
+        try:
+            with open(self._path('keys'), 'r') as f:
+                keys = f.read().split('\n')[:rows]
+            timestamps = array('d')
+            with open(self._path('ts'), 'rb') as f:
+                timestamps.frombytes(f.read(rows * timestamps.itemsize))
+            values = array('I')
+            with open(self._path('bin'), 'rb') as f:
+                values.frombytes(f.read(rows * width * values.itemsize))
+        except (OSError, ValueError):
+            return
+
+        if len(keys) != rows or len(timestamps) != rows or len(values) != rows * width:
+            return
+
+        self.keys = keys
+        self.timestamps = timestamps
+        self.values = values
+        self.sorted = meta.get('sorted', True)
+        self._key_rows = {key: i for i, key in enumerate(keys)}
+
+    def _matches(self, meta):
+        return (meta.get('version') == FEATURE_STORE_VERSION and meta.get('columns') == self.columns
+                and meta.get('signature') == self.signature)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self._key_rows
+
+    def append(self, key, timestamp, values):
+        """Buffer one row; values is a sequence aligned with self.columns"""
+        if key in self._key_rows:
+            return False
+        if len(values) != len(self.columns):
+            raise ValueError(f"{self.family}: expected {len(self.columns)} values, got {len(values)}")
+
+        epoch = timestamp.timestamp() if isinstance(timestamp, datetime) else float(timestamp)
+        if self.timestamps and epoch < self.timestamps[-1]:
+            self.sorted = False
+
+        self._key_rows[key] = len(self.keys)
+        self.keys.append(key)
+        self.timestamps.append(epoch)
+        self.values.extend(values)
+        self._pending += 1
+        return True
+
+    def flush(self):
+        """Append buffered rows to disk and commit the new row count"""
+        if not self._pending:
+            return
+        os.makedirs(self.store_dir, exist_ok=True)
+        with locked(self._path('meta.json')):
+            self._flush_locked()
+        self._pending = 0
+
+    def _flush_locked(self):
+        """Write pending rows; the caller holds the family lock so concurrent flushes cannot interleave"""
+        first = len(self.keys) - self._pending
+        width = len(self.columns)
+        committed = self._committed_rows()
+        if committed != first or first == 0:
+            # Files are out of step with memory, or hold only rows of an invalidated
+            # family (new family, column or signature change): rewrite
+            first = 0
+            modes = 'w', 'wb'
+        else:
+            modes = 'a', 'ab'
+
+        with open(self._path('keys'), modes[0]) as f:
+            f.write(''.join(key + '\n' for key in self.keys[first:]))
+        with open(self._path('ts'), modes[1]) as f:
+            self.timestamps[first:].tofile(f)
+        with open(self._path('bin'), modes[1]) as f:
+            self.values[first * width:].tofile(f)
+
+        meta = {
+            'version': FEATURE_STORE_VERSION,
+            'columns': self.columns,
+            'rows': len(self.keys),
+            'sorted': self.sorted,
+            'signature': self.signature
+        }
+        write_atomic(self._path('meta.json'), json.dumps(meta))
+
+    def _committed_rows(self):
+        try:
+            with open(self._path('meta.json'), 'r') as f:
+                meta = json.load(f)
+            if self._matches(meta):
+                return meta.get('rows', 0)
+        except (OSError, ValueError):
+            pass
+        return 0
+
+    def row(self, key):
+        """Feature values for one learning as a column -> value dict, or None"""
+        index = self._key_rows.get(key)
+        if index is None:
+            return None
+        width = len(self.columns)
+        return dict(zip(self.columns, self.values[index * width:(index + 1) * width]))
+
+    def row_numbers(self, keys):
+        """Row numbers of the given learnings that are stored, in the order given"""
+        return [self._key_rows[key] for key in keys if key in self._key_rows]
+
+    def _start_row(self, since):
+        if since is None:
+            return 0
+        epoch = since.timestamp() if isinstance(since, datetime) else float(since)
+        return bisect_left(self.timestamps, epoch)
+
+    def column(self, name, since=None, rows=None):
+        """All values of one column as an array
+
+        Optionally only rows at or after `since`, or only the given row numbers
+        (from row_numbers), in their order.
+        """
+        col = self.columns.index(name)
+        width = len(self.columns)
+        if rows is not None:
+            return array('I', (self.values[row * width + col] for row in rows))
+        if since is None or self.sorted:
+            return self.values[self._start_row(since) * width + col::width]
+        epoch = since.timestamp() if isinstance(since, datetime) else float(since)
+        return array('I', (v for v, t in zip(self.values[col::width], self.timestamps) if t >= epoch))
+
+    def sums(self, since=None, rows=None):
+        """Column totals across the stored history (or `since` / the given rows)"""
+        return {name: sum(self.column(name, since, rows)) for name in self.columns}
+
+    def count_at_least(self, threshold, since=None):
+        """Per column, the number of rows whose value is >= threshold"""
+        return {name: sum(1 for v in self.column(name, since) if v >= threshold)
+                for name in self.columns}
+
+def load_table_summaries(store_dir):
+    """Row counts and column totals for every family in a store (for health reporting)"""
+    summaries = {}
+    if not os.path.isdir(store_dir):
+        return summaries
+
+    for filename in sorted(os.listdir(store_dir)):
+        if not filename.endswith('.meta.json'):
+            continue
+        family = filename[:-len('.meta.json')]
+        try:
+            with open(os.path.join(store_dir, filename), 'r') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            continue
+        table = FeatureTable(store_dir, family, meta.get('columns', []), meta.get('signature'))
+        summaries[family] = {'rows': len(table), 'totals': table.sums()}
+
+    return summaries
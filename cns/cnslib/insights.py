@@ -0,0 +1,202 @@
+"""
+CNS Learning Insights
+Feature extraction shared by learning capture and the brain analyzers (insight
+patterns, principle references, behavioral indicator counts), and per-learning
+sidecar records that store the extracted features once, at ingest
+"""
+
+import os
+import json
+from datetime import datetime
+
+from cnslib.sections import iter_headed_sections
+from cnslib.storage import append_text, update_file
+from cnslib.vocabulary import DEFAULT_VOCABULARY
+
+# Bump whenever extraction code changes (sections, classification, counting);
+# together with the vocabulary digest it forms the schema sidecars are written
+# under, and records of any other schema are ignored and re-extracted
+FEATURE_SCHEMA_VERSION = 1
+
+SIDECAR_DIR = 'sidecars'
+
+PATTERN_SECTIONS = ['what went well', 'what didn\'t work', 'what to do differently', 'key learning']
+
+def classify_insight_type(insight, vocabulary=DEFAULT_VOCABULARY):
+    """Classify the type of insight for pattern detection"""
+    return vocabulary.insight_type_matcher.first(insight, 'general')
+
+def find_principle_references(content, vocabulary=DEFAULT_VOCABULARY):
+    """Find references to principles in learning content"""
+    return vocabulary.principle_reference_matcher.categories_in(content)
+
+def scan_insight_type(insight, vocabulary=DEFAULT_VOCABULARY):
+    """Reference classify_insight_type: one any() scan per type"""
+    insight_lower = insight.lower()
+    for insight_type in vocabulary.insight_types[:-1]:
+        if any(word in insight_lower for word in vocabulary.vocabularies['insight_types'][insight_type]):
+            return insight_type
+    return 'general'
+
+def scan_principle_references(content, vocabulary=DEFAULT_VOCABULARY):
+    """Reference find_principle_references: one substring search per keyword"""
+    references = []
+    content_lower = content.lower()
+    for keyword in vocabulary.principle_keywords:
+        if keyword in content_lower:
+            references.append(keyword)
+    return references
+
+# Inputs where a matcher could drift from the reference scans: keywords inside
+# other words ('pr' in 'process', 'ci' in 'precision'), several categories in one
+# text (priority order decides), mixed case, and texts matching nothing
+MATCHER_EDGE_CASES = [
+    "", "UI", "nothing relevant here", "reprocessing",
+    "Process improvements for the interface", "The design of the startup workflow",
+    "Loading memory context", "Precision merge of the CI changelog",
+    "context continuity vs. continuity of context",
+    "Self-Evaluation: the PR process changed; change hygiene and commit hygiene",
+    "Startup output display: loading memory for the interface design",
+    "SECRETS and Security: safety first in the JIRA integration"
+]
+
+def check_keyword_matchers(insights, contents, vocabulary=DEFAULT_VOCABULARY):
+    """Inputs on which the compiled matchers disagree with the reference scans"""
+    mismatches = [('insight_type', text) for text in insights
+                  if classify_insight_type(text, vocabulary) != scan_insight_type(text, vocabulary)]
+    mismatches.extend(('principle_references', text) for text in contents
+                      if find_principle_references(text, vocabulary) != scan_principle_references(text, vocabulary))
+    return mismatches
+
+def extract_patterns_from_content(content, vocabulary=DEFAULT_VOCABULARY):
+    """Extract key patterns and insights from learning content"""
+    patterns = []
+
+    # Locate '# '/'## ' headers by offset and split only the sections of interest
+    for header, body_start, body_end in iter_headed_sections(content):
+        current_section = header.replace('#', '').strip().lower()
+        if current_section not in PATTERN_SECTIONS:
+            continue
+
+        for line in content[body_start:body_end].split('\n'):
+            line = line.strip()
+            if line.startswith('- ') or line.startswith('* '):
+                patterns.append({
+                    'section': current_section,
+                    'insight': line[2:].strip(),
+                    'type': classify_insight_type(line[2:].strip(), vocabulary)
+                })
+
+    return patterns
+
+def extract_behavior_counts(content, vocabulary=DEFAULT_VOCABULARY):
+    """Count behavioral indicators in learning content, keyed by the vocabulary's behavior columns"""
+
+    counts = {}
+    lower_lines = content.lower().split('\n')
+
+    # Pattern 1: Communication Style
+    for style, indicators in vocabulary.communication_indicators.items():
+        counts[f"communication:{style}"] = sum(1 for line in lower_lines for indicator in indicators if indicator in line)
+
+    # Pattern 2: Workflow Preferences
+    content_lower = content.lower()
+    for pattern_name, regex in vocabulary.workflow_patterns.items():
+        counts[f"workflow:{pattern_name}"] = len(regex.findall(content_lower))
+
+    # Pattern 3: Quality Standards
+    for standard, indicators in vocabulary.quality_indicators.items():
+        counts[f"quality:{standard}"] = sum(1 for line in lower_lines for indicator in indicators
+                                            if indicator.search(line))
+
+    return counts
+
+def extract_learning_features(content, vocabulary=DEFAULT_VOCABULARY):
+    """Every derived feature of one learning, as stored in its sidecar record"""
+    return {
+        'patterns': extract_patterns_from_content(content, vocabulary),
+        'principle_references': find_principle_references(content, vocabulary),
+        'behavior': extract_behavior_counts(content, vocabulary)
+    }
+
+def feature_schema(vocabulary=DEFAULT_VOCABULARY):
+    """Schema tag of features extracted with this code and vocabulary"""
+    return f"{FEATURE_SCHEMA_VERSION}:{vocabulary.digest[:16]}"
+
+def get_sidecar_dir(cns_path):
+    return os.path.join(cns_path, "cns", "memory", "features", SIDECAR_DIR)
+
+def _month(timestamp):
+    if isinstance(timestamp, datetime):
+        return timestamp.strftime('%Y-%m')
+    return str(timestamp)[:7]
+
+class LearningSidecars:
+    """Extracted features of each learning, one JSON line per learning
+
+    Files (in memory/features/sidecars/): YYYY-MM.jsonl, by the learning's
+    timestamp, so a 90-day window reads a handful of files rather than one per
+    learning. Capture appends a learning's record; analyzers backfill learnings
+    captured before sidecars existed, or under another schema (extraction code
+    or vocabulary), which also drops the stale lines of the months they rewrite.
+    """
+
+    def __init__(self, directory, vocabulary=DEFAULT_VOCABULARY):
+        self.directory = directory
+        self.schema = feature_schema(vocabulary)
+
+    def month_path(self, month):
+        return os.path.join(self.directory, f"{month}.jsonl")
+
+    def _line(self, name, features):
+        return json.dumps({'name': name, 'schema': self.schema, **features}) + '\n'
+
+    def _current_records(self, text):
+        """name -> record for the current-schema lines of a sidecar file (the last line for a name wins)"""
+        records = {}
+        for line in (text or '').splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # Torn by a crash
+            if isinstance(record, dict) and record.get('schema') == self.schema and 'name' in record:
+                records[record['name']] = record
+        return records
+
+    def append(self, name, timestamp, features):
+        """Record one learning's features at ingest"""
+        append_text(self.month_path(_month(timestamp)), self._line(name, features))
+
+    def load(self, since=None):
+        """name -> features for current-schema records (optionally only months from `since` on)"""
+        first_month = _month(since) if since is not None else ''
+        try:
+            filenames = sorted(f for f in os.listdir(self.directory) if f.endswith('.jsonl'))
+        except OSError:
+            return {}
+
+        features = {}
+        for filename in filenames:
+            if filename[:-len('.jsonl')] < first_month:
+                continue
+            try:
+                with open(os.path.join(self.directory, filename), 'r', encoding='utf-8', errors='replace') as f:
+                    features.update(self._current_records(f.read()))
+            except OSError:
+                continue
+        return features
+
+    def backfill(self, entries):
+        """Store features extracted by an analyzer; entries are (name, timestamp, features)"""
+        by_month = {}
+        for name, timestamp, features in entries:
+            by_month.setdefault(_month(timestamp), {})[name] = self._line(name, features)
+
+        for month, lines in by_month.items():
+            def merge(text, lines=lines):
+                # Keep only current records (a concurrent append is re-read on conflict)
+                kept = [json.dumps(record) + '\n' for name, record in self._current_records(text).items()
+                        if name not in lines]
+                return ''.join(kept + list(lines.values()))
+            os.makedirs(self.directory, exist_ok=True)
+            update_file(self.month_path(month), merge)
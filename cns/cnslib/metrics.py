@@ -0,0 +1,116 @@
+"""
+CNS Metrics Export
+Per-run maintenance metrics written in the Prometheus textfile-collector format and
+as JSON, so a local node_exporter-style collector can graph CNS performance, plus
+the startup latency startup-sequence.py records for the next export
+"""
+
+import os
+import json
+import math
+import time
+from datetime import datetime
+
+from cnslib.storage import write_atomic
+
+METRICS_DIR = 'metrics'
+PROMETHEUS_FILE = 'cns.prom'
+JSON_FILE = 'cns.json'
+STARTUP_FILE = 'startup.json'
+
+# Export directory override, e.g. node_exporter's --collector.textfile.directory
+METRICS_DIR_ENV = 'CNS_METRICS_DIR'
+
+METRIC_PREFIX = 'cns'
+
+def get_metrics_dir(cns_path):
+    """Where metrics are exported: CNS_METRICS_DIR, or memory/metrics"""
+    return os.environ.get(METRICS_DIR_ENV) or os.path.join(cns_path, "cns", "memory", METRICS_DIR)
+
+def _escape(text, quote=False):
+    text = str(text).replace('\\', '\\\\').replace('\n', '\\n')
+    return text.replace('"', '\\"') if quote else text
+
+def _format_value(value):
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, int):
+        return str(value)
+    value = float(value)
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(value)
+
+class MetricSet:
+    """Metric families in the order first added, each with labelled samples
+
+    Names are given without the 'cns_' prefix. Samples whose value is None
+    (nothing measured this run) are left out rather than exported as zero.
+    """
+
+    def __init__(self, prefix=METRIC_PREFIX):
+        self.prefix = prefix
+        self.families = {}
+
+    def add(self, name, value, help_text, labels=None, kind='gauge'):
+        if value is None:
+            return
+        family = self.families.setdefault(name, {'help': help_text, 'type': kind, 'samples': []})
+        family['samples'].append((dict(labels or {}), value))
+
+    def to_prometheus(self):
+        """Text exposition format, as read by node_exporter's textfile collector"""
+        lines = []
+        for name, family in self.families.items():
+            metric = f"{self.prefix}_{name}"
+            lines.append(f"# HELP {metric} {_escape(family['help'])}")
+            lines.append(f"# TYPE {metric} {family['type']}")
+            for labels, value in family['samples']:
+                label_text = ','.join(f'{key}="{_escape(label, quote=True)}"' for key, label in labels.items())
+                lines.append(f"{metric}{{{label_text}}} {_format_value(value)}" if label_text
+                             else f"{metric} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+    def as_dict(self):
+        return {f"{self.prefix}_{name}": {'help': family['help'],
+                                          'type': family['type'],
+                                          'samples': [{'labels': labels, 'value': value}
+                                                      for labels, value in family['samples']]}
+                for name, family in self.families.items()}
+
+def write_metrics(directory, metrics, details=None):
+    """Write cns.prom and cns.json (metrics plus `details`) atomically; returns both paths
+
+    The collector only reads *.prom files, so the temporary and lock files
+    written next to them are never picked up half-written.
+    """
+    prometheus_path = os.path.join(directory, PROMETHEUS_FILE)
+    json_path = os.path.join(directory, JSON_FILE)
+    write_atomic(json_path, json.dumps({**(details or {}), 'metrics': metrics.as_dict()}, indent=2, default=str))
+    write_atomic(prometheus_path, metrics.to_prometheus())
+    return prometheus_path, json_path
+
+def get_startup_path(cns_path):
+    return os.path.join(cns_path, "cns", "memory", METRICS_DIR, STARTUP_FILE)
+
+def record_startup_latency(cns_path, seconds):
+    """Remember the latest startup's latency for the next metrics export (best effort)"""
+    try:
+        write_atomic(get_startup_path(cns_path), json.dumps({
+            'seconds': round(seconds, 6),
+            'timestamp': time.time(),
+            'recorded': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }))
+    except OSError:
+        pass  # Startup must not fail on a read-only installation
+
+def load_startup_latency(cns_path):
+    """{'seconds', 'timestamp', 'recorded'} of the latest startup, or None"""
+    try:
+        with open(get_startup_path(cns_path), 'r') as f:
+            latency = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return latency if isinstance(latency, dict) and 'seconds' in latency else None
@@ -0,0 +1,45 @@
+"""
+CNS Parallel File Parsing
+Fans per-file parsing out across CPU cores in chunked batches
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+DEFAULT_CHUNK_SIZE = 256
+
+def default_worker_count():
+    """Worker processes to use: CNS_WORKERS if set, otherwise one per CPU"""
+    configured = os.environ.get('CNS_WORKERS')
+    if configured:
+        try:
+            return max(1, int(configured))
+        except ValueError:
+            pass
+    return os.cpu_count() or 1
+
+def _parse_chunk(parse_item, chunk):
+    return [parse_item(item) for item in chunk]
+
+def parse_in_parallel(parse_item, items, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Apply parse_item to every item and return the non-None results in input order
+
+    parse_item must be a module-level function (it is pickled to worker processes).
+    Small inputs, or workers=1, are parsed in-process to avoid pool start-up cost.
+    """
+    items = list(items)
+    if workers is None:
+        workers = default_worker_count()
+    workers = min(workers, max(1, len(items) // chunk_size))
+
+    if workers <= 1:
+        results = _parse_chunk(parse_item, items)
+    else:
+        chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+        results = []
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for batch in executor.map(_parse_chunk, repeat(parse_item), chunks):
+                results.extend(batch)
+
+    return [result for result in results if result is not None]
@@ -0,0 +1,188 @@
+"""
+CNS Script Result Protocol
+JSON-lines result channel from the brain scripts to update-cns.py: phase status,
+counters, timings and files written travel on a dedicated file descriptor while
+stdout streams human-readable progress
+"""
+
+import os
+import json
+import time
+import threading
+import subprocess
+from collections import namedtuple
+
+from cnslib.budget import DEADLINE_ENV
+
+# Set by the launching process to the write end of the result pipe
+RESULT_FD_ENV = 'CNS_RESULT_FD'
+
+# timed_out: killed after ignoring the stop request; stopped: asked to stop at its time budget
+ScriptRun = namedtuple('ScriptRun', ['returncode', 'stdout', 'stderr', 'events', 'timed_out', 'stopped'])
+
+# Seconds a script gets to wrap up after the stop request before it is killed
+DEFAULT_STOP_GRACE = 30
+
+class ResultChannel:
+    """Emits result events as JSON lines; a no-op when the script runs standalone
+
+    Event records carry an 'event' field:
+      counter - {'name', 'value'}
+      file    - {'path', 'action'} for each file created, updated or deleted
+      result  - final {'phase', 'status', 'duration', 'counters', 'files'}
+    """
+
+    def __init__(self, phase, stream=None):
+        self.phase = phase
+        self.stream = stream
+        self.counters = {}
+        self.files = []
+        self.status = None
+        self._started = time.monotonic()
+
+    @classmethod
+    def from_environment(cls, phase):
+        """Channel on the descriptor named by CNS_RESULT_FD, if the launcher provided one"""
+        fd = os.environ.get(RESULT_FD_ENV)
+        if fd:
+            try:
+                return cls(phase, os.fdopen(int(fd), 'w', buffering=1))
+            except (OSError, ValueError):
+                pass
+        return cls(phase)
+
+    def emit(self, event, **fields):
+        if self.stream is None:
+            return
+        try:
+            self.stream.write(json.dumps({'event': event, **fields}, default=str) + '\n')
+        except (OSError, ValueError):
+            self.stream = None  # Launcher went away; keep running without a channel
+
+    def count(self, name, value):
+        """Record a counter value"""
+        self.counters[name] = value
+        self.emit('counter', name=name, value=value)
+
+    def file_written(self, path, action='updated'):
+        """Record a file the script created, updated or deleted"""
+        self.files.append({'path': path, 'action': action})
+        self.emit('file', path=path, action=action)
+
+    def finish(self, status='success', **fields):
+        """Emit the final result record and close the channel"""
+        if self.status is not None:
+            return
+        self.status = status
+        self.emit('result', phase=self.phase, status=status,
+                  duration=round(time.monotonic() - self._started, 4),
+                  counters=self.counters, files=self.files, **fields)
+        if self.stream is not None:
+            try:
+                self.stream.close()
+            except OSError:
+                pass
+            self.stream = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and not issubclass(exc_type, SystemExit):
+            self.finish('failed', error=f"{exc_type.__name__}: {exc}")
+        else:
+            self.finish()
+        return False
+
+def _read_events(read_fd, events):
+    with os.fdopen(read_fd, 'r') as f:
+        for line in f:
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                continue
+
+def _read_all(stream, chunks):
+    chunks.append(stream.read())
+
+def run_with_result_channel(cmd, cwd=None, timeout=None, on_output=None, budget=None,
+                           grace=DEFAULT_STOP_GRACE):
+    """Run a script with a result pipe, streaming each stdout line to on_output
+
+    The time limit (timeout seconds, or what is left of a cnslib.budget Budget) is
+    passed on as CNS_PHASE_DEADLINE. When it runs out, or the budget is cancelled,
+    the script gets SIGTERM (scripts using cnslib.budget stop there and report
+    partial results) and `grace` seconds to finish before SIGKILL.
+
+    Returns ScriptRun(returncode, stdout, stderr, events, timed_out, stopped);
+    events are the decoded result records in the order the script emitted them.
+    """
+    if timeout is None and budget is not None:
+        timeout = budget.remaining()
+    deadline = time.monotonic() + timeout if timeout is not None else None
+
+    read_fd, write_fd = os.pipe()
+    env = dict(os.environ, **{RESULT_FD_ENV: str(write_fd), 'PYTHONUNBUFFERED': '1'})
+    if timeout is not None:
+        env[DEADLINE_ENV] = repr(time.time() + timeout)
+    try:
+        process = subprocess.Popen(cmd, cwd=cwd, env=env, pass_fds=(write_fd,),
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    except OSError:
+        os.close(read_fd)
+        raise
+    finally:
+        os.close(write_fd)
+
+    events = []
+    stderr_chunks = []
+    readers = [threading.Thread(target=_read_events, args=(read_fd, events), daemon=True),
+               threading.Thread(target=_read_all, args=(process.stderr, stderr_chunks), daemon=True)]
+    for reader in readers:
+        reader.start()
+
+    finished = threading.Event()
+    stopped = threading.Event()
+    timed_out = threading.Event()
+    def watch():
+        # Stop request at the deadline or on cancellation, SIGKILL once the grace period ends
+        while not finished.is_set():
+            remaining = deadline - time.monotonic() if deadline is not None else None
+            if (budget is not None and budget.cancelled) or (remaining is not None and remaining <= 0):
+                break
+            finished.wait(0.2 if remaining is None else min(0.2, remaining))
+        else:
+            return
+        stopped.set()
+        process.terminate()
+        if not finished.wait(grace):
+            timed_out.set()
+            process.kill()
+    watcher = None
+    if deadline is not None or budget is not None:
+        watcher = threading.Thread(target=watch, daemon=True)
+        watcher.start()
+
+    stdout_lines = []
+    try:
+        for line in process.stdout:
+            stdout_lines.append(line)
+            if on_output:
+                on_output(line.rstrip('\n'))
+        process.wait()
+    finally:
+        finished.set()
+        if watcher:
+            watcher.join()
+        for reader in readers:
+            reader.join()
+
+    return ScriptRun(process.returncode, ''.join(stdout_lines), ''.join(stderr_chunks),
+                     events, timed_out.is_set(), stopped.is_set())
+
+def final_result(events):
+    """The 'result' record from a list of events, or None if the script sent none"""
+    for event in reversed(events):
+        if event.get('event') == 'result':
+            return event
+    return None
@@ -0,0 +1,251 @@
+"""
+CNS Memory Retention
+Applies age, count and per-workspace retention policies to context and episodic
+memory, compacting old learnings into monthly digests so directory sizes and scan
+costs stay bounded
+"""
+
+import os
+import json
+import heapq
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from cnslib.dirstats import DirectoryStats
+from cnslib.episodic import context_group_name, iter_memory_files
+from cnslib.storage import locked
+
+# keep_per_group: newest files kept per group (None = no count limit)
+# max_age_days: files older than this are acted on (None = no age limit)
+# action: 'delete' removes files, 'compact' moves them into monthly digests
+# group_overrides: per-group (workspace / context name) field overrides
+# enabled: False = only report what the policy would act on (dry run)
+RetentionPolicy = namedtuple('RetentionPolicy', [
+    'name', 'subdir', 'prefix', 'keep_per_group', 'max_age_days', 'action', 'group_overrides', 'enabled'
+], defaults=(True,))
+
+DEFAULT_POLICIES = {
+    # One rule for every context file, whatever wrote it (the startup limit of 3 per context name)
+    'contexts': RetentionPolicy('contexts', 'context', '', 3, None, 'delete', {}),
+    # Learnings stay individually addressable well past the 90-day evaluation window;
+    # compaction removes the original files, so it is off until retention.json enables it
+    'learnings': RetentionPolicy('learnings', 'episodic', 'learning-', None, 180, 'compact', {}, False)
+}
+
+RETENTION_CONFIG_FILE = 'retention.json'
+ARCHIVE_DIR = 'archive'
+ARCHIVE_INDEX = 'index.jsonl'
+
+# expired: names of the files the policy selected (acted on unless dry_run)
+RetentionReport = namedtuple('RetentionReport', ['policy', 'scanned', 'expired', 'deleted', 'compacted',
+                                                 'digests', 'dry_run'])
+
+def get_memory_path(cns_path):
+    return os.path.join(cns_path, "cns", "memory")
+
+def load_retention_policies(cns_path):
+    """Default policies merged with overrides from memory/retention.json
+
+    Example retention.json:
+      {"learnings": {"enabled": true, "max_age_days": 365},
+       "contexts": {"keep_per_group": 3, "group_overrides": {"my-repo": {"keep_per_group": 10}}}}
+    """
+    policies = dict(DEFAULT_POLICIES)
+    try:
+        with open(os.path.join(get_memory_path(cns_path), RETENTION_CONFIG_FILE), 'r') as f:
+            config = json.load(f)
+    except (OSError, ValueError):
+        return policies
+
+    for name, overrides in config.items():
+        if name in policies and isinstance(overrides, dict):
+            fields = {k: v for k, v in overrides.items() if k in RetentionPolicy._fields and k != 'name'}
+            policies[name] = policies[name]._replace(**fields)
+    return policies
+
+def _group_setting(policy, group, field):
+    return policy.group_overrides.get(group, {}).get(field, getattr(policy, field))
+
+def select_expired(policy, memory_files, now=None):
+    """Files a policy acts on: beyond its per-group count or older than its age limit"""
+    now = now or datetime.now()
+    groups = {}
+    for memory_file in memory_files:
+        if policy.subdir == 'context':
+            group = context_group_name(memory_file.name)
+            if group is None:
+                continue  # Never touch files that are not recognisable context snapshots
+        else:
+            group = None
+        groups.setdefault(group, []).append(memory_file)
+
+    expired = []
+    for group, files in groups.items():
+        keep = _group_setting(policy, group, 'keep_per_group')
+        max_age = _group_setting(policy, group, 'max_age_days')
+        kept = set(files) if keep is None else set(heapq.nlargest(keep, files, key=lambda f: (f.timestamp, f.name)))
+        cutoff = now - timedelta(days=max_age) if max_age is not None else None
+        expired.extend(f for f in files if f not in kept or (cutoff is not None and f.timestamp < cutoff))
+
+    expired.sort(key=lambda f: (f.timestamp, f.name))
+    return expired
+
+def _archive_path(directory, name=''):
+    return os.path.join(directory, ARCHIVE_DIR, name)
+
+def _indexed_records(directory):
+    records = {}
+    try:
+        with open(_archive_path(directory, ARCHIVE_INDEX), 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    records[record['name']] = record
+                except (ValueError, KeyError, TypeError):
+                    continue
+    except OSError:
+        pass
+    return records
+
+def _archived_intact(directory, record, memory_file):
+    """True if the digest holds exactly the file's content at the indexed offset"""
+    try:
+        with open(memory_file.path, 'rb') as f:
+            content = f.read().rstrip(b'\n')
+        with open(_archive_path(directory, record['digest']), 'rb') as f:
+            f.seek(record['offset'])
+            return f.read(record['length']) == content
+    except (OSError, KeyError, TypeError, ValueError):
+        return False
+
+def compact_into_digests(directory, memory_files):
+    """Append files to monthly digests, index them, then delete the originals
+
+    Each learning becomes a section of archive/digest-YYYY-MM.md and one record in
+    archive/index.jsonl (name, timestamp, title, digest, byte offset and length).
+    Files already indexed by an interrupted run are only deleted. A file is
+    deleted only once its digest section reads back byte for byte. Concurrent
+    compactions of the same directory take turns on the index lock.
+    """
+    os.makedirs(_archive_path(directory), exist_ok=True)
+    with locked(_archive_path(directory, ARCHIVE_INDEX)):
+        return _compact_locked(directory, memory_files)
+
+def _compact_locked(directory, memory_files):
+    indexed = _indexed_records(directory)
+    digests = set()
+    compacted = 0
+
+    by_month = {}
+    for memory_file in memory_files:
+        by_month.setdefault(memory_file.timestamp.strftime('%Y-%m'), []).append(memory_file)
+
+    with open(_archive_path(directory, ARCHIVE_INDEX), 'a') as index:
+        for month, files in sorted(by_month.items()):
+            digest_name = f"digest-{month}.md"
+            digest_path = _archive_path(directory, digest_name)
+            pending = [f for f in files if f.name not in indexed]
+            records = []
+
+            if pending:
+                is_new = not os.path.exists(digest_path)
+                with open(digest_path, 'ab') as digest:
+                    if is_new:
+                        digest.write(f"# Learning Digest {month}\n\n".encode('utf-8'))
+                    for memory_file in pending:
+                        try:
+                            with open(memory_file.path, 'rb') as f:
+                                content = f.read().rstrip(b'\n')
+                        except OSError:
+                            continue
+                        header = f"---\n<!-- {memory_file.name} -->\n".encode('utf-8')
+                        offset = digest.tell() + len(header)
+                        digest.write(header + content + b'\n\n')
+                        title = content.split(b'\n', 1)[0].decode('utf-8', errors='replace').lstrip('# ').strip()
+                        records.append({'name': memory_file.name,
+                                        'timestamp': memory_file.timestamp.isoformat(),
+                                        'title': title,
+                                        'digest': digest_name,
+                                        'offset': offset,
+                                        'length': len(content)})
+                    digest.flush()
+                    os.fsync(digest.fileno())
+                digests.add(digest_name)
+
+            # Index only after the digest is durable, and delete only after indexing
+            index.write(''.join(json.dumps(record) + '\n' for record in records))
+            index.flush()
+            os.fsync(index.fileno())
+            indexed.update((record['name'], record) for record in records)
+
+            for memory_file in files:
+                record = indexed.get(memory_file.name)
+                if record is not None and _archived_intact(directory, record, memory_file):
+                    try:
+                        os.remove(memory_file.path)
+                        compacted += 1
+                    except OSError:
+                        pass
+
+    return compacted, sorted(digests)
+
+def apply_policy(cns_path, policy, now=None, dry_run=False):
+    """Apply one retention policy; returns a RetentionReport
+
+    A disabled policy runs as a dry run: it reports what it would act on.
+    """
+    directory = os.path.join(get_memory_path(cns_path), policy.subdir)
+    memory_files = list(iter_memory_files(directory, prefix=policy.prefix, exclude_templates=True))
+    expired = select_expired(policy, memory_files, now)
+    expired_names = [memory_file.name for memory_file in expired]
+    dry_run = dry_run or not policy.enabled
+
+    if dry_run or not expired:
+        return RetentionReport(policy.name, len(memory_files), expired_names, [], 0, [], dry_run)
+
+    # Removals are subtracted from the cached directory statistics as they happen
+    with DirectoryStats(cns_path).tracking(policy.subdir) as changes:
+        entries = {}
+        for memory_file in expired:
+            try:
+                entries[memory_file.path] = changes.entry(memory_file.path)
+            except OSError:
+                continue
+
+        if policy.action == 'compact':
+            compacted, digests = compact_into_digests(directory, expired)
+            report = RetentionReport(policy.name, len(memory_files), expired_names, [], compacted, digests, False)
+        else:
+            deleted = []
+            for memory_file in expired:
+                try:
+                    os.remove(memory_file.path)
+                    deleted.append(memory_file.name)
+                except OSError as e:
+                    print(f"   Warning: Could not delete {memory_file.name}: {e}")
+            report = RetentionReport(policy.name, len(memory_files), expired_names, deleted, 0, [], False)
+
+        for path, entry in entries.items():
+            if not os.path.exists(path):
+                changes.removed(entry)
+    return report
+
+def apply_retention(cns_path, names=None, now=None, dry_run=False):
+    """Apply the configured retention policies (all, or only `names`)"""
+    policies = load_retention_policies(cns_path)
+    return [apply_policy(cns_path, policies[name], now, dry_run)
+            for name in (names or policies) if name in policies]
+
+def count_archived_learnings(episodic_dir):
+    """Number of learnings compacted into digests"""
+    try:
+        with open(_archive_path(episodic_dir, ARCHIVE_INDEX), 'rb') as f:
+            return sum(1 for _ in f)
+    except OSError:
+        return 0
+
+def read_archived_learning(episodic_dir, record):
+    """Original text of a compacted learning from its index record"""
+    with open(_archive_path(episodic_dir, record['digest']), 'rb') as f:
+        f.seek(record['offset'])
+        return f.read(record['length']).decode('utf-8', errors='replace')
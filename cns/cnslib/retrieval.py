@@ -0,0 +1,326 @@
+"""
+CNS Memory Retrieval Index
+BM25 inverted index over episodic learnings and semantic memory entries, kept in a
+local SQLite file and updated incrementally as learnings are captured
+"""
+
+import os
+import re
+import json
+import math
+import heapq
+import sqlite3
+from collections import Counter, namedtuple
+
+from cnslib.episodic import iter_memory_files, parse_filename_timestamp
+from cnslib.sections import parse_sections
+
+RETRIEVAL_INDEX_VERSION = 1
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9][a-z0-9_\-]*[a-z0-9]|[a-z0-9]')
+STOPWORDS = frozenset([
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'been', 'by', 'for', 'from', 'has', 'have',
+    'in', 'is', 'it', 'its', 'of', 'on', 'or', 'that', 'the', 'this', 'to', 'was', 'were',
+    'will', 'with', 'they', 'not', 'but', 'can', 'all', 'when', 'use', 'into'
+])
+
+# Workspace tag written by process-learning.py
+WORKSPACE_PATTERN = re.compile(r'^\*\*Workspace\*\*:[ \t]*(\S.*)$', re.M)
+
+# Sections whose text best summarizes a learning, in priority order
+SUMMARY_SECTIONS = ['## Summary', '## Learning Content', '## Key Learning', '## Context']
+
+Hit = namedtuple('Hit', ['doc_id', 'score', 'source', 'title', 'summary', 'path', 'timestamp', 'workspace'])
+Document = namedtuple('Document', ['doc_id', 'source', 'path', 'title', 'summary', 'timestamp', 'workspace', 'text'])
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS docs (
+    doc_id TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    path TEXT,
+    title TEXT,
+    summary TEXT,
+    timestamp REAL,
+    workspace TEXT,
+    length INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS docs_workspace_time ON docs (workspace, timestamp);
+CREATE INDEX IF NOT EXISTS docs_source_time ON docs (source, timestamp);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    doc_id TEXT NOT NULL,
+    tf INTEGER NOT NULL,
+    PRIMARY KEY (term, doc_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc_id);
+"""
+
+def get_index_path(cns_path):
+    """Location of the retrieval index inside a CNS installation"""
+    return os.path.join(cns_path, "cns", "memory", "index", "retrieval.sqlite3")
+
+def tokenize(text):
+    """Lowercased index terms of a text, stopwords removed"""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+def _flatten(lines):
+    text = ' '.join(line.strip() for line in lines
+                    if line.strip() and line.strip() != '---' and not line.strip().startswith('**'))
+    return ' '.join(text.replace('**', '').split())
+
+def learning_document(path, text=None):
+    """Document for one episodic learning file (None if unreadable)"""
+    name = os.path.basename(path)
+    if text is None:
+        try:
+            with open(path, 'r') as f:
+                text = f.read()
+        except OSError:
+            return None
+
+    parsed = parse_sections(text)
+    summary = ''
+    for header in SUMMARY_SECTIONS:
+        summary = _flatten(parsed.sections.get(header, []))
+        if summary:
+            break
+    if not summary:
+        summary = _flatten(line for line in text.split('\n')[1:] if not line.startswith('#'))
+
+    timestamp = parse_filename_timestamp(name)
+    workspace = WORKSPACE_PATTERN.search(text)
+    return Document(name, 'episodic', path, parsed.title.lstrip('# ').strip(), summary[:300],
+                    timestamp.timestamp() if timestamp else None,
+                    workspace.group(1).strip() if workspace else None, text)
+
+class RetrievalIndex:
+    """BM25 index over CNS memory documents
+
+    Documents are keyed by doc_id (the learning filename, or 'semantic:...' for
+    semantic entries); adding an existing doc_id replaces it.
+    """
+
+    def __init__(self, index_path):
+        self.index_path = index_path
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        self.db = sqlite3.connect(index_path)
+        self.db.executescript(SCHEMA)
+        version = self.db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if version is None or int(version[0]) != RETRIEVAL_INDEX_VERSION:
+            self.clear()
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.db.commit()
+        self.close()
+        return False
+
+    def clear(self):
+        with self.db:
+            self.db.execute("DELETE FROM postings")
+            self.db.execute("DELETE FROM docs")
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (str(RETRIEVAL_INDEX_VERSION),))
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def __contains__(self, doc_id):
+        return self.db.execute("SELECT 1 FROM docs WHERE doc_id = ?", (doc_id,)).fetchone() is not None
+
+    def doc_ids(self, source=None):
+        """Set of indexed doc_ids, optionally for one source"""
+        if source is None:
+            rows = self.db.execute("SELECT doc_id FROM docs")
+        else:
+            rows = self.db.execute("SELECT doc_id FROM docs WHERE source = ?", (source,))
+        return {row[0] for row in rows}
+
+    def add(self, document, commit=True):
+        """Index (or re-index) one Document"""
+        terms = Counter(tokenize(document.text))
+        self.db.execute("DELETE FROM postings WHERE doc_id = ?", (document.doc_id,))
+        self.db.execute("INSERT OR REPLACE INTO docs VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (document.doc_id, document.source, document.path, document.title,
+                         document.summary, document.timestamp, document.workspace, sum(terms.values())))
+        self.db.executemany("INSERT INTO postings VALUES (?, ?, ?)",
+                            ((term, document.doc_id, tf) for term, tf in terms.items()))
+        if commit:
+            self.db.commit()
+
+    def remove(self, doc_id, commit=True):
+        self.db.execute("DELETE FROM postings WHERE doc_id = ?", (doc_id,))
+        self.db.execute("DELETE FROM docs WHERE doc_id = ?", (doc_id,))
+        if commit:
+            self.db.commit()
+
+    def set_path(self, doc_id, path):
+        self.db.execute("UPDATE docs SET path = ? WHERE doc_id = ?", (path, doc_id))
+
+    def _hits(self, scored, k):
+        top = heapq.nlargest(k, scored.items(), key=lambda item: item[1])
+        if not top:
+            return []
+        placeholders = ','.join('?' * len(top))
+        rows = {row[0]: row for row in self.db.execute(
+            f"SELECT doc_id, source, title, summary, path, timestamp, workspace FROM docs "
+            f"WHERE doc_id IN ({placeholders})", [doc_id for doc_id, _ in top])}
+        return [Hit(doc_id, round(score, 4), *rows[doc_id][1:]) for doc_id, score in top if doc_id in rows]
+
+    def query(self, text, k=5, source=None, workspace=None):
+        """The k documents ranked highest by BM25 for `text`, best first"""
+        terms = set(tokenize(text))
+        if not terms:
+            return []
+
+        count, average_length = self.db.execute("SELECT COUNT(*), AVG(length) FROM docs").fetchone()
+        if not count:
+            return []
+        average_length = average_length or 1
+
+        filters, params = [], []
+        if source is not None:
+            filters.append("d.source = ?")
+            params.append(source)
+        if workspace is not None:
+            filters.append("d.workspace = ?")
+            params.append(workspace)
+        where = (" AND " + " AND ".join(filters)) if filters else ""
+
+        scored = Counter()
+        for term in terms:
+            df = self.db.execute("SELECT COUNT(*) FROM postings WHERE term = ?", (term,)).fetchone()[0]
+            if not df:
+                continue
+            idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+            for doc_id, tf, length in self.db.execute(
+                    "SELECT p.doc_id, p.tf, d.length FROM postings p JOIN docs d ON d.doc_id = p.doc_id "
+                    "WHERE p.term = ?" + where, [term] + params):
+                norm = tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / average_length))
+                scored[doc_id] += idf * norm
+
+        return self._hits(scored, k)
+
+    def recent(self, k=5, source=None, workspace=None):
+        """The k newest documents, optionally for one source or workspace"""
+        filters, params = [], []
+        if source is not None:
+            filters.append("source = ?")
+            params.append(source)
+        if workspace is not None:
+            filters.append("workspace = ?")
+            params.append(workspace)
+        where = (" WHERE " + " AND ".join(filters)) if filters else ""
+        rows = self.db.execute(
+            "SELECT doc_id, source, title, summary, path, timestamp, workspace FROM docs"
+            + where + " ORDER BY timestamp DESC, doc_id DESC LIMIT ?", params + [k])
+        return [Hit(row[0], None, *row[1:]) for row in rows]
+
+def semantic_entry_document(path, timestamp, entry_text, name='best-practices'):
+    """Document for one dated semantic memory entry ('YYYY-MM-DD HH:MM:SS' timestamp)"""
+    parsed = parse_filename_timestamp(timestamp.replace(' ', '-').replace(':', ''))
+    body = [line for line in entry_text.split('\n') if not line.startswith('## ')]
+    return Document(f"semantic:{name}:{timestamp}", 'semantic', path, f"Critical Learning - {timestamp}",
+                    _flatten(body)[:300], parsed.timestamp() if parsed else None, None, entry_text)
+
+def semantic_documents(semantic_dir, name='best-practices', skip=frozenset()):
+    """Documents for the curated sections of a semantic file and the entries in its segments
+
+    Segment entries never change once written, so months whose entries are all
+    in `skip` (already-indexed doc_ids) are not read.
+    """
+    from cnslib.semantic import ENTRY_HEADER_PATTERN, SemanticMemory
+
+    memory = SemanticMemory(semantic_dir, name)
+    documents = []
+
+    curated = SemanticMemory.split_hot_text(memory.read_hot())[0]
+    for header, lines in parse_sections(curated).sections.items():
+        title = header[3:].strip()
+        documents.append(Document(f"semantic:{name}#{title}", 'semantic', memory.hot_path, title,
+                                  _flatten(lines)[:300], None, None, header + '\n' + '\n'.join(lines)))
+
+    prefix = f"semantic:{name}:"
+    indexed_per_month = Counter(doc_id[len(prefix):len(prefix) + 7] for doc_id in skip if doc_id.startswith(prefix))
+    for month, segment in memory.segments().items():
+        if indexed_per_month[month] >= segment['entries']:
+            continue
+        path = memory.segment_path(month)
+        text = memory.read_segment(month)
+        headers = list(ENTRY_HEADER_PATTERN.finditer(text))
+        for i, header in enumerate(headers):
+            end = headers[i + 1].start() if i + 1 < len(headers) else len(text)
+            document = semantic_entry_document(path, header.group(1), text[header.start():end], name)
+            if document.doc_id not in skip:
+                documents.append(document)
+    return documents
+
+def _archived_learnings(episodic_dir):
+    from cnslib.retention import ARCHIVE_DIR, ARCHIVE_INDEX
+    records = {}
+    try:
+        with open(os.path.join(episodic_dir, ARCHIVE_DIR, ARCHIVE_INDEX), 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    records[record['name']] = os.path.join(episodic_dir, ARCHIVE_DIR, record['digest'])
+                except (ValueError, KeyError):
+                    continue
+    except OSError:
+        pass
+    return records
+
+def sync_index(cns_path, index=None):
+    """Bring the index up to date with memory on disk; returns (added, removed)
+
+    New learnings are indexed; learnings compacted into digests keep their postings
+    and point at the digest; learnings that disappeared are dropped. Semantic
+    entries are indexed once; curated semantic sections are re-indexed each time.
+    """
+    own_index = index is None
+    index = index or RetrievalIndex(get_index_path(cns_path))
+    memory_path = os.path.join(cns_path, "cns", "memory")
+    episodic_dir = os.path.join(memory_path, "episodic")
+
+    indexed = index.doc_ids('episodic')
+    present = {f.name: f.path for f in iter_memory_files(episodic_dir, prefix='learning-', exclude_templates=True)}
+    added = removed = 0
+
+    with index.db:
+        for name in sorted(present.keys() - indexed):
+            document = learning_document(present[name])
+            if document is not None:
+                index.add(document, commit=False)
+                added += 1
+
+        missing = indexed - present.keys()
+        archived = _archived_learnings(episodic_dir) if missing else {}
+        for name in missing:
+            if name in archived:
+                index.set_path(name, archived[name])
+            else:
+                index.remove(name, commit=False)
+                removed += 1
+
+        # Curated sections are re-indexed every time (they are few and editable);
+        # dated entries only when new
+        semantic_ids = index.doc_ids('semantic')
+        stale_curated = {doc_id for doc_id in semantic_ids if '#' in doc_id}
+        for document in semantic_documents(os.path.join(memory_path, "semantic"), skip=semantic_ids - stale_curated):
+            index.add(document, commit=False)
+            stale_curated.discard(document.doc_id)
+        for doc_id in stale_curated:
+            index.remove(doc_id, commit=False)
+
+    if own_index:
+        index.close()
+    return added, removed
@@ -0,0 +1,134 @@
+"""
+CNS Markdown Section Reader
+Locates markdown sections and marker lines by offset, over a memory-mapped file or
+an in-memory string, and materializes only the slice that is needed; also provides a
+cached one-pass parse of every section for callers that need several of them
+"""
+
+import os
+import re
+import mmap
+from collections import namedtuple
+from contextlib import contextmanager
+from functools import lru_cache
+
+MarkdownSections = namedtuple('MarkdownSections', ['title', 'sections'])
+
+@contextmanager
+def mapped_file(path):
+    """Memory-map a file read-only; yields None for empty files"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield None
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield mm
+
+def _compile(pattern, buffer):
+    """Compile a str pattern for a str buffer, or its bytes form for bytes/mmap buffers"""
+    if isinstance(buffer, str):
+        return re.compile(pattern, re.M)
+    return re.compile(pattern.encode('utf-8'), re.M)
+
+def _decode(chunk):
+    return chunk if isinstance(chunk, str) else chunk.decode('utf-8', errors='replace')
+
+def section_span(buffer, header, stop_prefix='## ', indented_stop=False, start=0):
+    """Offsets (body_start, body_end) of the first section whose header line is `header`
+
+    The header line matches when it equals `header` after stripping whitespace. The
+    body runs until the next line starting with `stop_prefix` (after leading
+    whitespace too when indented_stop), or the end of the buffer.
+    """
+    header_match = _compile(r'^[ \t]*' + re.escape(header) + r'[ \t\r]*$', buffer).search(buffer, start)
+    if not header_match:
+        return None
+
+    body_start = header_match.end() + 1
+    indent = r'[ \t]*' if indented_stop else ''
+    stop_match = _compile(r'^' + indent + re.escape(stop_prefix), buffer).search(buffer, body_start)
+    body_end = stop_match.start() if stop_match else len(buffer)
+    return min(body_start, body_end), body_end
+
+def section_lines(buffer, header, stop_prefix='## ', indented_stop=False):
+    """Lines of the first `header` section (header excluded), or None if absent"""
+    span = section_span(buffer, header, stop_prefix, indented_stop)
+    if span is None:
+        return None
+    return _decode(buffer[span[0]:span[1]]).split('\n')
+
+def read_section_lines(path, header, stop_prefix='## ', indented_stop=False):
+    """section_lines() over a memory-mapped file"""
+    with mapped_file(path) as mm:
+        if mm is None:
+            return None
+        return section_lines(mm, header, stop_prefix, indented_stop)
+
+def read_sections(path, headers, stop_prefix='## ', indented_stop=False):
+    """Lines of several sections from one mapping, keyed by header (absent ones omitted)"""
+    sections = {}
+    with mapped_file(path) as mm:
+        if mm is None:
+            return sections
+        for header in headers:
+            lines = section_lines(mm, header, stop_prefix, indented_stop)
+            if lines is not None:
+                sections[header] = lines
+    return sections
+
+def iter_headed_sections(buffer, header_pattern=r'^[ \t]*#{1,2} [ \t]*\S.*$'):
+    """Yield (header_line, body_start, body_end) for each header matching header_pattern"""
+    previous = None
+    for match in _compile(header_pattern, buffer).finditer(buffer):
+        if previous is not None:
+            yield _decode(previous.group(0)).strip(), previous.end() + 1, match.start()
+        previous = match
+    if previous is not None:
+        yield _decode(previous.group(0)).strip(), previous.end() + 1, len(buffer)
+
+def file_contains(path, text):
+    """Whether a file contains `text`, without reading it into a string"""
+    with mapped_file(path) as mm:
+        if mm is None:
+            return text == ''
+        return mm.find(text.encode('utf-8')) != -1
+
+def parse_sections(text, header_prefix='## '):
+    """Split markdown into sections in one pass
+
+    Returns MarkdownSections(title, sections): the first line of the document and
+    a dict mapping each stripped header line (e.g. '## Summary') to its body lines.
+    A section runs until the next line starting with header_prefix, so deeper
+    headers stay in the body. A header repeated straight after its own section
+    continues it; a later repeat is ignored.
+    """
+    lines = text.split('\n')
+    sections = {}
+    current = None
+    current_header = None
+
+    for line in lines:
+        if line.startswith(header_prefix):
+            header = line.strip()
+            if header not in sections:
+                current = sections[header] = []
+            elif header != current_header:
+                current = None
+            current_header = header
+        elif current is not None:
+            current.append(line)
+
+    return MarkdownSections(lines[0] if lines else '', sections)
+
+@lru_cache(maxsize=256)
+def _parse_file_sections(path, mtime_ns, size, header_prefix):
+    with open(path, 'r') as f:
+        return parse_sections(f.read(), header_prefix)
+
+def read_markdown_sections(path, header_prefix='## '):
+    """parse_sections() for a file, cached per (path, mtime, size)
+
+    The result is shared between callers and must not be modified.
+    """
+    stat = os.stat(path)
+    return _parse_file_sections(path, stat.st_mtime_ns, stat.st_size, header_prefix)
@@ -0,0 +1,224 @@
+"""
+CNS Semantic Memory Segments
+Stores learnings added to a semantic file (best-practices.md) in rolling monthly
+segments with a manifest, keeping the file itself as a small hot summary: the
+curated content plus the most recent entries
+"""
+
+import os
+import re
+import json
+from datetime import datetime
+
+from cnslib.storage import locked, update_file, write_atomic
+
+SEMANTIC_MANIFEST_VERSION = 1
+HOT_RECENT_ENTRIES = 10
+SEGMENTS_DIR = 'segments'
+
+# Ids of the newest logged learnings added, kept in the manifest so a replayed
+# record is not added twice; older ids are looked up in their month's segment
+RECORD_IDS_KEPT = 1000
+RECORD_MARKER = '<!-- cns:record {} -->'
+
+# Everything after this line in the hot file is regenerated on each write
+RECENT_MARKER = '<!-- cns:recent-learnings - generated; older entries are in segments/ -->'
+ENTRY_HEADER_PATTERN = re.compile(r'^## Critical Learning - (\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})[ \t]*$', re.M)
+
+def format_entry(timestamp, content, source='User "Learn this:" command', record_id=None):
+    """One semantic memory entry in the markdown form process-learning has always written
+
+    An entry for a logged learning carries the record id in an HTML comment,
+    which does not show in rendered markdown.
+    """
+    marker = f"\n{RECORD_MARKER.format(record_id)}" if record_id else ''
+    return f"""
+## Critical Learning - {timestamp}
+**Source**: {source}{marker}
+
+{content}
+
+---
+"""
+
+class SemanticMemory:
+    """A semantic memory file split into a hot summary, monthly segments and a manifest
+
+    Files (for name 'best-practices' in the semantic directory):
+      best-practices.md                - curated content + the newest entries (hot summary)
+      best-practices.manifest.json     - segment list with entry counts, plus the newest entries
+      segments/best-practices-YYYY-MM.md - every entry, appended to its month's segment
+
+    A write appends one entry to the current segment and replaces the two small
+    files; earlier segments are never rewritten.
+    """
+
+    def __init__(self, semantic_dir, name='best-practices', hot_entries=HOT_RECENT_ENTRIES):
+        self.semantic_dir = semantic_dir
+        self.name = name
+        self.hot_entries = hot_entries
+        self.hot_path = os.path.join(semantic_dir, f"{name}.md")
+        self.manifest_path = os.path.join(semantic_dir, f"{name}.manifest.json")
+        self.segments_dir = os.path.join(semantic_dir, SEGMENTS_DIR)
+
+    def segment_path(self, month):
+        return os.path.join(self.segments_dir, f"{self.name}-{month}.md")
+
+    def load_manifest(self):
+        """The manifest, or None if this file has not been segmented yet"""
+        try:
+            with open(self.manifest_path, 'r') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return manifest if manifest.get('version') == SEMANTIC_MANIFEST_VERSION else None
+
+    def _read_hot(self):
+        try:
+            with open(self.hot_path, 'r') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    @staticmethod
+    def split_hot_text(text):
+        """(curated, entries) from hot-file text; entries are (timestamp, entry_text) pairs
+
+        The curated part ends at the generated-section marker, or, in a file that was
+        never segmented, at the first entry header.
+        """
+        marker_at = text.find(RECENT_MARKER)
+        if marker_at != -1:
+            curated, tail = text[:marker_at], text[marker_at + len(RECENT_MARKER):]
+        else:
+            first = ENTRY_HEADER_PATTERN.search(text)
+            curated, tail = (text[:first.start()], text[first.start():]) if first else (text, '')
+
+        entries = []
+        headers = list(ENTRY_HEADER_PATTERN.finditer(tail))
+        for i, header in enumerate(headers):
+            end = headers[i + 1].start() if i + 1 < len(headers) else len(tail)
+            body = tail[header.start():end].rstrip('\n')
+            entries.append((header.group(1), '\n' + body + '\n'))
+        return curated.rstrip('\n') + '\n', entries
+
+    @staticmethod
+    def _segment_contains(path, text, start=0):
+        try:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                f.seek(start)
+                return text in f.read()
+        except OSError:
+            return False
+
+    def _append_to_segment(self, manifest, month, entry_text, timestamp, record_id=None):
+        path = self.segment_path(month)
+        segment = manifest['segments'].get(month)
+        with locked(path):
+            # An add interrupted between this append and the manifest save left
+            # the entry past the segment's recorded size: count it, do not repeat it
+            committed = segment.get('bytes', 0) if segment else 0
+            if not (record_id and self._segment_contains(path, RECORD_MARKER.format(record_id), committed)):
+                is_new = not os.path.exists(path)
+                with open(path, 'a') as f:
+                    if is_new:
+                        f.write(f"# {self.name.replace('-', ' ').title()} - {month}\n")
+                    f.write(entry_text)
+                    f.flush()
+                    os.fsync(f.fileno())
+            size = os.path.getsize(path)
+
+        segment = manifest['segments'].setdefault(month, {'file': os.path.relpath(path, self.semantic_dir),
+                                                          'entries': 0, 'first': timestamp})
+        segment['entries'] += 1
+        segment['last'] = timestamp
+        segment['bytes'] = size
+
+    def _render_hot(self, text, manifest):
+        """Hot-file text: the curated part of `text` followed by the newest entries"""
+        curated = self.split_hot_text(text)[0] if text is not None else f"# {self.name.replace('-', ' ').title()}\n"
+        recent = manifest['recent']
+        older = sum(s['entries'] for s in manifest['segments'].values()) - len(recent)
+        parts = [curated, '\n', RECENT_MARKER, '\n']
+        parts.extend(entry['text'] for entry in recent)
+        if older > 0:
+            parts.append(f"\n**Older learnings**: {older} more in `{SEGMENTS_DIR}/` "
+                         f"(see `{os.path.basename(self.manifest_path)}`)\n")
+        return ''.join(parts)
+
+    def _save(self, manifest):
+        manifest['recent'] = manifest['recent'][-self.hot_entries:]
+        manifest['records'] = manifest.get('records', [])[-RECORD_IDS_KEPT:]
+        manifest['updated'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        write_atomic(self.manifest_path, json.dumps(manifest, indent=2))
+        # Re-read the curated part on conflict so concurrent hand edits survive
+        update_file(self.hot_path, lambda text: self._render_hot(text, manifest))
+
+    def _ensure_segmented(self):
+        """Load the manifest, moving entries out of an unsegmented hot file first"""
+        manifest = self.load_manifest()
+        if manifest is not None:
+            return manifest
+
+        manifest = {'version': SEMANTIC_MANIFEST_VERSION, 'segments': {}, 'recent': []}
+        text = self._read_hot()
+        if text is None:
+            return manifest
+
+        for timestamp, entry_text in self.split_hot_text(text)[1]:
+            self._append_to_segment(manifest, timestamp[:7], entry_text, timestamp)
+            manifest['recent'].append({'timestamp': timestamp, 'text': entry_text})
+        self._save(manifest)
+        return manifest
+
+    def has_record(self, manifest, record_id, month):
+        """Whether the entry of a logged learning was already added"""
+        records = manifest.get('records', [])
+        if record_id in records:
+            return True
+        # Ids older than the ones kept can only be confirmed from the segment itself
+        if len(records) >= RECORD_IDS_KEPT and record_id < records[0]:
+            return self._segment_contains(self.segment_path(month), RECORD_MARKER.format(record_id))
+        return False
+
+    def add_entry(self, content, timestamp=None, source='User "Learn this:" command', record_id=None):
+        """Append one entry to the current month's segment and refresh the hot summary
+
+        Writers of the same semantic file take turns on the manifest lock; the
+        segment append and the two small rewrites are all that happen under it.
+        With record_id (a logged learning's id) the entry is added at most once
+        per id, however often the record is replayed or whoever replays it.
+        Returns the segment path.
+        """
+        timestamp = timestamp or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        os.makedirs(self.segments_dir, exist_ok=True)
+        entry_text = format_entry(timestamp, content, source, record_id)
+        month = timestamp[:7]
+
+        with locked(self.manifest_path):
+            manifest = self._ensure_segmented()
+            if record_id and self.has_record(manifest, record_id, month):
+                return self.segment_path(month)
+            self._append_to_segment(manifest, month, entry_text, timestamp, record_id)
+            manifest['recent'].append({'timestamp': timestamp, 'text': entry_text})
+            if record_id:
+                manifest.setdefault('records', []).append(record_id)
+            self._save(manifest)
+        return self.segment_path(month)
+
+    def segments(self):
+        """Months with segments, oldest first, mapped to their manifest records"""
+        manifest = self.load_manifest() or {'segments': {}}
+        return dict(sorted(manifest['segments'].items()))
+
+    def read_hot(self):
+        """The hot summary: curated content plus the newest entries"""
+        return self._read_hot() or ''
+
+    def read_segment(self, month):
+        """Full text of one month's segment ('' if there is none)"""
+        try:
+            with open(self.segment_path(month), 'r') as f:
+                return f.read()
+        except OSError:
+            return ''
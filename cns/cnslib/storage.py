@@ -0,0 +1,143 @@
+"""
+CNS Shared File Storage
+Per-file advisory locks, atomic temp-file-and-rename writes and optimistic version
+checks for files that several CNS scripts and sessions may write concurrently
+"""
+
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Not POSIX: locking degrades to atomic replacement only
+    fcntl = None
+
+DEFAULT_RETRIES = 8
+
+class VersionConflict(Exception):
+    """The file changed between being read and being written"""
+
+ANY_VERSION = object()
+
+# Lock files this thread already holds (flock would deadlock on a second descriptor)
+_held_locks = threading.local()
+
+def lock_path(path):
+    """Hidden lock file that guards `path` (the file itself is replaced, so it cannot hold the lock)"""
+    directory, name = os.path.split(os.path.abspath(path))
+    return os.path.join(directory, f".{name}.lock")
+
+@contextmanager
+def locked(path, shared=False):
+    """Hold an advisory lock on `path` for the duration of the block
+
+    Locks are per file, so writers of different files never wait on each other.
+    Re-entrant within a thread: nested blocks on the same path share the lock.
+    """
+    key = lock_path(path)
+    held = _held_locks.__dict__.setdefault('paths', set())
+    if fcntl is None or key in held:
+        yield
+        return
+
+    os.makedirs(os.path.dirname(key), exist_ok=True)
+    fd = os.open(key, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        held.add(key)
+        try:
+            yield
+        finally:
+            held.discard(key)
+    finally:
+        os.close(fd)  # Closing releases the lock
+
+def file_version(path):
+    """Version token for a file's current contents (None if it does not exist)
+
+    Every atomic write installs a new inode, so (inode, mtime, size) changes on
+    each write through this module and on in-place edits.
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+def read_versioned(path):
+    """(text, version) for a file; (None, None) if it does not exist"""
+    while True:
+        version = file_version(path)
+        if version is None:
+            return None, None
+        try:
+            with open(path, 'r') as f:
+                text = f.read()
+        except FileNotFoundError:
+            continue
+        if file_version(path) == version:
+            return text, version
+
+def _replace_with(path, text):
+    directory, name = os.path.split(os.path.abspath(path))
+    try:
+        mode = os.stat(path).st_mode & 0o777
+    except FileNotFoundError:
+        mode = 0o644
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            os.chmod(tmp_path, mode)
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def write_atomic(path, text, expected_version=ANY_VERSION):
+    """Replace a file's contents atomically; returns the new version
+
+    With expected_version (from read_versioned; None meaning "must not exist"),
+    raises VersionConflict instead of overwriting a concurrent change.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with locked(path):
+        if expected_version is not ANY_VERSION and file_version(path) != expected_version:
+            raise VersionConflict(path)
+        _replace_with(path, text)
+        return file_version(path)
+
+def update_file(path, transform, retries=DEFAULT_RETRIES):
+    """Read-modify-write a file with optimistic concurrency
+
+    transform(text) gets the current text (None if the file is missing) and returns
+    the new text, or None to leave the file untouched. It is re-run on the fresh
+    contents whenever another writer got in first. Returns the text written (or None).
+    """
+    for _ in range(retries):
+        text, version = read_versioned(path)
+        new_text = transform(text)
+        if new_text is None:
+            return None
+        try:
+            write_atomic(path, new_text, version)
+            return new_text
+        except VersionConflict:
+            continue
+    raise VersionConflict(f"{path}: still changing after {retries} attempts")
+
+def append_text(path, text):
+    """Append to a file under its lock, durably (for append-only logs and segments)"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with locked(path):
+        with open(path, 'a') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
@@ -0,0 +1,319 @@
+"""
+CNS Maintenance Task Graph
+Runs declared maintenance tasks in dependency order, concurrently where the graph
+allows, skipping tasks whose inputs have not changed since their last success
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import hashlib
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from cnslib.budget import Budget
+from cnslib.storage import write_atomic
+
+# run(upstream, budget) gets the outcomes of the task's dependencies by name and
+# its cnslib.budget Budget, and returns a result; the task succeeded if
+# result.success (or the result itself) is truthy, and stopped early with partial
+# results if result.partial is.
+# inputs / outputs: paths (files or directories) relative to the graph root; see
+# fingerprint_paths for what a change to a directory input is.
+# always: never skipped by fingerprint (reporting tasks whose result others need).
+# max_age_hours: re-run even when unchanged once the last success is this old.
+Task = namedtuple('Task', ['name', 'title', 'run', 'deps', 'inputs', 'outputs', 'always', 'max_age_hours'],
+                  defaults=((), (), (), False, None))
+
+# status: 'success', 'partial' (stopped at its budget), 'failed', 'up_to_date'
+# (skipped by fingerprint) or 'cancelled' (never started because the run was cancelled)
+TaskOutcome = namedtuple('TaskOutcome', ['name', 'status', 'result', 'duration', 'output', 'error'])
+
+class TaskGraphError(Exception):
+    """The task graph is malformed (unknown dependency, cycle, or a task reading its own output)"""
+
+def fingerprint_paths(root, paths):
+    """Digest of the size and mtime of each given path (one stat per path)
+
+    A directory is fingerprinted by its own mtime, which changes whenever an
+    entry is created, deleted or renamed in it (a learning captured, a context
+    pruned, a file replaced by an atomic write), so its files are never walked
+    or stat'ed. Edits made in place inside a directory do not show up; list
+    the file itself as an input to notice those.
+    """
+    digest = hashlib.sha256()
+    for relative in sorted(paths):
+        digest.update(relative.encode('utf-8') + b'\0')
+        try:
+            st = os.stat(os.path.join(root, relative))
+        except OSError:
+            digest.update(b'missing\0')
+            continue
+        digest.update(f"{st.st_size}:{st.st_mtime_ns}\0".encode('utf-8'))
+    return digest.hexdigest()
+
+def _overlaps(path, other):
+    return path == other or path.startswith(other + '/') or other.startswith(path + '/')
+
+def check_own_outputs(tasks):
+    """Raise if a task lists one of its own outputs as an input
+
+    Its inputs would change with every run it makes, so it would never be
+    skipped as up to date.
+    """
+    for task in tasks:
+        for path in task.inputs:
+            for output in task.outputs:
+                if _overlaps(path.rstrip('/'), output.rstrip('/')):
+                    raise TaskGraphError(f"Task '{task.name}' reads its own output: '{path}' overlaps '{output}'")
+
+def topological_order(tasks):
+    """Task names in an order that respects dependencies, declaration order otherwise"""
+    by_name = {task.name: task for task in tasks}
+    order, state = [], {}
+
+    def visit(name, chain):
+        if state.get(name) == 'done':
+            return
+        if state.get(name) == 'visiting':
+            raise TaskGraphError(f"Dependency cycle: {' -> '.join(chain + [name])}")
+        if name not in by_name:
+            raise TaskGraphError(f"Unknown dependency '{name}' of '{chain[-1]}'")
+        state[name] = 'visiting'
+        for dep in by_name[name].deps:
+            visit(dep, chain + [name])
+        state[name] = 'done'
+        order.append(name)
+
+    for task in tasks:
+        visit(task.name, [])
+    return order
+
+def select_tasks(tasks, only=None, skip=None):
+    """Tasks chosen with --only / --skip; dependencies left out count as satisfied"""
+    known = {task.name for task in tasks}
+    unknown = (set(only or ()) | set(skip or ())) - known
+    if unknown:
+        raise TaskGraphError(f"Unknown task(s): {', '.join(sorted(unknown))}")
+    return [task for task in tasks
+            if (not only or task.name in only) and task.name not in (skip or ())]
+
+class _ThreadOutput(io.TextIOBase):
+    """sys.stdout stand-in that streams each task thread's prints as whole lines
+
+    While more than one task is running, each line is prefixed with the task's
+    name so concurrent phases stay readable; a task running alone prints as
+    is. Each task's output is also kept for its TaskOutcome.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+        self.running = set()
+        self.lock = threading.Lock()
+
+    def begin(self, name):
+        self.local.name = name
+        self.local.capture = io.StringIO()
+        self.local.pending = ''
+        with self.lock:
+            self.running.add(name)
+
+    def end(self):
+        """Stop capturing this thread's output; returns everything it printed"""
+        if self.local.pending:
+            self._emit(self.local.pending + '\n')
+        self.local.pending = ''
+        with self.lock:
+            self.running.discard(self.local.name)
+        self.local.name = None
+        return self.local.capture.getvalue()
+
+    def _emit(self, lines):
+        with self.lock:
+            if len(self.running) > 1:
+                prefix = f"[{self.local.name}] "
+                lines = ''.join(prefix + line for line in lines.splitlines(keepends=True))
+            self.stream.write(lines)
+            self.stream.flush()
+
+    def write(self, text):
+        if getattr(self.local, 'name', None) is None:
+            with self.lock:
+                return self.stream.write(text)
+        self.local.capture.write(text)
+        complete, _, self.local.pending = (self.local.pending + text).rpartition('\n')
+        if complete:
+            self._emit(complete + '\n')
+        return len(text)
+
+    def flush(self):
+        self.stream.flush()
+
+class TaskState:
+    """Last successful input fingerprint per task, kept in a small JSON file"""
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path, 'r') as f:
+                self.tasks = json.load(f).get('tasks', {})
+        except (OSError, ValueError, AttributeError):
+            self.tasks = {}
+
+    def is_current(self, task, fingerprint, now):
+        last = self.tasks.get(task.name)
+        if task.always or not last or last.get('fingerprint') != fingerprint:
+            return False
+        if task.max_age_hours is not None and now - last.get('time', 0) > task.max_age_hours * 3600:
+            return False
+        return True
+
+    def record(self, task, fingerprint, now):
+        self.tasks[task.name] = {'fingerprint': fingerprint, 'time': now}
+
+    def save(self):
+        write_atomic(self.path, json.dumps({'version': 1, 'tasks': self.tasks}, indent=2))
+
+class TaskGraph:
+    """Declared maintenance tasks and a scheduler for them
+
+    Dependencies order tasks; they do not gate them (a task still runs after a
+    dependency failed, as the old linear sequence did). Ready tasks run on a
+    thread pool; each task's printed output streams as it is printed, line by
+    line, prefixed with the task's name while other tasks run alongside it.
+
+    Each task gets its own time budget from when it starts. cancel() (or Ctrl-C
+    during run) cancels every running task's budget and starts nothing new, so
+    running tasks stop at their next check and keep what they finished.
+    """
+
+    def __init__(self, tasks, root, state_path=None):
+        self.tasks = list(tasks)
+        self.root = root
+        self.state_path = state_path
+        self._cancelled = threading.Event()
+        self._live_budgets = set()
+        self._lock = threading.Lock()
+        topological_order(self.tasks)  # Validate early
+        check_own_outputs(self.tasks)
+
+    def cancel(self):
+        """Stop starting tasks and ask the running ones to wrap up"""
+        with self._lock:
+            self._cancelled.set()
+            for budget in self._live_budgets:
+                budget.cancel()
+
+    def run(self, only=None, skip=None, jobs=4, force=False, on_start=None, on_complete=None,
+            budgets=None, default_budget=None):
+        """Run the selected tasks; returns {name: TaskOutcome} in declaration order
+
+        budgets maps task names to time budgets in seconds; other tasks get
+        default_budget (None = unbounded). on_start(task) is called from the
+        task's thread just before it runs (not for tasks skipped as up to date),
+        so what it prints comes ahead of the task's output; on_complete(task,
+        outcome) is called from the scheduling thread as each task finishes.
+        """
+        selected = select_tasks(self.tasks, only, skip)
+        names = {task.name for task in selected}
+        waiting = {task.name: {dep for dep in task.deps if dep in names} for task in selected}
+        by_name = {task.name: task for task in selected}
+        state = TaskState(self.state_path) if self.state_path else None
+        outcomes = {}
+        budgets = budgets or {}
+
+        def finished(name, outcome):
+            outcomes[name] = outcome
+            for deps in waiting.values():
+                deps.discard(name)
+            if on_complete:
+                on_complete(by_name[name], outcome)
+
+        output = _ThreadOutput(sys.stdout)
+        sys.stdout = output
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+                running = {}
+                while waiting or running:
+                    if self._cancelled.is_set():
+                        for name in list(waiting):
+                            del waiting[name]
+                            finished(name, TaskOutcome(name, 'cancelled', None, 0.0, '', None))
+                    for name in [n for n in list(waiting) if not waiting[n]]:
+                        del waiting[name]
+                        upstream = {dep: outcomes[dep] for dep in by_name[name].deps if dep in outcomes}
+                        seconds = budgets.get(name, default_budget)
+                        future = executor.submit(self._run_task, by_name[name], upstream, state, force,
+                                                 output, seconds, on_start)
+                        running[future] = name
+                    if not running:
+                        continue
+
+                    try:
+                        done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    except KeyboardInterrupt:
+                        if self._cancelled.is_set():
+                            raise  # Second Ctrl-C: stop waiting for running tasks
+                        print("🛑 Cancelling: running phases stop at their next checkpoint (Ctrl-C again to abort)")
+                        self.cancel()
+                        continue
+                    for future in done:
+                        finished(running.pop(future), future.result())
+        finally:
+            sys.stdout = output.stream
+            if state:
+                state.save()
+
+        return {task.name: outcomes[task.name] for task in selected}
+
+    def _run_task(self, task, upstream, state, force, output, seconds, on_start):
+        now = time.time()
+        tracked = state is not None and not task.always
+        fingerprint = fingerprint_paths(self.root, task.inputs) if tracked else None
+        if tracked and not force and state.is_current(task, fingerprint, now):
+            return TaskOutcome(task.name, 'up_to_date', None, 0.0, '', None)
+
+        budget = Budget(seconds)
+        with self._lock:
+            self._live_budgets.add(budget)
+            if self._cancelled.is_set():
+                budget.cancel()
+
+        output.begin(task.name)
+        started = time.monotonic()
+        try:
+            if on_start:
+                on_start(task)
+            result = task.run(upstream, budget)
+            success = bool(getattr(result, 'success', result))
+            partial = success and bool(getattr(result, 'partial', False))
+            error = None
+        except Exception as e:
+            result, success, partial, error = None, False, False, f"{type(e).__name__}: {e}"
+        finally:
+            printed = output.end()
+            with self._lock:
+                self._live_budgets.discard(budget)
+        duration = time.monotonic() - started
+
+        if success and not partial and tracked:
+            # The inputs as they were before the run: anything written to them
+            # meanwhile (a learning captured mid-run) makes the next run see a change
+            state.record(task, fingerprint, now)
+        status = 'partial' if partial else 'success' if success else 'failed'
+        return TaskOutcome(task.name, status, result, duration, printed, error)
+
+def critical_path_seconds(tasks, outcomes):
+    """Longest dependency chain by measured task duration (the best possible wall time)"""
+    finish = {}
+    for name in topological_order(tasks):
+        if name not in outcomes:
+            continue
+        task = next(t for t in tasks if t.name == name)
+        start = max((finish[dep] for dep in task.deps if dep in finish), default=0.0)
+        finish[name] = start + outcomes[name].duration
+    return max(finish.values(), default=0.0)
@@ -0,0 +1,138 @@
+"""
+CNS Learning Write-Ahead Log
+Durable queue of captured learnings: capture is one fsynced append, and a
+materializer later writes each record's episodic file, semantic entry and index
+entries, replaying whatever a crash or an interrupted run left behind
+"""
+
+import os
+import json
+from collections import namedtuple
+from datetime import datetime
+
+from cnslib.episodic import unique_memory_name
+from cnslib.storage import locked, write_atomic
+
+WAL_DIR = 'wal'
+WAL_FILE = 'learnings.wal'
+DONE_FILE = 'learnings.done'
+
+# id doubles as the episodic filename stem (learning-<id>.md), so replaying a
+# record can tell whether its file was already written
+LearningRecord = namedtuple('LearningRecord', ['id', 'timestamp', 'workspace', 'content'])
+
+def new_learning_record(content, workspace=None, now=None):
+    """A learning record with a collision-free id"""
+    now = now or datetime.now()
+    return LearningRecord(unique_memory_name('', suffix='', now=now),
+                          now.strftime("%Y-%m-%d %H:%M:%S"), workspace, content)
+
+def _fsync_directory(directory):
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def _append_line(path, line):
+    """Append one line durably, first terminating a line torn by a crash"""
+    is_new = not os.path.exists(path)
+    with open(path, 'ab+') as f:
+        if f.seek(0, os.SEEK_END) > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                line = '\n' + line
+        f.write(line.encode('utf-8'))
+        f.flush()
+        os.fsync(f.fileno())
+    if is_new:
+        _fsync_directory(os.path.dirname(path))
+
+def _read_json_lines(path):
+    """Parsed lines of a JSON-lines file, skipping torn or corrupt ones"""
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            lines = f.readlines()
+    except OSError:
+        return []
+
+    records = []
+    for line in lines:
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            continue
+    return records
+
+class LearningLog:
+    """Append-only log of learnings plus the ids already materialized
+
+    Files (in memory/wal/):
+      learnings.wal  - one JSON record per captured learning
+      learnings.done - ids of records whose files and index entries exist
+
+    Appenders only take the log's lock; materializers take turns on the done
+    file's lock, so capture never waits for a running materializer. Once every
+    record is done, both files are emptied.
+    """
+
+    def __init__(self, memory_dir):
+        self.directory = os.path.join(memory_dir, WAL_DIR)
+        self.path = os.path.join(self.directory, WAL_FILE)
+        self.done_path = os.path.join(self.directory, DONE_FILE)
+
+    def append(self, record):
+        """Durably log a record; it is safe from here on even if nothing else runs"""
+        os.makedirs(self.directory, exist_ok=True)
+        with locked(self.path):
+            _append_line(self.path, json.dumps(record._asdict()) + '\n')
+
+    def records(self):
+        records = []
+        for fields in _read_json_lines(self.path):
+            try:
+                records.append(LearningRecord(**fields))
+            except TypeError:
+                continue
+        return records
+
+    def done_ids(self):
+        return {entry['id'] for entry in _read_json_lines(self.done_path)
+                if isinstance(entry, dict) and 'id' in entry}
+
+    def pending(self):
+        """Logged records not yet materialized, oldest first"""
+        done = self.done_ids()
+        return [record for record in self.records() if record.id not in done]
+
+    def mark_done(self, record_id):
+        with locked(self.done_path):
+            _append_line(self.done_path, json.dumps({'id': record_id}) + '\n')
+
+    def replay(self, materialize):
+        """Materialize every pending record; returns how many were processed
+
+        materialize(record) must be idempotent: a crash between it and mark_done
+        means the record is handed over again on the next replay.
+        """
+        if not os.path.exists(self.path):
+            return 0
+
+        processed = 0
+        with locked(self.done_path):
+            for record in self.pending():
+                materialize(record)
+                self.mark_done(record.id)
+                processed += 1
+            self.truncate_if_drained()
+        return processed
+
+    def truncate_if_drained(self):
+        """Empty both files once every logged record is materialized"""
+        # Appends wait on the log lock, so nothing can slip in between the check and the reset
+        with locked(self.done_path), locked(self.path):
+            if self.records() and not self.pending():
+                write_atomic(self.path, '')
+                write_atomic(self.done_path, '')
@@ -0,0 +1,75 @@
+"""
+CNS Workspace Detection
+The workspace a learning is tagged with at capture and the one startup looks
+learnings up by, detected the same way so both sides agree on its name
+"""
+
+import os
+import sqlite3
+import subprocess
+
+from cnslib.episodic import newest_memory_paths
+from cnslib.retrieval import RetrievalIndex, get_index_path
+
+# Explicit workspace override for captures and lookups
+WORKSPACE_ENV = 'CNS_WORKSPACE'
+
+# Workspace confirmed at startup (written by startup-sequence-old.update_workspace_tracking)
+TRACKING_FILE = 'current-workspace.txt'
+
+def get_tracking_path(cns_path):
+    return os.path.join(cns_path, TRACKING_FILE)
+
+def git_workspace(directory=None):
+    """Name of the git repository containing `directory` (default: cwd), or None"""
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--show-toplevel'],
+                                capture_output=True, text=True, cwd=directory or os.getcwd())
+    except OSError:
+        return None
+    if result.returncode == 0 and result.stdout.strip():
+        return os.path.basename(result.stdout.strip())
+    return None
+
+def detect_workspace(cns_path):
+    """Current workspace: CNS_WORKSPACE, the confirmed workspace, or the git repo (None if unknown)"""
+    workspace = os.environ.get(WORKSPACE_ENV, '').strip()
+    if workspace:
+        return workspace
+
+    try:
+        with open(get_tracking_path(cns_path), 'r') as f:
+            workspace = f.read().strip()
+        if workspace:
+            return workspace
+    except OSError:
+        pass
+
+    return git_workspace()
+
+def newest_learning_paths(cns_path, limit, workspace=None):
+    """Paths of the newest learnings, those captured in `workspace` first
+
+    Workspace learnings come from the retrieval index (no directory scan); the
+    list is topped up with the newest learnings overall.
+    """
+    episodic_path = os.path.join(cns_path, "cns", "memory", "episodic")
+    workspace_files = []
+    index_path = get_index_path(cns_path)
+    if workspace and os.path.exists(index_path):
+        try:
+            with RetrievalIndex(index_path) as index:
+                hits = index.recent(limit, source='episodic', workspace=workspace)
+            # Compacted learnings point at their digest; only live files are shown
+            workspace_files = [hit.path for hit in hits
+                               if os.path.basename(hit.path) == hit.doc_id and os.path.exists(hit.path)]
+        except (sqlite3.Error, OSError):
+            workspace_files = []
+
+    if len(workspace_files) >= limit:
+        return workspace_files
+
+    # Filenames contain the date, so the largest names are the newest; same files as list_learnings
+    newest = newest_memory_paths(episodic_path, limit + len(workspace_files), prefix='learning-',
+                                 exclude_templates=True)
+    return workspace_files + [path for path in newest if path not in workspace_files][:limit - len(workspace_files)]
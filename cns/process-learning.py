@@ -6,33 +6,29 @@ Handles "Learn this:" commands by processing and integrating learning into CNS m
 
 import os
 import sys
-from datetime import datetime
+import subprocess
 import json
 
-def process_learning(learning_content):
-    """Process a learning command and integrate into CNS memory systems."""
-    
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    cns_dir = os.path.dirname(os.path.abspath(__file__))
-    
-    print("🧠 CNS LEARNING PROTOCOL ACTIVATED")
-    print(f"📅 Timestamp: {timestamp}")
-    print(f"📚 Learning Content: {learning_content}")
-    print("")
-    
-    # 1. Document in episodic memory
-    episodic_dir = os.path.join(cns_dir, "memory", "episodic")
-    os.makedirs(episodic_dir, exist_ok=True)
-    
-    episodic_file = os.path.join(episodic_dir, f"learning-{datetime.now().strftime('%Y-%m-%d-%H%M%S')}.md")
-    
-    episodic_content = f"""# Critical Learning Captured
-**Timestamp**: {timestamp}
+from cnslib.dirstats import DirectoryStats
+from cnslib.episodic import create_exclusive
+from cnslib.insights import LearningSidecars, extract_learning_features, get_sidecar_dir
+from cnslib.results import ResultChannel
+from cnslib.retrieval import RetrievalIndex, get_index_path, learning_document, semantic_entry_document
+from cnslib.semantic import SemanticMemory, format_entry
+from cnslib.vocabulary import load_vocabulary
+from cnslib.wal import LearningLog, new_learning_record
+from cnslib.workspace import detect_workspace
+
+def format_episodic_content(record):
+    """Episodic memory markdown for a logged learning"""
+    workspace_line = f"**Workspace**: {record.workspace}\n" if record.workspace else ""
+    return f"""# Critical Learning Captured
+**Timestamp**: {record.timestamp}
 **Source**: User "Learn this:" command
 **Priority**: Critical
-
+{workspace_line}
 ## Learning Content
-{learning_content}
+{record.content}
 
 ## Integration Status
 - ✅ Documented in episodic memory
@@ -44,51 +40,142 @@ This learning applies to all future sessions and similar scenarios across projec
 ## CNS Integration
 Learning integrated into Central Neural System for immediate application and future reference.
 """
+
+def record_learning_features(cns_dir, record, episodic_file, episodic_content):
+    """Extract the learning's analysis features once, into its sidecar record"""
+    cns_path = os.path.dirname(cns_dir)
+    vocabulary = load_vocabulary(cns_path)
+    sidecars = LearningSidecars(get_sidecar_dir(cns_path), vocabulary)
+    try:
+        sidecars.append(os.path.basename(episodic_file), record.timestamp,
+                        extract_learning_features(episodic_content, vocabulary))
+    except OSError:
+        pass  # The analyzers extract and backfill anything without a sidecar
+
+def materialize_learning(cns_dir, record, verbose=True):
+    """Write a logged learning's episodic file, semantic entry and index entries
+
+    Safe to repeat for the same record (crash replay, or a background replay
+    racing the inline capture): the episodic file is named after the record id
+    and created exclusively, the semantic entry is added once per record id,
+    and index entries are replaced.
+    """
+    report = print if verbose else (lambda *args: None)
+    timestamp = record.timestamp
     
-    with open(episodic_file, 'w') as f:
-        f.write(episodic_content)
+    # 1. Document in episodic memory
+    episodic_dir = os.path.join(cns_dir, "memory", "episodic")
+    os.makedirs(episodic_dir, exist_ok=True)
+    episodic_file = os.path.join(episodic_dir, f"learning-{record.id}.md")
+    episodic_content = format_episodic_content(record)
     
-    print(f"✅ Step 1: Episodic memory updated: {episodic_file}")
+    try:
+        # Counted into the cached directory statistics (update-cns health and consolidation)
+        with DirectoryStats(os.path.dirname(cns_dir)).tracking('episodic') as changes:
+            create_exclusive(episodic_file, episodic_content)
+            changes.added(episodic_file)
+        report(f"✅ Step 1: Episodic memory updated: {episodic_file}")
+        record_learning_features(cns_dir, record, episodic_file, episodic_content)
+    except FileExistsError:
+        report(f"✅ Step 1: Episodic memory already written: {episodic_file}")
     
-    # 2. Update semantic memory (best practices)
+    # 2. Update semantic memory (best practices): append to this month's segment
+    # and refresh the small hot summary instead of rewriting the whole file
     semantic_dir = os.path.join(cns_dir, "memory", "semantic")
-    best_practices_file = os.path.join(semantic_dir, "best-practices.md")
-    
-    if os.path.exists(best_practices_file):
-        with open(best_practices_file, 'r') as f:
-            content = f.read()
-        
-        new_entry = f"""
-## Critical Learning - {timestamp}
-**Source**: User "Learn this:" command
+    best_practices = SemanticMemory(semantic_dir, "best-practices")
+    created = not os.path.exists(best_practices.hot_path)
+    if created:
+        report("⚠️  Step 2: best-practices.md not found, creating new file")
+    
+    segment_file = best_practices.add_entry(record.content, timestamp, record_id=record.id)
+    
+    if created:
+        report(f"✅ Step 2: Created new best-practices.md with learning")
+    else:
+        report(f"✅ Step 2: Semantic memory (best-practices.md) updated")
+    report(f"   Segment: {segment_file}")
+    
+    # 3. Index both entries for relevance-ranked retrieval (query-memory.py)
+    try:
+        with RetrievalIndex(get_index_path(os.path.dirname(cns_dir))) as index:
+            index.add(learning_document(episodic_file, episodic_content), commit=False)
+            entry_text = format_entry(timestamp, record.content, record_id=record.id)
+            index.add(semantic_entry_document(segment_file, timestamp, entry_text), commit=False)
+        report("✅ Step 3: Retrieval index updated")
+    except Exception as e:
+        # The index is rebuilt by update-cns.py, so capture must not fail on it
+        report(f"⚠️  Step 3: Retrieval index not updated: {e}")
+    
+    return episodic_file, segment_file
 
-{learning_content}
+def get_learning_log(cns_dir):
+    return LearningLog(os.path.join(cns_dir, "memory"))
 
----
-"""
-        
-        # Append to best practices
-        updated_content = content + new_entry
-        
-        with open(best_practices_file, 'w') as f:
-            f.write(updated_content)
-        
-        print(f"✅ Step 2: Semantic memory (best-practices.md) updated")
-    else:
-        print("⚠️  Step 2: best-practices.md not found, creating new file")
-        with open(best_practices_file, 'w') as f:
-            f.write(f"""# Best Practices
+def materialize_pending(cns_dir, results=None):
+    """Replay every logged learning that has not been materialized; returns the count"""
+    results = results or ResultChannel('learning_materialization')
+    
+    def materialize(record):
+        episodic_file, _ = materialize_learning(cns_dir, record, verbose=False)
+        print(f"✅ Materialized {record.timestamp}: {os.path.basename(episodic_file)}")
+        results.file_written(episodic_file, 'created')
+    
+    count = get_learning_log(cns_dir).replay(materialize)
+    results.count('materialized', count)
+    return count
 
-## Critical Learning - {timestamp}
-**Source**: User "Learn this:" command
+def start_background_materializer():
+    """Materialize the log in a detached process so the caller can return at once"""
+    try:
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), '--materialize'],
+                         stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                         stderr=subprocess.DEVNULL, start_new_session=True)
+        return True
+    except OSError:
+        return False
 
-{learning_content}
+def process_learning(learning_content, workspace=None, defer=False):
+    """Process a learning command and integrate into CNS memory systems.
 
----
-""")
-        print(f"✅ Step 2: Created new best-practices.md with learning")
+    By default the files are written before returning, as they always were.
+    With defer=True the learning is only appended to the write-ahead log, which
+    is all the caller waits for; the files are written in the background (or by
+    the next update-cns.py run if that never happens). The log is skipped on the
+    default path, so it costs no extra fsyncs there.
+    """
     
-    # 3. Integration confirmation
+    cns_dir = os.path.dirname(os.path.abspath(__file__))
+    workspace = workspace or detect_workspace(os.path.dirname(cns_dir))
+    record = new_learning_record(learning_content, workspace)
+    timestamp = record.timestamp
+    
+    print("🧠 CNS LEARNING PROTOCOL ACTIVATED")
+    print(f"📅 Timestamp: {timestamp}")
+    if workspace:
+        print(f"📁 Workspace: {workspace}")
+    print(f"📚 Learning Content: {learning_content}")
+    print("")
+    
+    if defer:
+        learning_log = get_learning_log(cns_dir)
+        learning_log.append(record)
+        print(f"✅ Learning logged: {learning_log.path}")
+        if start_background_materializer():
+            print("🔄 Episodic, semantic and index updates running in the background")
+        else:
+            print("⚠️  Background update not started; update-cns.py will apply it")
+        return {
+            "success": True,
+            "queued": True,
+            "timestamp": timestamp,
+            "record_id": record.id,
+            "workspace": workspace,
+            "learning_content": learning_content
+        }
+    
+    episodic_file, segment_file = materialize_learning(cns_dir, record)
+    
+    # 4. Integration confirmation
     print("")
     print("🎯 CNS LEARNING INTEGRATION COMPLETE")
     print("📝 Learning captured in multiple memory systems")
@@ -101,18 +188,37 @@ Learning integrated into Central Neural System for immediate application and fut
         "success": True,
         "timestamp": timestamp,
         "episodic_file": episodic_file,
+        "workspace": workspace,
+        "semantic_segment": segment_file,
         "learning_content": learning_content
     }
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("Usage: python3 process-learning.py \"<learning content>\"")
+        print("Usage: python3 process-learning.py [--workspace=NAME] [--defer] \"<learning content>\"")
+        print("       python3 process-learning.py --materialize")
         sys.exit(1)
     
-    learning_content = " ".join(sys.argv[1:])
-    result = process_learning(learning_content)
+    args = sys.argv[1:]
+    workspace = None
+    defer = False
+    while args and args[0].startswith('--'):
+        option = args.pop(0)
+        if option.startswith('--workspace='):
+            workspace = option.split('=', 1)[1]
+        elif option == '--defer':
+            defer = True
+        elif option == '--materialize':
+            # Replay logged learnings (background materializer, update-cns.py, crash recovery)
+            with ResultChannel.from_environment('learning_materialization') as results:
+                count = materialize_pending(os.path.dirname(os.path.abspath(__file__)), results)
+            print(f"🔁 {count} pending learning(s) materialized")
+            sys.exit(0)
+    
+    learning_content = " ".join(args)
+    result = process_learning(learning_content, workspace, defer)
     
     if result["success"]:
         sys.exit(0)
     else:
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+CNS Memory Query
+Ranks episodic learnings and semantic memory entries by relevance to a query
+"""
+
+import os
+import sys
+import time
+import argparse
+from datetime import datetime
+
+from cnslib.retrieval import RetrievalIndex, get_index_path, sync_index
+
+def get_cns_path():
+    """Get the ~/.personal-cns directory path"""
+    return os.path.expanduser("~/.personal-cns")
+
+def query(text, k=5, source=None, workspace=None):
+    """Top-k memory documents for a query, best first"""
+    with RetrievalIndex(get_index_path(get_cns_path())) as index:
+        return index.query(text, k, source=source, workspace=workspace)
+
+def print_hits(hits):
+    """Print ranked hits in the CNS display style"""
+    if not hits:
+        print("💭 No matching memories found")
+        return
+    for i, hit in enumerate(hits, 1):
+        when = datetime.fromtimestamp(hit.timestamp).strftime('%Y-%m-%d %H:%M') if hit.timestamp else hit.source
+        score = f" ({hit.score:.2f})" if hit.score is not None else ""
+        print(f"{i}. [{when}] {hit.title}{score}")
+        if hit.summary:
+            print(f"   {hit.summary}")
+        print(f"   📄 {hit.path}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Query CNS memory by relevance")
+    parser.add_argument('text', nargs='*', help="query text")
+    parser.add_argument('-k', type=int, default=5, help="number of results (default 5)")
+    parser.add_argument('--source', choices=['episodic', 'semantic'], help="search only one memory type")
+    parser.add_argument('--workspace', help="search only learnings captured in this workspace")
+    parser.add_argument('--sync', action='store_true', help="index new memory files before querying")
+    parser.add_argument('--rebuild', action='store_true', help="rebuild the index from scratch")
+    args = parser.parse_args()
+
+    if args.rebuild or args.sync:
+        with RetrievalIndex(get_index_path(get_cns_path())) as index:
+            if args.rebuild:
+                index.clear()
+            added, removed = sync_index(get_cns_path(), index)
+            print(f"🔄 Index synced: {added} added, {removed} removed, {len(index)} documents")
+
+    if not args.text:
+        if not (args.rebuild or args.sync):
+            parser.print_usage()
+            sys.exit(1)
+        return
+
+    began = time.perf_counter()
+    hits = query(' '.join(args.text), args.k, args.source, args.workspace)
+    elapsed = (time.perf_counter() - began) * 1000
+
+    print(f"🔍 Top {len(hits)} memories for: {' '.join(args.text)} ({elapsed:.1f} ms)")
+    print_hits(hits)
+
+if __name__ == "__main__":
+    main()
@@ -8,29 +8,34 @@ import os
 import json
 import glob
 import uuid
+from itertools import islice
 from datetime import datetime
 from pathlib import Path
 
+from cnslib.episodic import create_memory_file, newest_memory_paths, split_named_stem
+from cnslib.retention import apply_retention
+from cnslib.sections import file_contains, read_markdown_sections
+from cnslib.storage import write_atomic
+from cnslib.workspace import detect_workspace, get_tracking_path, newest_learning_paths
+
 def get_cns_path():
     """Get the ~/.personal-cns directory path"""
     return os.path.expanduser("~/.personal-cns")
 
-def load_recent_learnings(limit=5):
-    """Load recent learning entries from CNS episodic memory"""
+def load_recent_learnings(limit=5, workspace=None):
+    """Load recent learning entries from CNS episodic memory, preferring `workspace`"""
     episodic_path = os.path.join(get_cns_path(), "cns", "memory", "episodic")
     
     learnings = []
     
     # Load from CNS episodic memory (individual learning files)
     if os.path.exists(episodic_path):
-        learning_files = glob.glob(os.path.join(episodic_path, "*.md"))
-        # Sort by filename (which contains date) to get chronological order, newest first
-        learning_files.sort(reverse=True)
+        learning_files = newest_learning_paths(get_cns_path(), limit, workspace)
         
-        for i, file_path in enumerate(learning_files[:limit]):
+        for i, file_path in enumerate(learning_files):
             try:
-                with open(file_path, 'r') as f:
-                    content = f.read()
+                # Cached parse, shared with get_learning_application when the learning is displayed
+                parsed = read_markdown_sections(file_path)
                     
                 filename = os.path.basename(file_path)
                 # Extract activity name from filename
@@ -46,57 +51,32 @@ def load_recent_learnings(limit=5):
                     activity = filename.replace('.md', '').replace('-', ' ').title()
                     
                 # Extract comprehensive summary from content
-                lines = content.split('\n')
                 summary = ""
                 
-                # Look for key learning content in order of preference
-                for line in lines:
-                    # Check for ## Key Learning Principles section
-                    if line.startswith('## Key Learning Principles'):
-                        # Find the first principle after this heading
-                        line_index = lines.index(line)
-                        for j in range(line_index + 1, min(line_index + 15, len(lines))):
-                            following_line = lines[j]
-                            stripped = following_line.strip()
-                            if stripped.startswith('1.') or stripped.startswith('-'):
-                                # Extract the first principle
-                                principle = stripped
-                                if principle.startswith('1.'):
-                                    principle = principle[2:].strip()
-                                elif principle.startswith('-'):
-                                    principle = principle[1:].strip()
-                                
-                                # Handle markdown formatting like **Bold**: content
-                                if '**' in principle and ':' in principle:
-                                    # Extract the full principle, removing markdown but keeping structure
-                                    summary = principle.replace('**', '').strip()
-                                elif ':' in principle:
-                                    # Keep both the bold part and the explanation
-                                    summary = principle.replace('**', '').strip()
-                                else:
-                                    summary = principle.replace('**', '')
-                                break
-                        if summary:
+                # The title comes first in the file, so it wins when present
+                if parsed.title.startswith('# '):
+                    title = parsed.title.replace('# ', '').strip()
+                    if 'Learning:' in title:
+                        summary = title.split('Learning:', 1)[1].strip()
+                    else:
+                        summary = title
+                
+                # Otherwise the first principle under ## Key Learning Principles
+                if not summary:
+                    for following_line in parsed.sections.get('## Key Learning Principles', [])[:14]:
+                        stripped = following_line.strip()
+                        if stripped.startswith('1.') or stripped.startswith('-'):
+                            principle = stripped[2:] if stripped.startswith('1.') else stripped[1:]
+                            # Drop markdown bold but keep "Label: explanation" structure
+                            summary = principle.replace('**', '').strip()
                             break
-                    
-                    # Fallback to ## Context section
-                    elif line.startswith('## Context') and not summary:
-                        line_index = lines.index(line)
-                        for following_line in lines[line_index:line_index + 5]:
-                            if following_line.strip() and not following_line.startswith('##'):
-                                summary = following_line.strip()[:100] + "..." if len(following_line.strip()) > 100 else following_line.strip()
-                                break
-                        if summary:
+                
+                # Fallback to ## Context section
+                if not summary:
+                    for following_line in parsed.sections.get('## Context', [])[:4]:
+                        if following_line.strip():
+                            summary = following_line.strip()[:100] + "..." if len(following_line.strip()) > 100 else following_line.strip()
                             break
-                    
-                    # Last resort: use title
-                    elif line.startswith('# ') and not summary:
-                        title = line.replace('# ', '').strip()
-                        if 'Learning:' in title:
-                            summary = title.split('Learning:', 1)[1].strip()
-                        else:
-                            summary = title
-                        break
                 
                 if not summary:
                     summary = f"Learning about {activity.replace('-', ' ')}"
@@ -225,16 +205,10 @@ def find_latest_context_by_name(context_name):
     if not os.path.exists(context_path):
         return None
     
-    # Get all context files with this name (new naming convention: [context-name]-[date].md)
-    context_pattern = os.path.join(context_path, f"{context_name}-*.md")
-    context_files = glob.glob(context_pattern)
-    
-    if not context_files:
-        return None
+    # Latest context file with this name (new naming convention: [context-name]-[date].md)
+    context_files = newest_memory_paths(context_path, 1, prefix=f"{context_name}-")
     
-    # Sort by filename timestamp (newest first) and return latest
-    context_files.sort(reverse=True)
-    return context_files[0]
+    return context_files[0] if context_files else None
 
 def get_available_context_names():
     """Get all available context names from existing context files, sorted by most recent"""
@@ -260,12 +234,10 @@ def get_available_context_names():
                 context_name = '-'.join(parts[4:])  # Everything after timestamp
                 timestamp = '-'.join(parts[1:4]) + '-' + parts[3]  # YYYY-MM-DD-HHMMSS
         else:
-            # New format: [context-name]-YYYY-MM-DD-HHMMSS.md
-            import re
-            match = re.search(r'^(.+?)-(\d{4}-\d{2}-\d{2}-\d{6})$', filename)
-            if match:
-                context_name = match.group(1)
-                timestamp = match.group(2)
+            # New format: [context-name]-YYYY-MM-DD-HHMMSS[-ffffff-xxxx].md
+            named = split_named_stem(filename)
+            if named:
+                context_name, timestamp = named
         
         if context_name and timestamp:
             # Keep track of the latest timestamp for each context name
@@ -301,12 +273,10 @@ def get_workspace_context_names(workspace_name, limit=3):
                 context_name = '-'.join(parts[4:])  # Everything after timestamp
                 timestamp = '-'.join(parts[1:4]) + '-' + parts[3]  # YYYY-MM-DD-HHMMSS
         else:
-            # New format: [context-name]-YYYY-MM-DD-HHMMSS.md
-            import re
-            match = re.search(r'^(.+?)-(\d{4}-\d{2}-\d{2}-\d{6})$', filename)
-            if match:
-                context_name = match.group(1)
-                timestamp = match.group(2)
+            # New format: [context-name]-YYYY-MM-DD-HHMMSS[-ffffff-xxxx].md
+            named = split_named_stem(filename)
+            if named:
+                context_name, timestamp = named
         
         # Check if this context belongs to the current workspace
         if context_name and timestamp:
@@ -320,10 +290,8 @@ def get_workspace_context_names(workspace_name, limit=3):
             elif not filename.startswith('context-'):
                 # New format - check file content for workspace
                 try:
-                    with open(context_file, 'r') as f:
-                        content = f.read()
-                        if f'**Current Workspace**: {workspace_name}' in content:
-                            belongs_to_workspace = True
+                    if file_contains(context_file, f'**Current Workspace**: {workspace_name}'):
+                        belongs_to_workspace = True
                 except:
                     # If we can't read the file, include it anyway for new format with workspace name
                     if workspace_name in context_name:
@@ -331,7 +299,8 @@ def get_workspace_context_names(workspace_name, limit=3):
             
             if belongs_to_workspace:
                 # Create display name with timestamp for clarity
-                time_part = timestamp.replace('-', '/')[0:10] + ' ' + timestamp[-6:-4] + ':' + timestamp[-4:-2] + ':' + timestamp[-2:]
+                seconds = timestamp[:17]  # Drop the -ffffff-xxxx of collision-free names
+                time_part = seconds.replace('-', '/')[0:10] + ' ' + seconds[-6:-4] + ':' + seconds[-4:-2] + ':' + seconds[-2:]
                 display_name = f"{context_name} ({time_part})"
                 workspace_contexts.append((display_name, timestamp, context_file))
     
@@ -363,9 +332,8 @@ def get_all_workspaces_from_contexts():
             # New format: check file content for workspace
             try:
                 with open(context_file, 'r') as f:
-                    content = f.read()
-                    lines = content.split('\n')
-                    for line in lines[:20]:
+                    # The workspace marker lives in the session header; read no further
+                    for line in islice(f, 20):
                         if '**Current Workspace**:' in line:
                             workspace_name = line.split(':', 1)[1].strip()
                             if workspace_name and workspace_name != 'unknown':
@@ -391,10 +359,9 @@ def get_all_workspaces_from_contexts():
 
 def update_workspace_tracking(workspace_name):
     """Update the workspace tracking file with confirmed workspace"""
-    tracking_file = os.path.join(get_cns_path(), 'current-workspace.txt')
+    tracking_file = get_tracking_path(get_cns_path())
     try:
-        with open(tracking_file, 'w') as f:
-            f.write(workspace_name)
+        write_atomic(tracking_file, workspace_name)
     except Exception as e:
         print(f"Warning: Could not update workspace tracking: {e}")
 
@@ -402,10 +369,6 @@ def create_session_context(context_name):
     """Create a new context file with the given context name"""
     from datetime import datetime
     
-    # Generate timestamp for context filename  
-    timestamp = datetime.now().strftime("%Y-%m-%d-%H%M%S")
-    context_filename = f"{context_name}-{timestamp}.md"
-    
     # Determine the actual working directory (not .codelassian)
     working_dir = os.environ.get('WORKSPACE_FOLDER') or os.environ.get('VSCODE_CWD')
     current_workspace = get_current_workspace()
@@ -418,13 +381,12 @@ def create_session_context(context_name):
         else:
             working_dir = os.getcwd()
     
-    # Create context file path
     context_path = os.path.join(get_cns_path(), "cns", "memory", "context")
-    os.makedirs(context_path, exist_ok=True)
-    context_file_path = os.path.join(context_path, context_filename)
     
-    # Create initial context content
-    context_content = f"""# Context Session: {context_name} - {timestamp}
+    def render_context(context_filename):
+        """Initial context content; the filename is chosen when the file is created"""
+        timestamp = split_named_stem(context_filename[:-3])[1]
+        return f"""# Context Session: {context_name} - {timestamp}
 
 ## Session Overview
 - **Start Time**: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
@@ -448,16 +410,16 @@ def create_session_context(context_name):
 - Update throughout session for continuity
 """
     
-    # Write context file
+    # Write context file under a collision-free name (two sessions in the same
+    # second used to overwrite each other's context)
     try:
-        with open(context_file_path, 'w') as f:
-            f.write(context_content)
+        context_file_path = create_memory_file(context_path, f"{context_name}-", render_context)
+        context_filename = os.path.basename(context_file_path)
         
         # Update current context tracking file
         tracking_file = os.path.join(get_cns_path(), 'current-context.txt')
         try:
-            with open(tracking_file, 'w') as f:
-                f.write(context_name)
+            write_atomic(tracking_file, context_name)
         except:
             pass  # Non-critical
         
@@ -576,11 +538,17 @@ def display_startup_sequence():
         print("🎯 PRIME PRINCIPLES: Loading from CNS brain...")
     print()
     
-    # Load and display recent learnings
-    learnings = load_recent_learnings(5)
+    # Get detected workspace
+    current_workspace = get_current_workspace()
+    
+    # Load and display recent learnings, those from this workspace first; the
+    # workspace is detected as process-learning.py does when tagging them
+    learning_workspace = detect_workspace(get_cns_path())
+    learnings = load_recent_learnings(5, learning_workspace)
     print("🧠 RECENT LEARNINGS APPLICATION:")
     if learnings:
-        print("These are the last 5 things I learned and how I plan to apply them:")
+        starting_with = f" (starting with {learning_workspace})" if learning_workspace else ""
+        print(f"These are the last 5 things I learned{starting_with} and how I plan to apply them:")
         for i, learning in enumerate(learnings, 1):
             # Extract date from filename (learning-YYYY-MM-DD-*)
             date = "Unknown"
@@ -596,16 +564,16 @@ def display_startup_sequence():
             # Extract title from path
             title = "Learning"
             try:
-                with open(learning['path'], 'r') as f:
-                    first_line = f.readline().strip()
-                    if first_line.startswith('# '):
-                        title = first_line.replace('# ', '').strip()
-                        # Remove "Learning: " prefix if present
-                        if title.startswith('Learning: '):
-                            title = title.replace('Learning: ', '')
-                        # Remove date suffix if present
-                        if ' - 20' in title:
-                            title = title.split(' - 20')[0]
+                # Same cached parse that get_learning_application uses below
+                first_line = read_markdown_sections(learning['path']).title.strip()
+                if first_line.startswith('# '):
+                    title = first_line.replace('# ', '').strip()
+                    # Remove "Learning: " prefix if present
+                    if title.startswith('Learning: '):
+                        title = title.replace('Learning: ', '')
+                    # Remove date suffix if present
+                    if ' - 20' in title:
+                        title = title.split(' - 20')[0]
             except:
                 pass
                 
@@ -630,11 +598,8 @@ def display_startup_sequence():
     print("✅ CENTRAL NEURAL SYSTEM OPERATIONAL")
     print()
     
-    # Clean up old context files (keep current + 2 previous per context name)
-    cleanup_old_contexts(keep_per_context_name=3)
-    
-    # Get detected workspace
-    current_workspace = get_current_workspace()
+    # Clean up old context files (per-context limit set by the retention policy)
+    cleanup_old_contexts()
     
     # Get available repositories for user confirmation
     available_repos = []
@@ -682,12 +647,10 @@ def display_startup_sequence():
         
         for context_file in glob.glob(os.path.join(context_path, "*.md")):
             try:
-                with open(context_file, 'r') as f:
-                    content = f.read()
-                    if f'**Current Workspace**: {current_workspace}' in content:
-                        # Get file modification time
-                        mod_time = os.path.getmtime(context_file)
-                        workspace_files.append((context_file, mod_time))
+                if file_contains(context_file, f'**Current Workspace**: {current_workspace}'):
+                    # Get file modification time
+                    mod_time = os.path.getmtime(context_file)
+                    workspace_files.append((context_file, mod_time))
             except:
                 pass
         
@@ -741,137 +704,40 @@ def display_startup_sequence():
         print("   No previous context files found for this workspace.")
         print("   Assistant will ask for a new context name to begin session tracking.")
 
-def cleanup_old_contexts(keep_per_context_name=3):
-    """Clean up old context files, keeping only the most recent N per context name"""
-    context_path = os.path.join(get_cns_path(), "cns", "memory", "context")
-    
-    if not os.path.exists(context_path):
-        return
-    
-    # Get all context files
-    context_files = glob.glob(os.path.join(context_path, "*.md"))
-    
-    # Group context files by context name
-    context_groups = {}
-    
-    for context_file in context_files:
-        filename = os.path.basename(context_file).replace('.md', '')
-        
-        # Extract context name from filename
-        context_name = "unknown"
-        
-        if filename.startswith('context-') and filename.count('-') >= 4:
-            # Old format: context-YYYY-MM-DD-HHMMSS-workspace.md
-            parts = filename.split('-')
-            if len(parts) >= 5:
-                context_name = '-'.join(parts[4:])  # Everything after timestamp
-        else:
-            # New format: [context-name]-YYYY-MM-DD-HHMMSS.md
-            import re
-            match = re.search(r'^(.+?)-(\d{4}-\d{2}-\d{2}-\d{6})$', filename)
-            if match:
-                context_name = match.group(1)
-        
-        if context_name not in context_groups:
-            context_groups[context_name] = []
-        context_groups[context_name].append(context_file)
-    
-    # Clean up old files for each context name
-    total_deleted = 0
-    for context_name, files in context_groups.items():
-        if len(files) > keep_per_context_name:
-            # Sort by filename (timestamp) and keep only the most recent N
-            files.sort(reverse=True)  # Newest first
-            files_to_delete = files[keep_per_context_name:]
-            
-            for file_to_delete in files_to_delete:
-                try:
-                    os.remove(file_to_delete)
-                    total_deleted += 1
-                except Exception as e:
-                    print(f"Warning: Could not delete {os.path.basename(file_to_delete)}: {e}")
-    
-    if total_deleted > 0:
-        print(f"🧹 Cleaned up {total_deleted} old context files (keeping {keep_per_context_name} per context name)")
+def cleanup_old_contexts():
+    """Clean up old context files using the shared context retention policy"""
+    for report in apply_retention(get_cns_path(), ['contexts']):
+        if report.deleted:
+            print(f"🧹 Cleaned up {len(report.deleted)} old context files")
 
 def get_learning_application(learning):
     """Get application description for a learning entry - VERBATIM, NO TRUNCATION"""
     # Extract learning summary from episodic learning files
     try:
-        with open(learning['path'], 'r') as f:
-            content = f.read()
-            lines = content.split('\n')
-            
-            # Look for ## Summary section first
-            summary_content = ""
-            in_summary = False
-            
-            for i, line in enumerate(lines):
-                if line.strip() == '## Summary':
-                    in_summary = True
-                    continue
-                elif in_summary:
-                    if line.startswith('## ') and line.strip() != '## Summary':
-                        # Hit next section, stop
-                        break
-                    elif line.strip():  # Non-empty line
-                        summary_content += line.strip() + " "
-            
-            # Return full summary content verbatim (NO TRUNCATION)
-            if summary_content:
-                return summary_content.strip()
-            
-            # Second priority: Look for ## Learning Content section
-            learning_content = ""
-            in_learning_content = False
-            
-            for i, line in enumerate(lines):
-                if line.strip() == '## Learning Content':
-                    in_learning_content = True
-                    continue
-                elif in_learning_content:
-                    if line.startswith('## ') and line.strip() != '## Learning Content':
-                        # Hit next section, stop
-                        break
-                    elif line.strip():  # Non-empty line
-                        learning_content += line.strip() + " "
-            
-            # Return full learning content verbatim (NO TRUNCATION)
-            if learning_content:
-                return learning_content.strip()
-            
-            # Third priority: Look for ## Context section
-            context_content = ""
-            in_context = False
+        # One cached parse serves every section lookup (and the title)
+        parsed = read_markdown_sections(learning['path'])
+        
+        # Priority: ## Summary, then ## Learning Content, then ## Context
+        for header in ['## Summary', '## Learning Content', '## Context']:
+            section_content = " ".join(line.strip() for line in parsed.sections.get(header, []) if line.strip())
             
-            for i, line in enumerate(lines):
-                if line.strip() == '## Context':
-                    in_context = True
-                    continue
-                elif in_context:
-                    if line.startswith('## ') and line.strip() != '## Context':
-                        # Hit next section, stop
-                        break
-                    elif line.strip():  # Non-empty line
-                        context_content += line.strip() + " "
+            # Return full section content verbatim (NO TRUNCATION)
+            if section_content:
+                return section_content
+        
+        # Final fallback: Extract title and try to make it meaningful
+        title = ""
+        if parsed.title.startswith('# '):
+            title = parsed.title.replace('# ', '').strip()
             
-            # Return full context content verbatim (NO TRUNCATION)
-            if context_content:
-                return context_content.strip()
+            # Remove generic "Learning: " prefix and date suffix
+            if title.startswith('Learning: '):
+                title = title.replace('Learning: ', '')
+            if ' - 20' in title:
+                title = title.split(' - 20')[0]
             
-            # Final fallback: Extract title and try to make it meaningful
-            title = ""
-            if lines and lines[0].startswith('# '):
-                title = lines[0].replace('# ', '').strip()
-                
-                # Remove generic "Learning: " prefix and date suffix
-                if title.startswith('Learning: '):
-                    title = title.replace('Learning: ', '')
-                if ' - 20' in title:
-                    title = title.split(' - 20')[0]
-                
-                if title and title != "Critical Learning Captured":
-                    return title
+            if title and title != "Critical Learning Captured":
+                return title
                 
     except Exception as e:
         pass
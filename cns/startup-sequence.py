@@ -5,95 +5,138 @@ Displays CNS initialization status and loaded components
 """
 
 import os
-import glob
+import sys
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
+from cnslib.dirstats import DirectoryStats
+from cnslib.metrics import record_startup_latency
+from cnslib.retention import count_archived_learnings
+from cnslib.sections import read_section_lines
+from cnslib.workspace import detect_workspace, newest_learning_paths
+
+# Upper bound on concurrent filesystem probes in the async startup engine
+STARTUP_IO_WORKERS = 16
+
+BRAIN_COMPONENTS = [
+    ("cns/brain/identity.md", "Identity & Purpose"),
+    ("cns/brain/capabilities.md", "Enhanced Capabilities"),
+    ("cns/brain/prime-principles.md", "Operating Principles"),
+    ("cns/brain/decision-framework.md", "Decision Framework"),
+    ("cns/brain/user-patterns.md", "User Patterns")
+]
+
+MEMORY_COMPONENTS = [
+    ("cns/memory/semantic/best-practices.md", "Semantic Memory (Best Practices)"),
+    ("cns/memory/procedural/workflow-patterns.md", "Procedural Memory (Workflow Patterns)"),
+    ("cns/memory/user-preferences.md", "User Preferences")
+]
+
+REFLEX_COMPONENTS = [
+    ("cns/reflexes/trigger-responses.md", "Trigger Responses"),
+    ("cns/reflexes/error-handling.md", "Error Handling"),
+    ("cns/reflexes/quality-checks.md", "Quality Checks")
+]
+
+INTEGRATION_COMPONENTS = [
+    ("cns/integration/prompt-engineering.md", "Prompt Engineering Strategies")
+]
+
 def get_cns_path():
     """Get the ~/.personal-cns directory path"""
     return os.path.expanduser("~/.personal-cns")
 
-def load_recent_learnings(limit=5):
-    """Load recent learning entries from CNS episodic memory with full summaries"""
-    episodic_path = os.path.join(get_cns_path(), "cns", "memory", "episodic")
+def list_recent_learning_files(limit=5):
+    """(workspace, paths of the newest learning files), the workspace's learnings first
     
-    learnings = []
+    The workspace is detected as process-learning.py does when tagging learnings.
+    """
+    workspace = detect_workspace(get_cns_path())
+    episodic_path = os.path.join(get_cns_path(), "cns", "memory", "episodic")
     
     if not os.path.exists(episodic_path):
-        return learnings
+        return workspace, []
     
-    learning_files = glob.glob(os.path.join(episodic_path, "learning-*.md"))
-    # Filter out template file
-    learning_files = [f for f in learning_files if 'template' not in f.lower()]
-    learning_files.sort(reverse=True)  # Newest first
-    
-    for file_path in learning_files[:limit]:
-        try:
-            with open(file_path, 'r') as f:
-                content = f.read()
-            
-            filename = os.path.basename(file_path)
-            
-            # Extract timestamp from filename (learning-YYYY-MM-DD-HHMMSS.md)
-            # Format: learning-2025-12-23-233928.md
-            parts = filename.replace('.md', '').replace('learning-', '').split('-')
-            if len(parts) >= 4:
-                date_part = f"{parts[0]}-{parts[1]}-{parts[2]}"
-                time_part = parts[3]
-                if len(time_part) == 6:
-                    timestamp = f"{date_part} {time_part[:2]}:{time_part[2:4]}:{time_part[4:6]}"
-                else:
-                    timestamp = date_part
+    # Newest first, filtering out the template file
+    return workspace, newest_learning_paths(get_cns_path(), limit, workspace)
+
+def summarize_learning_file(file_path):
+    """Read one learning file and build its startup summary (None if unreadable)"""
+    try:
+        filename = os.path.basename(file_path)
+        
+        # Extract timestamp from filename (learning-YYYY-MM-DD-HHMMSS.md)
+        # Format: learning-2025-12-23-233928.md
+        parts = filename.replace('.md', '').replace('learning-', '').split('-')
+        if len(parts) >= 4:
+            date_part = f"{parts[0]}-{parts[1]}-{parts[2]}"
+            time_part = parts[3]
+            if len(time_part) == 6:
+                timestamp = f"{date_part} {time_part[:2]}:{time_part[2:4]}:{time_part[4:6]}"
             else:
-                timestamp = "Unknown time"
-            
-            # Extract learning content from "## Learning Content" section
-            learning_content = ""
-            lines = content.split('\n')
-            capture = False
-            content_lines = []
-            
-            for line in lines:
-                if line.strip() == "## Learning Content":
-                    capture = True
-                    continue
-                elif line.strip().startswith('##') and capture:
-                    break
-                elif capture and line.strip() and not line.startswith('**'):
-                    content_lines.append(line.strip())
-            
-            # Join content lines and extract first sentence or meaningful chunk
-            if content_lines:
-                full_content = ' '.join(content_lines)
-                # Remove markdown formatting and list markers
-                full_content = full_content.replace('**', '').replace('*', '').replace('- ', '').replace('1. ', '').replace('2. ', '').replace('3. ', '')
-                # Remove extra whitespace
-                full_content = ' '.join(full_content.split())
-                # Try to get first sentence
-                sentence_end = full_content.find('. ')
-                if sentence_end > 30 and sentence_end < 150:
-                    learning_content = full_content[:sentence_end + 1]
-                elif len(full_content) > 120:
-                    learning_content = full_content[:120] + "..."
-                else:
-                    learning_content = full_content
-            
-            # If no content found, use first non-header line
-            if not learning_content:
-                for line in lines:
+                timestamp = date_part
+        else:
+            timestamp = "Unknown time"
+        
+        # Extract learning content from "## Learning Content" section; only that
+        # slice of the (memory-mapped) file is decoded
+        learning_content = ""
+        section = read_section_lines(file_path, "## Learning Content", stop_prefix='##', indented_stop=True)
+        content_lines = [line.strip() for line in section or []
+                         if line.strip() and not line.startswith('**')]
+        
+        # Join content lines and extract first sentence or meaningful chunk
+        if content_lines:
+            full_content = ' '.join(content_lines)
+            # Remove markdown formatting and list markers
+            full_content = full_content.replace('**', '').replace('*', '').replace('- ', '').replace('1. ', '').replace('2. ', '').replace('3. ', '')
+            # Remove extra whitespace
+            full_content = ' '.join(full_content.split())
+            # Try to get first sentence
+            sentence_end = full_content.find('. ')
+            if sentence_end > 30 and sentence_end < 150:
+                learning_content = full_content[:sentence_end + 1]
+            elif len(full_content) > 120:
+                learning_content = full_content[:120] + "..."
+            else:
+                learning_content = full_content
+        
+        # If no content found, use first non-header line
+        if not learning_content:
+            with open(file_path, 'r') as f:
+                for line in f:
                     if line.strip() and not line.startswith('#') and not line.startswith('**'):
                         learning_content = line.strip()[:120]
                         break
-            
-            learnings.append({
-                'timestamp': timestamp,
-                'summary': learning_content if learning_content else "Learning captured",
-                'file': filename
-            })
-        except Exception as e:
-            continue
-    
-    return learnings
+        
+        return {
+            'timestamp': timestamp,
+            'summary': learning_content if learning_content else "Learning captured",
+            'file': filename
+        }
+    except Exception as e:
+        return None
+
+def load_recent_learnings(limit=5):
+    """(workspace, recent learning entries with full summaries), the workspace's learnings first"""
+    workspace, files = list_recent_learning_files(limit)
+    learnings = []
+    for file_path in files:
+        learning = summarize_learning_file(file_path)
+        if learning:
+            learnings.append(learning)
+    return workspace, learnings
+
+def count_episodic_learnings():
+    """Number of learning entries in CNS episodic memory"""
+    directory_stats = DirectoryStats(get_cns_path())
+    episodic = directory_stats.get('episodic')
+    if episodic is None:
+        return 0
+    return episodic.count + count_archived_learnings(directory_stats.directory('episodic'))
 
 def check_cns_component(component_path, component_name):
     """Check if a CNS component exists"""
@@ -101,8 +144,52 @@ def check_cns_component(component_path, component_name):
     exists = os.path.exists(full_path)
     return exists, full_path
 
-def display_startup_sequence():
-    """Display CNS startup sequence and loaded components"""
+def gather_startup_state():
+    """Probe every CNS component and read recent learnings, one call at a time"""
+    components = BRAIN_COMPONENTS + MEMORY_COMPONENTS + REFLEX_COMPONENTS + INTEGRATION_COMPONENTS
+    workspace, recent_learnings = load_recent_learnings(limit=5)
+    return {
+        'components': {path: check_cns_component(path, name)[0] for path, name in components},
+        'episodic_count': count_episodic_learnings(),
+        'workspace': workspace,
+        'recent_learnings': recent_learnings
+    }
+
+async def gather_startup_state_async():
+    """Probe every CNS component and read recent learnings concurrently
+    
+    Blocking filesystem calls run via asyncio.to_thread on a pool capped at
+    STARTUP_IO_WORKERS threads; the result matches gather_startup_state().
+    """
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=STARTUP_IO_WORKERS)
+    loop.set_default_executor(executor)
+    
+    components = BRAIN_COMPONENTS + MEMORY_COMPONENTS + REFLEX_COMPONENTS + INTEGRATION_COMPONENTS
+    probes = [asyncio.to_thread(check_cns_component, path, name) for path, name in components]
+    listing = asyncio.to_thread(list_recent_learning_files, 5)
+    counting = asyncio.to_thread(count_episodic_learnings)
+    
+    results = await asyncio.gather(*probes, listing, counting)
+    component_results = results[:len(components)]
+    (workspace, recent_files), episodic_count = results[len(components):]
+    
+    summaries = await asyncio.gather(*(asyncio.to_thread(summarize_learning_file, f) for f in recent_files))
+    
+    return {
+        'components': {path: result[0] for (path, name), result in zip(components, component_results)},
+        'episodic_count': episodic_count,
+        'workspace': workspace,
+        'recent_learnings': [learning for learning in summaries if learning]
+    }
+
+def render_startup_sequence(state):
+    """Display CNS startup sequence and loaded components from gathered state"""
+    
+    def print_components(components):
+        for path, name in components:
+            status = "✅" if state['components'][path] else "❌"
+            print(f"   {status} {name}")
     
     print("=" * 60)
     print("🧠 CENTRAL NEURAL SYSTEM INITIALIZATION")
@@ -111,18 +198,7 @@ def display_startup_sequence():
     
     # Check brain components
     print("📚 BRAIN COMPONENTS:")
-    brain_components = [
-        ("cns/brain/identity.md", "Identity & Purpose"),
-        ("cns/brain/capabilities.md", "Enhanced Capabilities"),
-        ("cns/brain/prime-principles.md", "Operating Principles"),
-        ("cns/brain/decision-framework.md", "Decision Framework"),
-        ("cns/brain/user-patterns.md", "User Patterns")
-    ]
-    
-    for path, name in brain_components:
-        exists, _ = check_cns_component(path, name)
-        status = "✅" if exists else "❌"
-        print(f"   {status} {name}")
+    print_components(BRAIN_COMPONENTS)
     
     print()
     
@@ -130,15 +206,14 @@ def display_startup_sequence():
     print("💾 MEMORY SYSTEMS:")
     
     # Episodic memory
-    episodic_path = os.path.join(get_cns_path(), "cns", "memory", "episodic")
-    episodic_count = len([f for f in glob.glob(os.path.join(episodic_path, "*.md")) if 'template' not in f.lower()]) if os.path.exists(episodic_path) else 0
-    print(f"   ✅ Episodic Memory ({episodic_count} learnings)")
+    print(f"   ✅ Episodic Memory ({state['episodic_count']} learnings)")
     
     # Recent learnings with full summaries
-    recent_learnings = load_recent_learnings(limit=5)
+    recent_learnings = state['recent_learnings']
     if recent_learnings:
         print()
-        print("   📝 Recent Learnings (last 5):")
+        workspace_first = f", {state['workspace']} first" if state['workspace'] else ""
+        print(f"   📝 Recent Learnings (last 5{workspace_first}):")
         for i, learning in enumerate(recent_learnings, 1):
             print(f"      {i}. [{learning['timestamp']}]")
             print(f"         {learning['summary']}")
@@ -146,43 +221,20 @@ def display_startup_sequence():
                 print()
     
     print()
-    # Semantic memory
-    semantic_exists, _ = check_cns_component("cns/memory/semantic/best-practices.md", "Semantic")
-    status = "✅" if semantic_exists else "❌"
-    print(f"   {status} Semantic Memory (Best Practices)")
-    
-    # Procedural memory
-    procedural_exists, _ = check_cns_component("cns/memory/procedural/workflow-patterns.md", "Procedural")
-    status = "✅" if procedural_exists else "❌"
-    print(f"   {status} Procedural Memory (Workflow Patterns)")
-    
-    # User preferences
-    prefs_exists, _ = check_cns_component("cns/memory/user-preferences.md", "User Preferences")
-    status = "✅" if prefs_exists else "❌"
-    print(f"   {status} User Preferences")
+    # Semantic memory, procedural memory and user preferences
+    print_components(MEMORY_COMPONENTS)
     
     print()
     
     # Check reflex system
     print("⚡ REFLEX SYSTEM:")
-    reflex_components = [
-        ("cns/reflexes/trigger-responses.md", "Trigger Responses"),
-        ("cns/reflexes/error-handling.md", "Error Handling"),
-        ("cns/reflexes/quality-checks.md", "Quality Checks")
-    ]
-    
-    for path, name in reflex_components:
-        exists, _ = check_cns_component(path, name)
-        status = "✅" if exists else "❌"
-        print(f"   {status} {name}")
+    print_components(REFLEX_COMPONENTS)
     
     print()
     
     # Check integration strategies
     print("🔗 INTEGRATION:")
-    integration_exists, _ = check_cns_component("cns/integration/prompt-engineering.md", "Prompt Engineering")
-    status = "✅" if integration_exists else "❌"
-    print(f"   {status} Prompt Engineering Strategies")
+    print_components(INTEGRATION_COMPONENTS)
     
     print()
     print("=" * 60)
@@ -190,5 +242,33 @@ def display_startup_sequence():
     print("=" * 60)
     print()
 
+def display_startup_sequence(use_async=True):
+    """Display CNS startup sequence and loaded components"""
+    began = time.perf_counter()
+    if use_async:
+        state = asyncio.run(gather_startup_state_async())
+    else:
+        state = gather_startup_state()
+    render_startup_sequence(state)
+    # Exported as cns_startup_latency_seconds by the next update-cns.py run
+    record_startup_latency(get_cns_path(), time.perf_counter() - began)
+
+def benchmark_startup(rounds=20):
+    """Compare wall time of the sequential and async startup engines"""
+    timings = {}
+    for label, gather in [("sequential", gather_startup_state),
+                          ("async", lambda: asyncio.run(gather_startup_state_async()))]:
+        began = time.perf_counter()
+        for _ in range(rounds):
+            gather()
+        timings[label] = (time.perf_counter() - began) / rounds
+    
+    print(f"📊 Startup probe wall time (mean of {rounds} runs):")
+    print(f"   Sequential: {timings['sequential'] * 1000:.1f} ms")
+    print(f"   Async:      {timings['async'] * 1000:.1f} ms")
+
 if __name__ == "__main__":
-    display_startup_sequence()
+    if '--benchmark' in sys.argv:
+        benchmark_startup()
+    else:
+        display_startup_sequence(use_async='--sequential' not in sys.argv)
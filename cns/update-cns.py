@@ -6,10 +6,25 @@ Comprehensive CNS maintenance: context updates, learning evaluation, memory cons
 
 import os
 import sys
-import subprocess
-from datetime import datetime
+import json
+import time
+import argparse
+from collections import namedtuple
+from datetime import datetime, timedelta
 from pathlib import Path
 
+from cnslib.budget import Budget
+from cnslib.dirstats import DirectoryStats
+from cnslib.episodic import list_memory_files, split_named_stem
+from cnslib.features import get_feature_store_path, load_table_summaries
+from cnslib.metrics import MetricSet, get_metrics_dir, load_startup_latency, write_metrics
+from cnslib.results import final_result, run_with_result_channel
+from cnslib.retention import apply_retention, count_archived_learnings
+from cnslib.retrieval import RetrievalIndex, get_index_path, sync_index
+from cnslib.storage import append_text
+from cnslib.taskgraph import Task, TaskGraph, TaskGraphError, critical_path_seconds
+from cnslib.wal import WAL_DIR, WAL_FILE
+
 def get_cns_path():
     """Get the ~/.personal-cns directory path"""
     return os.path.expanduser("~/.personal-cns")
@@ -60,8 +75,25 @@ def detect_file_changes(file_path, before_content):
         print(f"   Warning: Could not read {file_path} for change detection: {e}")
         return None
 
-def run_script_with_file_tracking(script_path, description, tracked_files=None, *args):
-    """Run a CNS script with file change tracking"""
+# partial: the phase stopped at its time budget and kept what it had finished
+PhaseResult = namedtuple('PhaseResult', ['success', 'output', 'modifications', 'file_changes', 'data', 'partial'],
+                         defaults=(None, (), None, None, False))
+
+# Time budget of a phase unless --budget says otherwise (the old flat script timeout)
+DEFAULT_PHASE_BUDGET = 300
+
+def run_script_with_file_tracking(script_path, description, tracked_files=None, *args, echo_output=True, budget=None):
+    """Run a CNS script with file change tracking; returns a PhaseResult
+    
+    The script's stdout is streamed as it runs (unless echo_output=False, for
+    scripts whose output is structured data handled by the caller). Status,
+    counters, timing and files written come from the script's result channel
+    rather than from its printed text.
+    
+    When the budget (a cnslib.budget Budget) runs out or is cancelled the script
+    is asked to stop; scripts that support it report 'partial' results, which are
+    kept rather than discarded.
+    """
     print(f"🔄 {description}...")
     
     # Take snapshots of tracked files before execution
@@ -71,10 +103,17 @@ def run_script_with_file_tracking(script_path, description, tracked_files=None,
             abs_path = file_path if os.path.isabs(file_path) else os.path.join(get_cns_path(), "cns", file_path)
             file_snapshots[abs_path] = capture_file_snapshot(abs_path)
     
+    def echo(line):
+        print(f"      {line}" if line.strip() else "", flush=True)
+    
     try:
         cmd = ["python3", script_path] + list(args)
-        result = subprocess.run(cmd, cwd=os.path.dirname(script_path), 
-                              capture_output=True, text=True, timeout=300)
+        run = run_with_result_channel(cmd, cwd=os.path.dirname(script_path),
+                                      timeout=None if budget else DEFAULT_PHASE_BUDGET,
+                                      on_output=echo if echo_output else None, budget=budget)
+        if run.timed_out:
+            print(f"⏰ {description} did not stop at its time budget and was killed")
+            return PhaseResult(False, "Timeout")
         
         # Detect file changes after execution
         file_changes = {}
@@ -86,55 +125,46 @@ def run_script_with_file_tracking(script_path, description, tracked_files=None,
                 if change_info and change_info["status"] != "unchanged":
                     file_changes[abs_path] = change_info
         
-        if result.returncode == 0:
-            print(f"✅ {description} completed successfully")
-            output_lines = result.stdout.strip().split('\n') if result.stdout.strip() else []
-            
-            # Show all output to user and capture for context logging
-            modifications_found = []
-            line_count = 1
-            for line in output_lines:
-                if line.strip():  # Only print non-empty lines
-                    # Add numbers to key action lines
-                    if any(indicator in line for indicator in ['✅', '🔄', '📝', '🔍', '📚', '🧠', '🚪', '📊', '⚠️', '💤', '🆕', '💭']):
-                        print(f"   {line_count}. {line}")
-                        line_count += 1
-                    else:
-                        print(f"      {line}")  # Indent sub-items
-                else:
-                    print()  # Print empty line for spacing
-                
-                # Capture file modifications for context logging
-                if any(keyword in line.lower() for keyword in ['updated', 'created', 'modified', 'saved', 'renamed']):
-                    if '.md' in line:
-                        modifications_found.append(line.strip())
-            
-            return True, result.stdout, modifications_found, file_changes
+        result = final_result(run.events)
+        status = result['status'] if result else ('success' if run.returncode == 0 else 'failed')
+        
+        if run.returncode == 0 and status != 'failed':
+            if status == 'partial':
+                print(f"⏳ {description} stopped early ({result.get('reason', 'time budget expired')}); partial results kept")
+            else:
+                print(f"✅ {description} completed successfully")
+            modifications = []
+            if result:
+                modifications = [f"{entry['action'].title()} {entry['path']}" for entry in result['files']]
+                counters = ', '.join(f"{name}={value}" for name, value in result['counters'].items())
+                print(f"   ⏱️  {result['duration']:.2f}s{' | ' + counters if counters else ''}")
+            return PhaseResult(True, run.stdout, modifications, file_changes, result, status == 'partial')
         else:
-            print(f"❌ {description} failed")
-            if result.stderr:
-                print(f"   Error: {result.stderr.strip()}")
-            return False, result.stderr, [], file_changes
+            if run.stopped:
+                print(f"⏰ {description} was stopped at its time budget without reporting results")
+            else:
+                print(f"❌ {description} failed")
+            error = (result or {}).get('error') or run.stderr.strip()
+            if error:
+                print(f"   Error: {error}")
+            return PhaseResult(False, run.stderr, [], file_changes, result)
             
-    except subprocess.TimeoutExpired:
-        print(f"⏰ {description} timed out (5 minutes)")
-        return False, "Timeout", [], {}
     except Exception as e:
         print(f"❌ {description} error: {e}")
-        return False, str(e), [], {}
+        return PhaseResult(False, str(e))
 
 def run_script(script_path, description, *args):
     """Run a CNS script with error handling and output capture"""
-    success, output, modifications, file_changes = run_script_with_file_tracking(script_path, description, None, *args)
-    return success, output, modifications
+    run = run_script_with_file_tracking(script_path, description, None, *args)
+    return run.success, run.output, run.modifications
 
-def run_principle_evaluation():
+def run_principle_evaluation(budget=None):
     """Run the principle evaluation system"""
     script_path = os.path.join(get_cns_path(), "cns", "brain", "principle-evaluator.py")
     
     if not os.path.exists(script_path):
         print("❌ principle-evaluator.py not found")
-        return False, None, [], {}
+        return PhaseResult(False)
     
     # Track principle-related files
     tracked_files = [
@@ -142,18 +172,52 @@ def run_principle_evaluation():
         "brain/principle-evaluation-report.md"
     ]
     
-    success, output, modifications, file_changes = run_script_with_file_tracking(
-        script_path, "Evaluating prime principles", tracked_files
+    run = run_script_with_file_tracking(
+        script_path, "Evaluating prime principles", tracked_files, "--format", "json",
+        echo_output=False, budget=budget
     )
-    return success, output, modifications, file_changes
+    if run.success:
+        print_principle_evaluation_summary(parse_json_records(run.output))
+    return run
+
+def parse_json_records(output):
+    """Parse JSON Lines script output into a list of records, skipping malformed lines"""
+    records = []
+    for line in (output or '').splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            continue
+    return records
 
-def run_user_pattern_learning():
+def print_principle_evaluation_summary(records):
+    """Summarize principle evaluator JSON records for the update log"""
+    summary = next((r for r in records if r.get('record') == 'summary'), None)
+    if summary is None:
+        print("   ⚠️  No evaluation summary received")
+        return
+    
+    print(f"   1. 📊 Principles: {summary['active']} active, {summary['under_review']} under review, {summary['unused']} unused")
+    print(f"   2. 🆕 New Candidates: {summary['new_candidates']}")
+    for record in records:
+        if record.get('record') == 'evaluation' and record['status'] == 'under_review':
+            print(f"      ⚠️  Review: {record['title']}")
+        elif record.get('record') == 'candidate':
+            print(f"      🆕 {record['type'].title()}: {record['proposed_principle']}")
+        elif record.get('record') == 'partial':
+            print(f"   ⏳ Partial ({record['reason']}): {len(record['pending'])} principles not evaluated, "
+                  f"candidates not detected; the next run resumes from the checkpoint")
+
+def run_user_pattern_learning(budget=None):
     """Run the user pattern learning system"""
     script_path = os.path.join(get_cns_path(), "cns", "brain", "user-pattern-learner.py")
     
     if not os.path.exists(script_path):
         print("❌ user-pattern-learner.py not found")
-        return False, None, [], {}
+        return PhaseResult(False)
     
     # Track user pattern files
     tracked_files = [
@@ -161,61 +225,77 @@ def run_user_pattern_learning():
         "memory/user-preferences.md"
     ]
     
-    success, output, modifications, file_changes = run_script_with_file_tracking(
-        script_path, "Analyzing user behavior patterns", tracked_files
+    # Phases share the terminal and run alongside each other, and script output
+    # is read line by line, so the learner cannot prompt here: it lists its
+    # suggestions for the user to review by running it directly
+    return run_script_with_file_tracking(
+        script_path, "Analyzing user behavior patterns", tracked_files, "--no-input", budget=budget
     )
-    return success, output, modifications, file_changes
 
-def consolidate_memory_systems():
-    """Consolidate and organize memory systems"""
+def materialize_logged_learnings(budget=None):
+    """Write out learnings still only in the write-ahead log (deferred captures whose background update never ran)"""
+    learning_script = os.path.join(get_cns_path(), "cns", "process-learning.py")
+    if not os.path.exists(learning_script):
+        print("❌ process-learning.py not found")
+        return PhaseResult(False)
+    
+    return run_script_with_file_tracking(learning_script, "Materializing logged learnings", None, "--materialize",
+                                         budget=budget)
+
+def consolidate_memory_systems(budget=None):
+    """Consolidate and organize memory systems
+    
+    Retention and the index sync are skipped once `budget` has expired; both
+    pick up where they are on the next run.
+    """
     print("🧠 Consolidating memory systems...")
+    budget = budget or Budget()
     
     modifications = []
     
-    # Check episodic memory organization
-    episodic_path = os.path.join(get_cns_path(), "cns", "memory", "episodic")
-    if os.path.exists(episodic_path):
-        learning_files = list(Path(episodic_path).glob("*.md"))
-        print(f"   1. 📚 Found {len(learning_files)} episodic learning entries")
+    # Check episodic memory organization (cached directory statistics: no scan)
+    directory_stats = DirectoryStats(get_cns_path())
+    episodic = directory_stats.get('episodic')
+    if episodic is not None:
+        archived = count_archived_learnings(directory_stats.directory('episodic'))
+        print(f"   1. 📚 Found {episodic.count} episodic learning entries{f' (+{archived} in monthly digests)' if archived else ''}")
         
         # Organize by date if needed (future enhancement)
-        recent_learnings = [f for f in learning_files 
-                          if (datetime.now() - datetime.fromtimestamp(f.stat().st_mtime)).days <= 30]
-        print(f"   2. 📅 {len(recent_learnings)} learnings from last 30 days")
+        recent_learnings = episodic.count_since(datetime.now() - timedelta(days=30))
+        print(f"   2. 📅 {recent_learnings} learnings from last 30 days")
     
     # Check context memory organization  
-    context_path = os.path.join(get_cns_path(), "cns", "memory", "context")
-    if os.path.exists(context_path):
-        context_files = list(Path(context_path).glob("context-*.md"))
-        print(f"   3. 📝 Found {len(context_files)} context files")
-        
-        # Cleanup old context files (keep most recent 5 per workspace)
-        workspace_contexts = {}
-        for context_file in context_files:
-            filename = context_file.name
-            if filename.count('-') >= 4:
-                parts = filename.replace('.md', '').split('-')
-                workspace = '-'.join(parts[4:])
-                if workspace not in workspace_contexts:
-                    workspace_contexts[workspace] = []
-                workspace_contexts[workspace].append(context_file)
-        
-        total_deleted = 0
-        deleted_files = []
-        for workspace, files in workspace_contexts.items():
-            if len(files) > 5:
-                files.sort(key=lambda f: f.stat().st_mtime, reverse=True)
-                for old_file in files[5:]:
-                    try:
-                        deleted_files.append(old_file.name)
-                        old_file.unlink()
-                        total_deleted += 1
-                    except Exception as e:
-                        print(f"   Warning: Could not delete {old_file.name}: {e}")
-        
-        if total_deleted > 0:
-            print(f"   🧹 Cleaned up {total_deleted} old context files")
-            modifications.append(f"Deleted {total_deleted} old context files: {', '.join(deleted_files[:3])}{'...' if len(deleted_files) > 3 else ''}")
+    context = directory_stats.get('context')
+    if context is not None:
+        print(f"   3. 📝 Found {context.count} context files across {len(context.groups)} workspaces/contexts")
+    
+    if budget.expired():
+        print(f"   ⏳ Stopped early ({budget.reason()}): retention and index sync left for the next run")
+        return True, modifications
+    
+    # Apply retention policies (memory/retention.json): prune contexts, compact old learnings
+    for report in apply_retention(get_cns_path()):
+        if report.deleted:
+            print(f"   🧹 Cleaned up {len(report.deleted)} old {report.policy} files")
+            modifications.append(f"Deleted {len(report.deleted)} old {report.policy} files: {', '.join(report.deleted[:3])}{'...' if len(report.deleted) > 3 else ''}")
+        if report.compacted:
+            print(f"   🗜️  Compacted {report.compacted} old {report.policy} into {len(report.digests)} monthly digest(s)")
+            modifications.append(f"Compacted {report.compacted} {report.policy} into {', '.join(report.digests)}")
+        if report.dry_run and report.expired:
+            print(f"   🗂️  {len(report.expired)} {report.policy} files are past retention (left in place: "
+                  f"enable the '{report.policy}' policy in memory/retention.json to apply it)")
+    
+    if budget.expired():
+        print(f"   ⏳ Stopped early ({budget.reason()}): index sync left for the next run")
+        return True, modifications
+    
+    # Catch the retrieval index up with memory (new learnings, compacted paths)
+    try:
+        with RetrievalIndex(get_index_path(get_cns_path())) as index:
+            added, removed = sync_index(get_cns_path(), index)
+            print(f"   🔎 Retrieval index: {len(index)} documents ({added} added, {removed} removed)")
+    except Exception as e:
+        print(f"   Warning: Could not update retrieval index: {e}")
     
     print("✅ Memory consolidation completed")
     return True, modifications
@@ -279,17 +359,18 @@ def analyze_cns_health():
                 'description': description
             }
     
-    # Memory system health
+    # Memory system health (counts, sizes and age range from the cached directory statistics)
     memory_paths = ['memory/episodic', 'memory/context', 'memory/semantic', 'memory/procedural']
+    directory_stats = DirectoryStats(get_cns_path())
     
     for mem_path in memory_paths:
         full_path = os.path.join(cns_path, mem_path)
         if os.path.exists(full_path):
-            if mem_path.endswith(('episodic', 'context')):
-                file_count = len(list(Path(full_path).glob("*.md")))
+            snapshot = directory_stats.get(os.path.basename(mem_path)) if mem_path.endswith(('episodic', 'context')) else None
+            if snapshot is not None:
                 health_data['memory_systems'][mem_path] = {
                     'status': 'active',
-                    'file_count': file_count
+                    **snapshot.as_dict()
                 }
             else:
                 health_data['memory_systems'][mem_path] = {
@@ -301,6 +382,9 @@ def analyze_cns_health():
                 'status': 'missing'
             }
     
+    # Learning feature store (whole-history aggregates without re-parsing markdown)
+    health_data['feature_store'] = load_table_summaries(get_feature_store_path(get_cns_path()))
+    
     # Print summary
     active_components = sum(1 for data in health_data['components'].values() if data['status'] == 'active')
     total_components = len(health_data['components'])
@@ -310,127 +394,102 @@ def analyze_cns_health():
     
     print(f"   1. 📊 System Health: {active_components}/{total_components} components active")
     print(f"   2. 🧠 Memory Systems: {active_memory}/{total_memory} systems active")
+    for mem_path in ('memory/episodic', 'memory/context'):
+        data = health_data['memory_systems'][mem_path]
+        if 'file_count' in data:
+            age_range = f" ({data['oldest']} to {data['newest']})" if data['oldest'] else ""
+            print(f"      {mem_path}: {data['file_count']} files, {data['bytes'] / 1024:.0f} KB{age_range}")
+    if health_data['feature_store']:
+        recorded = max(data['rows'] for data in health_data['feature_store'].values())
+        print(f"   3. 📊 Feature Store: {recorded} learnings recorded across {len(health_data['feature_store'])} feature families")
     
     return health_data
 
-def main():
-    """Main CNS update orchestration"""
-    print("🧠 COMPREHENSIVE CNS UPDATE STARTING...")
-    print("=" * 60)
-    print()
-    
-    start_time = datetime.now()
-    
-    # Track update results and modifications
-    results = {
-        'context_update': False,
-        'principle_evaluation': False,
-        'user_pattern_learning': False,
-        'memory_consolidation': False,
-        'reflex_updates': False,
-        'health_analysis': False
-    }
-    
-    all_modifications = []
-    all_outputs = []
-    all_file_changes = {}
-    
-    # 1. Run principle evaluation
-    print("🔄 PHASE 1: Principle Evaluation")
-    print("-" * 30)
-    results['principle_evaluation'], principle_output, principle_mods, principle_changes = run_principle_evaluation()
-    if principle_output:
-        all_outputs.append(f"PRINCIPLE EVALUATION: {principle_output.strip()}")
-    all_modifications.extend(principle_mods)
-    all_file_changes.update(principle_changes)
-    print()
-    
-    # 2. Run user pattern learning
-    print("🔄 PHASE 2: User Pattern Learning")
-    print("-" * 30)
-    results['user_pattern_learning'], pattern_output, pattern_mods, pattern_changes = run_user_pattern_learning()
-    if pattern_output:
-        all_outputs.append(f"USER PATTERN LEARNING: {pattern_output.strip()}")
-    all_modifications.extend(pattern_mods)
-    all_file_changes.update(pattern_changes)
-    print()
-    
-    # 4. Consolidate memory systems
-    print("🔄 PHASE 4: Memory Consolidation")
-    print("-" * 30)
-    results['memory_consolidation'], memory_mods = consolidate_memory_systems()
-    all_modifications.extend(memory_mods)
-    print()
-    
-    # 5. Update reflex systems
-    print("🔄 PHASE 5: Reflex System Updates")
-    print("-" * 30)
-    results['reflex_updates'], reflex_mods = run_reflex_system_updates()
-    all_modifications.extend(reflex_mods)
-    print()
-    
-    # 6. Analyze system health
-    print("🔄 PHASE 6: System Health Analysis")
-    print("-" * 30)
-    health_data = analyze_cns_health()
-    results['health_analysis'] = health_data is not None
-    print()
-    
-    # Final summary
-    end_time = datetime.now()
-    duration = end_time - start_time
-    
-    print("🎯 CNS UPDATE SUMMARY")
-    print("=" * 60)
-    
-    success_count = sum(1 for success in results.values() if success)
-    total_phases = len(results)
-    
-    for i, (phase, success) in enumerate(results.items(), 1):
-        status = "✅" if success else "❌"
-        print(f"{i}. {status} {phase.replace('_', ' ').title()}")
-    
-    print()
-    print(f"📊 Success Rate: {success_count}/{total_phases} phases completed")
-    print(f"⏱️  Duration: {duration.total_seconds():.1f} seconds")
-    
-    if all_modifications:
-        print(f"📝 Files Modified: {len(all_modifications)}")
-        for i, mod in enumerate(all_modifications, 1):
-            print(f"   {i}. {mod}")
-    
-    # Create comprehensive context update
-    context_summary_parts = [
-        f"CNS maintenance completed with {success_count}/{total_phases} phases successful in {duration.total_seconds():.1f}s"
-    ]
+def get_current_context_file():
+    """Newest file of the session context named in current-context.txt, or None"""
+    try:
+        with open(os.path.join(get_cns_path(), 'current-context.txt'), 'r') as f:
+            context_name = f.read().strip()
+    except OSError:
+        return None
+    if not context_name:
+        return None
     
-    if all_modifications:
-        context_summary_parts.append(f"Files modified: {'; '.join(all_modifications)}")
+    context_path = os.path.join(get_cns_path(), "cns", "memory", "context")
+    for memory_file in list_memory_files(context_path, prefix=f"{context_name}-"):
+        named = split_named_stem(memory_file.name[:-3])
+        if named and named[0] == context_name:
+            return memory_file.path
+    return None
+
+def update_session_context(report_lines):
+    """Append the maintenance report to the active session context file"""
+    print("📝 Updating session context...")
+    
+    context_file = get_current_context_file()
+    if context_file is None:
+        print("   1. ℹ️  No active session context; maintenance results not recorded")
+        return True, []
+    
+    with DirectoryStats(get_cns_path()).tracking('context') as changes:
+        old_size = os.path.getsize(context_file)
+        append_text(context_file, "\n" + "\n".join(report_lines) + "\n")
+        changes.resized(context_file, old_size)
+    print(f"   1. 📝 Maintenance results added to {os.path.basename(context_file)}")
+    return True, [f"Updated {context_file}"]
+
+def collect_phase_results(outcomes):
+    """(modifications, file_changes, health_data) gathered from finished phases"""
+    modifications = []
+    file_changes = {}
+    health_data = None
+    for outcome in outcomes.values():
+        result = outcome.result
+        if result is None:
+            continue
+        modifications.extend(result.modifications)
+        file_changes.update(result.file_changes or {})
+        if outcome.name == 'health_analysis':
+            health_data = result.data
+    return modifications, file_changes, health_data
+
+PHASE_STATUS_NOTES = {'up_to_date': " (up to date)", 'partial': " (partial)", 'cancelled': " (cancelled)"}
+
+def phase_succeeded(outcome):
+    return outcome.status in ('success', 'partial', 'up_to_date')
+
+def phase_label(outcome):
+    return outcome.name.replace('_', ' ').title() + PHASE_STATUS_NOTES.get(outcome.status, "")
+
+def build_maintenance_report(outcomes, duration):
+    """Markdown maintenance results for the session context file"""
+    modifications, file_changes, health_data = collect_phase_results(outcomes)
+    success_count = sum(1 for outcome in outcomes.values() if phase_succeeded(outcome))
+    total_phases = len(outcomes)
     
-    # Create detailed context entry
     context_details = []
     context_details.append("## CNS Maintenance Results")
     context_details.append(f"- **Timestamp**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    context_details.append(f"- **Duration**: {duration.total_seconds():.1f} seconds")
+    context_details.append(f"- **Duration**: {duration:.1f} seconds")
     context_details.append(f"- **Success Rate**: {success_count}/{total_phases} phases")
     context_details.append("")
     
     context_details.append("### Phase Results")
-    for phase, success in results.items():
-        status = "✅" if success else "❌"
-        context_details.append(f"- {status} {phase.replace('_', ' ').title()}")
+    for outcome in outcomes.values():
+        status = "✅" if phase_succeeded(outcome) else "❌"
+        context_details.append(f"- {status} {phase_label(outcome)}")
     context_details.append("")
     
-    if all_modifications:
+    if modifications:
         context_details.append("### Files Modified")
-        for mod in all_modifications:
+        for mod in modifications:
             context_details.append(f"- {mod}")
         context_details.append("")
     
     # Add verbatim file content changes
-    if all_file_changes:
+    if file_changes:
         context_details.append("### Verbatim File Changes")
-        for file_path, change_info in all_file_changes.items():
+        for file_path, change_info in file_changes.items():
             file_name = os.path.basename(file_path)
             status = change_info["status"]
             
@@ -469,15 +528,292 @@ def main():
         context_details.append(f"- Memory Systems: {active_memory}/{total_memory} active")
         context_details.append("")
     
+    return context_details
+
+def phase_counters(outcome):
+    """Counters a script phase reported on its result channel ({} for in-process phases)"""
+    data = getattr(outcome.result, 'data', None)
+    if isinstance(data, dict) and isinstance(data.get('counters'), dict):
+        return data['counters']
+    return {}
+
+def build_run_metrics(tasks, outcomes, health_data, duration):
+    """Metrics of one maintenance run: phases, memory sizes, throughput, cache hit rates, startup"""
+    metrics = MetricSet()
+    metrics.add('update_last_run_timestamp_seconds', round(time.time(), 3), "Unix time the last maintenance run finished")
+    metrics.add('update_duration_seconds', round(duration, 4), "Wall time of the last maintenance run")
+    metrics.add('update_critical_path_seconds', round(critical_path_seconds(tasks, outcomes), 4),
+                "Longest dependency chain of the last run by phase duration")
+    
+    for outcome in outcomes.values():
+        metrics.add('phase_duration_seconds', round(outcome.duration, 4), "Duration of each phase in the last run",
+                    {'phase': outcome.name})
+    for outcome in outcomes.values():
+        metrics.add('phase_success', phase_succeeded(outcome),
+                    "Whether each phase succeeded (partial and up-to-date count as success)",
+                    {'phase': outcome.name, 'status': outcome.status})
+    for outcome in outcomes.values():
+        for counter, value in phase_counters(outcome).items():
+            if isinstance(value, (int, float)):
+                metrics.add('phase_counter', value, "Counters reported by phase scripts in the last run",
+                            {'phase': outcome.name, 'counter': counter})
+    
+    # Evaluation throughput, over the evaluator's own run time
+    evaluation = outcomes.get('principle_evaluation')
+    evaluated = phase_counters(evaluation).get('learnings') if evaluation else None
+    seconds = (getattr(evaluation.result, 'data', None) or {}).get('duration') if evaluation else None
+    if evaluated is not None and seconds:
+        metrics.add('principle_evaluation_learnings_per_second', round(evaluated / seconds, 2),
+                    "Learnings loaded and evaluated per second by the last principle evaluation")
+    
+    # Cache hit rates: sidecar features, cached directory statistics, phases skipped by fingerprint
+    cache_help = "Fraction of lookups served from each cache in the last run"
+    if evaluated:
+        metrics.add('cache_hit_ratio', round(phase_counters(evaluation).get('sidecar_hits', 0) / evaluated, 4),
+                    cache_help, {'cache': 'learning_sidecars'})
+    directory_snapshots = [data for data in (health_data or {}).get('memory_systems', {}).values() if 'cached' in data]
+    if directory_snapshots:
+        metrics.add('cache_hit_ratio', round(sum(data['cached'] for data in directory_snapshots) / len(directory_snapshots), 4),
+                    cache_help, {'cache': 'directory_stats'})
+    if outcomes:
+        skipped = sum(1 for outcome in outcomes.values() if outcome.status == 'up_to_date')
+        metrics.add('cache_hit_ratio', round(skipped / len(outcomes), 4),
+                    cache_help, {'cache': 'phase_fingerprints'})
+    
+    if health_data:
+        components = health_data['components'].values()
+        metrics.add('components_active', sum(1 for data in components if data['status'] == 'active'),
+                    "CNS components present")
+        metrics.add('components_total', len(health_data['components']), "CNS components expected")
+        for mem_path, data in health_data['memory_systems'].items():
+            metrics.add('memory_system_active', data['status'] == 'active', "Whether each memory system exists",
+                        {'directory': mem_path})
+        for mem_path, data in health_data['memory_systems'].items():
+            metrics.add('memory_files', data.get('file_count'), "Memory files per directory", {'directory': mem_path})
+        for mem_path, data in health_data['memory_systems'].items():
+            metrics.add('memory_bytes', data.get('bytes'), "Bytes of memory files per directory", {'directory': mem_path})
+        for mem_path, data in health_data['memory_systems'].items():
+            for group, group_data in data.get('groups', {}).items():
+                metrics.add('memory_group_files', group_data['file_count'],
+                            "Memory files per directory and workspace or context", {'directory': mem_path, 'group': group})
+        for family, data in (health_data.get('feature_store') or {}).items():
+            metrics.add('feature_store_rows', data['rows'], "Learnings recorded per feature family", {'family': family})
+    
+    startup = load_startup_latency(get_cns_path())
+    if startup:
+        metrics.add('startup_latency_seconds', startup['seconds'], "Wall time of the latest startup sequence")
+        metrics.add('startup_last_run_timestamp_seconds', round(startup.get('timestamp', 0), 3),
+                    "Unix time of the latest startup sequence")
+    return metrics
+
+def export_run_metrics(tasks, outcomes, duration, metrics_dir=None):
+    """Write the run's metrics as cns.prom and cns.json; returns the .prom path (None on failure)"""
+    health_data = collect_phase_results(outcomes)[2]
+    details = {
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'duration': round(duration, 4),
+        'phases': {outcome.name: {'status': outcome.status,
+                                  'duration': round(outcome.duration, 4),
+                                  'counters': phase_counters(outcome)}
+                   for outcome in outcomes.values()},
+        'health': health_data,
+        'startup': load_startup_latency(get_cns_path())
+    }
+    try:
+        prometheus_path, _ = write_metrics(metrics_dir or get_metrics_dir(get_cns_path()),
+                                           build_run_metrics(tasks, outcomes, health_data, duration), details)
+    except OSError as e:
+        print(f"   Warning: Could not write metrics: {e}")
+        return None
+    return prometheus_path
+
+def build_maintenance_tasks(start_time):
+    """The maintenance phases, with the files each reads and writes (relative to cns/)"""
+    def script_phase(run_phase):
+        return lambda upstream, budget: run_phase(budget)
+    
+    def memory_consolidation(upstream, budget):
+        success, modifications = consolidate_memory_systems(budget)
+        return PhaseResult(success, None, modifications, partial=budget.expired())
+    
+    def reflex_updates(upstream, budget):
+        success, modifications = run_reflex_system_updates()
+        return PhaseResult(success, None, modifications)
+    
+    def health_analysis(upstream, budget):
+        health_data = analyze_cns_health()
+        return PhaseResult(health_data is not None, data=health_data)
+    
+    def context_update(upstream, budget):
+        duration = (datetime.now() - start_time).total_seconds()
+        success, modifications = update_session_context(build_maintenance_report(upstream, duration))
+        return PhaseResult(success, None, modifications)
+    
+    return [
+        Task('learning_materialization', "Learning Materialization", script_phase(materialize_logged_learnings),
+             inputs=(f"memory/{WAL_DIR}/{WAL_FILE}", 'process-learning.py'),
+             outputs=('memory/episodic', 'memory/semantic', 'memory/index')),
+        # The evaluation windows move with the calendar, so re-run daily even when nothing changed
+        Task('principle_evaluation', "Principle Evaluation", script_phase(run_principle_evaluation),
+             deps=('learning_materialization',),
+             inputs=('memory/episodic', 'memory/vocabularies.json', 'brain/prime-principles.md',
+                     'brain/principle-evaluator.py'),
+             outputs=('brain/principle-evaluation-report.md', 'memory/features'),
+             max_age_hours=24),
+        Task('user_pattern_learning', "User Pattern Learning", script_phase(run_user_pattern_learning),
+             deps=('learning_materialization',),
+             inputs=('memory/episodic', 'memory/vocabularies.json', 'brain/user-pattern-learner.py'),
+             outputs=('brain/user-patterns.md', 'memory/features'),
+             max_age_hours=24),
+        # Compaction removes learning files, so it waits for the phases that read them.
+        # Its retention windows move with the calendar and it rewrites the episodic and
+        # context directories itself, so it runs on configuration changes and daily
+        Task('memory_consolidation', "Memory Consolidation", memory_consolidation,
+             deps=('principle_evaluation', 'user_pattern_learning'),
+             inputs=('memory/semantic', 'memory/retention.json'),
+             outputs=('memory/episodic', 'memory/context', 'memory/index'),
+             max_age_hours=24),
+        # Reflex files edited in place leave the directory mtime alone, so also re-run daily
+        Task('reflex_updates', "Reflex System Updates", reflex_updates,
+             inputs=('reflexes',), max_age_hours=24),
+        Task('health_analysis', "System Health Analysis", health_analysis,
+             deps=('memory_consolidation',),
+             inputs=('memory',), always=True),
+        # Records every other phase's results in the session context, so it runs last
+        Task('context_update', "Context Update", context_update,
+             deps=('learning_materialization', 'principle_evaluation', 'user_pattern_learning',
+                   'memory_consolidation', 'reflex_updates', 'health_analysis'),
+             outputs=('memory/context',), always=True)
+    ]
+
+def get_update_state_path():
+    return os.path.join(get_cns_path(), "cns", "memory", "update-state.json")
+
+def print_phase_header(number, task):
+    print(f"🔄 PHASE {number}: {task.title}")
+    print("-" * 30)
+
+def print_phase(number, task, outcome):
+    """Print how one phase ended (the header and output of a phase that ran are already out)"""
+    if outcome.status == 'up_to_date':
+        print_phase_header(number, task)
+        print("⏭️  Up to date (inputs unchanged since the last successful run)")
+    elif outcome.status == 'cancelled':
+        print_phase_header(number, task)
+        print("🛑 Not started (maintenance was cancelled)")
+    elif outcome.error:
+        print(f"❌ {task.title} error: {outcome.error}")
+    print()
+
+def parse_task_names(values):
+    """Task names from repeatable, comma-separated --only / --skip values"""
+    return [name.strip() for value in values or () for name in value.split(',') if name.strip()]
+
+def parse_budgets(values):
+    """(default seconds, {phase: seconds}) from --budget SECONDS / --budget PHASE=SECONDS values"""
+    default, budgets = DEFAULT_PHASE_BUDGET, {}
+    for value in values or ():
+        for item in value.split(','):
+            name, _, seconds = item.strip().rpartition('=')
+            try:
+                seconds = float(seconds)
+            except ValueError:
+                raise argparse.ArgumentTypeError(f"invalid budget '{item}'")
+            if name:
+                budgets[name] = seconds
+            else:
+                default = seconds
+    return default, budgets
+
+def main(argv=None):
+    """Main CNS update orchestration"""
+    parser = argparse.ArgumentParser(description="Run CNS maintenance phases")
+    parser.add_argument('--only', action='append', metavar='PHASES', help="run only these phases (comma-separated)")
+    parser.add_argument('--skip', action='append', metavar='PHASES', help="do not run these phases (comma-separated)")
+    parser.add_argument('--force', action='store_true', help="run phases even if their inputs are unchanged")
+    parser.add_argument('--jobs', type=int, default=4, help="phases run at the same time (default 4)")
+    parser.add_argument('--budget', action='append', metavar='[PHASE=]SECONDS',
+                        help=f"time budget per phase (default {DEFAULT_PHASE_BUDGET}s); phases stop there with partial results")
+    parser.add_argument('--list', action='store_true', help="list the phases and their dependencies")
+    parser.add_argument('--metrics-dir', metavar='DIR',
+                        help="where to write cns.prom and cns.json (default $CNS_METRICS_DIR or memory/metrics)")
+    args = parser.parse_args(argv)
+    try:
+        default_budget, budgets = parse_budgets(args.budget)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+    
+    start_time = datetime.now()
+    tasks = build_maintenance_tasks(start_time)
+    unknown = set(budgets) - {task.name for task in tasks}
+    if unknown:
+        parser.error(f"unknown phase in --budget: {', '.join(sorted(unknown))}")
+    
+    if args.list:
+        for task in tasks:
+            after = f" (after {', '.join(task.deps)})" if task.deps else ""
+            print(f"{task.name}{after}")
+        return True
+    
+    print("🧠 COMPREHENSIVE CNS UPDATE STARTING...")
+    print("=" * 60)
+    print()
+    
+    graph = TaskGraph(tasks, os.path.join(get_cns_path(), "cns"), get_update_state_path())
+    numbers = {task.name: i for i, task in enumerate(tasks, 1)}
+    try:
+        outcomes = graph.run(only=parse_task_names(args.only), skip=parse_task_names(args.skip),
+                             jobs=args.jobs, force=args.force,
+                             budgets=budgets, default_budget=default_budget,
+                             on_start=lambda task: print_phase_header(numbers[task.name], task),
+                             on_complete=lambda task, outcome: print_phase(numbers[task.name], task, outcome))
+    except TaskGraphError as e:
+        print(f"❌ {e}")
+        print(f"   Phases: {', '.join(task.name for task in tasks)}")
+        return False
+    
+    # Final summary
+    end_time = datetime.now()
+    duration = end_time - start_time
+    all_modifications = collect_phase_results(outcomes)[0]
+    
+    print("🎯 CNS UPDATE SUMMARY")
+    print("=" * 60)
+    
+    success_count = sum(1 for outcome in outcomes.values() if phase_succeeded(outcome))
+    total_phases = len(outcomes)
+    
+    for i, outcome in enumerate(outcomes.values(), 1):
+        status = "✅" if phase_succeeded(outcome) else "❌"
+        print(f"{i}. {status} {phase_label(outcome)}")
+    
+    print()
+    print(f"📊 Success Rate: {success_count}/{total_phases} phases completed")
+    print(f"⏱️  Duration: {duration.total_seconds():.1f} seconds "
+          f"(critical path {critical_path_seconds(tasks, outcomes):.1f}s, "
+          f"phases total {sum(outcome.duration for outcome in outcomes.values()):.1f}s)")
+    
+    metrics_path = export_run_metrics(tasks, outcomes, duration.total_seconds(), args.metrics_dir)
+    if metrics_path:
+        print(f"📈 Metrics: {metrics_path}")
+    
+    if all_modifications:
+        print(f"📝 Files Modified: {len(all_modifications)}")
+        for i, mod in enumerate(all_modifications, 1):
+            print(f"   {i}. {mod}")
+    
     # Print maintenance summary
     if success_count == total_phases:
         print("🎉 All CNS systems updated successfully!")
     else:
-        failed_phases = [phase for phase, success in results.items() if not success]
+        failed_phases = [name for name, outcome in outcomes.items() if not phase_succeeded(outcome)]
         print(f"⚠️  Some phases failed: {', '.join(failed_phases)}")
+    partial_phases = [name for name, outcome in outcomes.items() if outcome.status == 'partial']
+    if partial_phases:
+        print(f"⏳ Stopped at their time budget (partial results kept, next run resumes): {', '.join(partial_phases)}")
     
     return success_count == total_phases
 
 if __name__ == "__main__":
     success = main()
-    sys.exit(0 if success else 1)
\ No newline at end of file
+    sys.exit(0 if success else 1)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Directory Statistics Test
+Checks that cached memory-directory statistics stay equal to a fresh scan through
+tracked writes, and are invalidated by untracked changes and by writers that died
+without cleaning up. Run with: python3 tests/test_dirstats.py
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import unittest
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cns'))
+
+from cnslib.dirstats import WRITER_TIMEOUT, DirectoryStats, scan_directory
+
+def learning_text(workspace):
+    return f"# Critical Learning Captured\n**Timestamp**: 2026-01-02 10:10:10\n**Workspace**: {workspace}\n\nBody\n"
+
+class DirectoryStatsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.stats = DirectoryStats(self.root)
+        self.episodic = self.stats.directory('episodic')
+        os.makedirs(self.episodic)
+        for day in range(1, 4):
+            self.write(f"learning-2026-01-0{day}-101010-000000-aaaa.md", 'alpha')
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write(self, filename, workspace='beta'):
+        path = os.path.join(self.episodic, filename)
+        with open(path, 'w') as f:
+            f.write(learning_text(workspace))
+        return path
+
+    def assert_matches_scan(self, snapshot):
+        scanned = scan_directory('episodic', self.episodic)
+        self.assertEqual((snapshot.count, snapshot.bytes), (scanned['count'], scanned['bytes']))
+        self.assertEqual(snapshot.groups, scanned['groups'])
+
+    def record(self):
+        with open(self.stats.path) as f:
+            return json.load(f)['directories'].get('episodic')
+
+    def test_first_read_scans_then_caches(self):
+        first = self.stats.get('episodic')
+        self.assertFalse(first.cached)
+        self.assertEqual(first.count, 3)
+        second = self.stats.get('episodic')
+        self.assertTrue(second.cached)
+        self.assert_matches_scan(second)
+
+    def test_tracked_changes_keep_the_record_current(self):
+        self.stats.get('episodic')
+        with self.stats.tracking('episodic') as changes:
+            changes.added(self.write("learning-2026-01-05-101010-000000-bbbb.md"))
+            removed = os.path.join(self.episodic, "learning-2026-01-01-101010-000000-aaaa.md")
+            entry = changes.entry(removed)
+            os.remove(removed)
+            changes.removed(entry)
+        snapshot = self.stats.get('episodic')
+        self.assertTrue(snapshot.cached)
+        self.assertEqual(snapshot.count, 3)
+        self.assert_matches_scan(snapshot)
+
+    def test_untracked_file_outside_a_writer_forces_a_rescan(self):
+        self.stats.get('episodic')
+        self.write("learning-2026-01-06-101010-000000-cccc.md")
+        snapshot = self.stats.get('episodic')
+        self.assertFalse(snapshot.cached)
+        self.assertEqual(snapshot.count, 4)
+
+    def test_untracked_file_during_a_writer_is_not_absorbed(self):
+        self.stats.get('episodic')
+        with self.stats.tracking('episodic') as changes:
+            changes.added(self.write("learning-2026-01-05-101010-000000-bbbb.md"))
+            self.write("learning-2026-01-06-101010-000000-cccc.md")  # Nobody tracks this one
+        self.assertIsNone(self.record())
+        snapshot = self.stats.get('episodic')
+        self.assertFalse(snapshot.cached)
+        self.assertEqual(snapshot.count, 5)
+
+    def test_untracked_file_between_tracked_changes_is_not_absorbed(self):
+        self.stats.get('episodic')
+        with self.stats.tracking('episodic') as changes:
+            self.write("learning-2026-01-06-101010-000000-cccc.md")  # Nobody tracks this one
+            changes.added(self.write("learning-2026-01-05-101010-000000-bbbb.md"))
+        self.assertEqual(self.stats.get('episodic').count, 5)
+
+    def test_failed_block_drops_the_record(self):
+        self.stats.get('episodic')
+        with self.assertRaises(RuntimeError):
+            with self.stats.tracking('episodic'):
+                raise RuntimeError("interrupted")
+        self.assertIsNone(self.record())
+
+    def register_writer(self, writer):
+        self.stats.get('episodic')
+        with open(self.stats.path) as f:
+            data = json.load(f)
+        data['directories']['episodic']['writers'] = {'gone': writer}
+        with open(self.stats.path, 'w') as f:
+            json.dump(data, f)
+
+    def test_killed_writer_expires_by_pid(self):
+        process = subprocess.Popen([sys.executable, '-c', 'pass'])
+        process.wait()
+        self.register_writer({'pid': process.pid, 'since': time.time()})
+        self.assertFalse(self.stats.get('episodic').cached)
+        self.assertEqual(self.record().get('writers', {}), {})
+        self.assertTrue(self.stats.get('episodic').cached)
+
+    def test_stuck_writer_expires_by_age(self):
+        self.register_writer({'pid': os.getpid(), 'since': time.time() - WRITER_TIMEOUT - 1})
+        with self.stats.tracking('episodic') as changes:
+            changes.added(self.write("learning-2026-01-05-101010-000000-bbbb.md"))
+        snapshot = self.stats.get('episodic')
+        self.assertEqual(snapshot.count, 4)
+        self.assert_matches_scan(snapshot)
+        self.assertTrue(self.stats.get('episodic').cached)
+
+    def test_append_to_newest_file_is_picked_up_without_a_rescan(self):
+        self.stats.get('episodic')
+        with open(os.path.join(self.episodic, "learning-2026-01-03-101010-000000-aaaa.md"), 'a') as f:
+            f.write("More detail appended\n")
+        snapshot = self.stats.get('episodic')
+        self.assertTrue(snapshot.cached)
+        self.assert_matches_scan(snapshot)
+
+if __name__ == '__main__':
+    unittest.main()
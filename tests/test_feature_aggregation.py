@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Feature Store Aggregation Test
+Checks that the analyses aggregating feature-store columns (user pattern
+consolidation, principle candidate gating) give the same results as the
+per-learning scans they replaced. Run with: python3 tests/test_feature_aggregation.py
+"""
+
+import os
+import sys
+import random
+import shutil
+import tempfile
+import unittest
+import importlib.util
+from datetime import datetime, timedelta
+
+CNS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cns')
+sys.path.insert(0, CNS_DIR)
+
+from cnslib.features import FeatureTable
+
+def load_script(name, filename):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(CNS_DIR, 'brain', filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+user_pattern_learner = load_script('user_pattern_learner', 'user-pattern-learner.py')
+principle_evaluator = load_script('principle_evaluator', 'principle-evaluator.py')
+
+class FeatureAggregationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.store = tempfile.mkdtemp()
+        self.random = random.Random(7)
+
+    def tearDown(self):
+        shutil.rmtree(self.store)
+
+    def test_behavior_columns_consolidate_like_per_learning_patterns(self):
+        columns = user_pattern_learner.VOCABULARY.behavior_columns
+        table = FeatureTable(self.store, 'behavior', columns)
+        names = [f"learning-{i:04d}" for i in range(200)]
+        for i, name in enumerate(names):
+            table.append(name, datetime(2026, 1, 1) + timedelta(hours=i),
+                         [self.random.choice([0, 0, 1, 2, 3, 5, 12]) for _ in columns])
+
+        patterns = []
+        for row, name in enumerate(names):
+            timestamp = datetime.fromtimestamp(table.timestamps[row])
+            patterns.extend(user_pattern_learner.patterns_from_behavior_counts(table.row(name), timestamp))
+        expected = user_pattern_learner.consolidate_patterns(patterns)
+
+        window = names[50:]
+        self.assertEqual(user_pattern_learner.consolidate_behavior_columns(table, table.row_numbers(names)),
+                         expected)
+        self.assertNotEqual(user_pattern_learner.consolidate_behavior_columns(table, table.row_numbers(window)),
+                            [])
+
+    def test_candidates_gated_by_type_counts_match_a_full_scan(self):
+        words = ['workflow', 'process', 'design', 'interface', 'always', 'consistent', 'python', 'review']
+        learnings = []
+        for i in range(40):
+            patterns = [{'type': self.random.choice(['interface', 'process', 'general']),
+                         'insight': ' '.join(self.random.sample(words, 4))}
+                        for _ in range(self.random.randint(0, 3))]
+            learnings.append({'filename': f"learning-{i:04d}.md", 'date': datetime(2026, 1, 1) + timedelta(days=i),
+                              'patterns': patterns})
+        type_counts = {}
+        for learning in learnings:
+            for pattern in learning['patterns']:
+                type_counts[pattern['type']] = type_counts.get(pattern['type'], 0) + 1
+
+        for use_tfidf in (False, True):
+            self.assertEqual(
+                principle_evaluator.detect_new_principle_candidates(learnings, use_tfidf, type_counts),
+                principle_evaluator.detect_new_principle_candidates(learnings, use_tfidf))
+
+if __name__ == '__main__':
+    unittest.main()
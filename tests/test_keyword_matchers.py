@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Keyword Matcher Correctness Test
+Checks the compiled keyword matchers (classify_insight_type, find_principle_references)
+against the reference scans they replaced, on the built-in vocabularies and a custom
+one, without an installed CNS. Run with: python3 tests/test_keyword_matchers.py
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cns'))
+
+from cnslib.insights import (MATCHER_EDGE_CASES, check_keyword_matchers, classify_insight_type,
+                             find_principle_references, scan_insight_type, scan_principle_references)
+from cnslib.vocabulary import Vocabulary, compile_vocabularies
+
+# A keyword shared by two insight types (the first declared wins), nested
+# principle keywords, and a duplicate that compilation drops
+CUSTOM_CONFIG = """{
+  "insight_types": {"review": ["pr", "review"], "process": ["process", "pr"], "general": ["ignored"]},
+  "principle_keywords": ["ci", "precision", "pr", "process", "ci"]
+}"""
+
+class KeywordMatcherTest(unittest.TestCase):
+
+    def setUp(self):
+        vocabularies, warnings = compile_vocabularies(CUSTOM_CONFIG)
+        self.assertEqual(warnings, [])
+        self.custom = Vocabulary(vocabularies, 'custom')
+
+    def test_edge_cases_match_reference_scans(self):
+        self.assertEqual(check_keyword_matchers(MATCHER_EDGE_CASES, MATCHER_EDGE_CASES), [])
+
+    def test_custom_vocabulary_matches_reference_scans(self):
+        self.assertEqual(check_keyword_matchers(MATCHER_EDGE_CASES, MATCHER_EDGE_CASES, self.custom), [])
+
+    def test_insight_type_priority(self):
+        # Declaration order wins when a text matches several types
+        for text, expected in [("Process improvements for the interface", 'interface'),
+                               ("The design of the startup workflow", 'architecture'),
+                               ("Loading memory context", 'startup'),
+                               ("nothing relevant here", 'general')]:
+            self.assertEqual(classify_insight_type(text), expected)
+            self.assertEqual(scan_insight_type(text), expected)
+        self.assertEqual(classify_insight_type("a process review", self.custom), 'review')
+
+    def test_overlapping_keywords(self):
+        # Substring semantics: 'pr' matches inside 'process', 'ci' inside 'precision'
+        self.assertEqual(classify_insight_type("reprocessing"), 'process')
+        self.assertEqual(find_principle_references("the process changed"), ['pr'])
+        self.assertEqual(find_principle_references("Precision merge of the CI changelog"),
+                         ['ci', 'pr', 'merge', 'changelog'])
+
+    def test_references_keep_vocabulary_order(self):
+        text = "Self-Evaluation: the PR process changed; change hygiene and commit hygiene"
+        self.assertEqual(find_principle_references(text), scan_principle_references(text))
+        self.assertEqual(find_principle_references(text), ['pr', 'change hygiene', 'commit', 'self-evaluation'])
+        self.assertEqual(find_principle_references("precision", self.custom),
+                         scan_principle_references("precision", self.custom))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Learning Log Replay Test
+Checks the write-ahead log on its own (torn lines, replay after a failure,
+truncation once drained), then replays a log whose records were applied to
+different points before a crash through process-learning's materializer, and
+checks every learning ends up in episodic and semantic memory exactly once.
+Run with: python3 tests/test_learning_log.py
+"""
+
+import io
+import os
+import sys
+import glob
+import shutil
+import tempfile
+import unittest
+import importlib.util
+from contextlib import redirect_stdout
+
+CNS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cns')
+sys.path.insert(0, CNS_DIR)
+
+from cnslib.semantic import RECORD_MARKER, SemanticMemory, format_entry
+from cnslib.wal import LearningLog, new_learning_record
+
+def load_process_learning():
+    spec = importlib.util.spec_from_file_location('process_learning', os.path.join(CNS_DIR, 'process-learning.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+process_learning = load_process_learning()
+
+class LearningLogTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.log = LearningLog(self.root)
+        self.records = [new_learning_record(f"Learning {i}", 'demo') for i in range(3)]
+        for record in self.records:
+            self.log.append(record)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_torn_last_line_is_skipped_and_later_appends_survive(self):
+        with open(self.log.path, 'a') as f:
+            f.write('{"id": "torn", "timest')  # Crash mid-append
+        later = new_learning_record("Logged after the crash", 'demo')
+        self.log.append(later)
+        self.assertEqual(self.log.pending(), self.records + [later])
+
+    def test_replay_after_a_failure_resumes_with_the_failed_record(self):
+        applied = []
+
+        def failing(record):
+            if record == self.records[1]:
+                raise OSError("disk full")
+            applied.append(record)
+
+        with self.assertRaises(OSError):
+            self.log.replay(failing)
+        self.assertEqual(self.log.pending(), self.records[1:])
+        self.assertEqual(self.log.replay(applied.append), 2)
+        self.assertEqual(applied, self.records)
+
+    def test_truncated_only_once_drained(self):
+        self.log.mark_done(self.records[0].id)
+        self.log.truncate_if_drained()
+        self.assertEqual(len(self.log.records()), 3)
+
+        self.assertEqual(self.log.replay(lambda record: None), 2)
+        self.assertEqual(self.log.records(), [])
+        self.assertEqual(self.log.done_ids(), set())
+        self.assertEqual(os.path.getsize(self.log.path), 0)
+
+        # The emptied log takes new records as before
+        record = new_learning_record("After truncation", 'demo')
+        self.log.append(record)
+        self.assertEqual(self.log.pending(), [record])
+
+class LearningLogReplayTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.cns_dir = os.path.join(self.root, 'cns')
+        self.memory_dir = os.path.join(self.cns_dir, 'memory')
+        os.makedirs(self.memory_dir)
+        self.log = LearningLog(self.memory_dir)
+        self.semantic = SemanticMemory(os.path.join(self.memory_dir, 'semantic'))
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def materialize(self, record):
+        with redirect_stdout(io.StringIO()):
+            return process_learning.materialize_learning(self.cns_dir, record, verbose=False)
+
+    def replay(self):
+        with redirect_stdout(io.StringIO()):
+            return process_learning.materialize_pending(self.cns_dir)
+
+    def semantic_text(self):
+        return ''.join(self.semantic.read_segment(month) for month in self.semantic.segments())
+
+    def assert_materialized_once(self, records):
+        text = self.semantic_text()
+        for record in records:
+            self.assertEqual(text.count(RECORD_MARKER.format(record.id)), 1, record.content)
+            self.assertTrue(os.path.exists(os.path.join(self.memory_dir, 'episodic', f"learning-{record.id}.md")))
+        self.assertEqual(len(glob.glob(os.path.join(self.memory_dir, 'episodic', 'learning-*.md'))), len(records))
+        self.assertEqual(sum(segment['entries'] for segment in self.semantic.segments().values()), len(records))
+
+    def test_replay_of_partially_applied_records(self):
+        records = [new_learning_record(f"Learning {i}: always verify the deployment", 'demo') for i in range(4)]
+        for record in records:
+            self.log.append(record)
+
+        # 0: fully applied; 1: applied, crashed before mark_done
+        self.materialize(records[0])
+        self.log.mark_done(records[0].id)
+        self.materialize(records[1])
+
+        # 2: crashed between the segment append and the manifest save
+        self.semantic.add_entry("earlier entry", records[2].timestamp)
+        path = self.semantic.segment_path(records[2].timestamp[:7])
+        with open(path, 'a') as f:
+            f.write(format_entry(records[2].timestamp, records[2].content, record_id=records[2].id))
+
+        # 3: only logged
+        self.assertEqual(self.replay(), 3)
+        text = self.semantic_text()
+        self.assertEqual(text.count("earlier entry"), 1)
+        for record in records:
+            self.assertEqual(text.count(RECORD_MARKER.format(record.id)), 1, record.content)
+        self.assertEqual(len(glob.glob(os.path.join(self.memory_dir, 'episodic', 'learning-*.md'))), 4)
+        self.assertEqual(sum(segment['entries'] for segment in self.semantic.segments().values()), 5)
+
+        # Drained: the log is emptied and a second replay does nothing
+        self.assertEqual(self.log.records(), [])
+        self.assertEqual(self.replay(), 0)
+
+    def test_inline_capture_racing_background_replay(self):
+        record = new_learning_record("Run the tests before every commit", 'demo')
+        self.log.append(record)
+        self.materialize(record)  # Inline capture, not yet marked done
+        self.assertEqual(self.replay(), 1)  # Background materializer gets the same record
+        self.log.mark_done(record.id)
+        self.assert_materialized_once([record])
+
+    def test_ids_older_than_the_kept_window(self):
+        # A full id window of newer records no longer lists this one
+        record = new_learning_record("An old learning", 'demo')
+        self.materialize(record)
+        manifest = self.semantic.load_manifest()
+        manifest['records'] = [f"9999-{i:04d}" for i in range(1000)]
+        self.semantic._save(manifest)
+        self.materialize(record)
+        self.assert_materialized_once([record])
+
+if __name__ == '__main__':
+    unittest.main()
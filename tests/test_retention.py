@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Memory Retention Test
+Checks how retention policies group context files and how many they keep, that
+learning compaction is a dry run until enabled, and that compacted learnings read
+back from their digest and index before the originals are deleted.
+Run with: python3 tests/test_retention.py
+"""
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cns'))
+
+from cnslib.episodic import iter_memory_files
+from cnslib.retention import (ARCHIVE_DIR, ARCHIVE_INDEX, DEFAULT_POLICIES, apply_retention,
+                              compact_into_digests, count_archived_learnings, read_archived_learning,
+                              select_expired)
+
+NOW = datetime(2026, 10, 1, 12, 0, 0)
+
+class RetentionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.memory = os.path.join(self.root, 'cns', 'memory')
+        self.context = os.path.join(self.memory, 'context')
+        self.episodic = os.path.join(self.memory, 'episodic')
+        os.makedirs(self.context)
+        os.makedirs(self.episodic)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write(self, directory, name, text=None):
+        with open(os.path.join(directory, name), 'w') as f:
+            f.write(text if text is not None else f"# {name}\n\nBody of {name}\n")
+
+    def configure(self, config):
+        with open(os.path.join(self.memory, 'retention.json'), 'w') as f:
+            json.dump(config, f)
+
+    def names(self, directory):
+        return sorted(f.name for f in iter_memory_files(directory, exclude_templates=True))
+
+    def write_learnings(self):
+        texts = {}
+        for month, day in ((1, 5), (1, 20), (2, 3)):
+            name = f"learning-2026-0{month}-{day:02d}-101010.md"
+            texts[name] = f"# Critical Learning Captured\n**Timestamp**: 2026-0{month}-{day:02d}\n\nLearning {month}/{day}\n"
+            self.write(self.episodic, name, texts[name])
+        self.write(self.episodic, "learning-2026-09-30-101010.md")  # Inside the window
+        return texts
+
+    def test_context_files_grouped_by_name_and_workspace(self):
+        for day in range(1, 6):
+            self.write(self.context, f"feature-x-2026-09-0{day}-101010.md")
+            self.write(self.context, f"context-2026-09-0{day}-101010-my-repo.md")
+        self.write(self.context, "notes.md")  # Not a context snapshot: never touched
+        expired = select_expired(DEFAULT_POLICIES['contexts'], list(iter_memory_files(self.context)), NOW)
+        self.assertEqual(sorted(f.name for f in expired),
+                         sorted([f"feature-x-2026-09-0{day}-101010.md" for day in (1, 2)] +
+                                [f"context-2026-09-0{day}-101010-my-repo.md" for day in (1, 2)]))
+
+    def test_keeps_the_newest_per_group_with_overrides(self):
+        for day in range(1, 6):
+            self.write(self.context, f"feature-x-2026-09-0{day}-101010.md")
+            self.write(self.context, f"feature-y-2026-09-0{day}-101010.md")
+        self.configure({'contexts': {'group_overrides': {'feature-y': {'keep_per_group': 4}}}})
+        [report] = apply_retention(self.root, ['contexts'], now=NOW)
+        self.assertEqual(len(report.deleted), 3)
+        self.assertEqual(self.names(self.context),
+                         [f"feature-x-2026-09-0{day}-101010.md" for day in (3, 4, 5)] +
+                         [f"feature-y-2026-09-0{day}-101010.md" for day in (2, 3, 4, 5)])
+
+    def test_learning_compaction_is_a_dry_run_by_default(self):
+        self.write_learnings()
+        before = self.names(self.episodic)
+        [report] = apply_retention(self.root, ['learnings'], now=NOW)
+        self.assertTrue(report.dry_run)
+        self.assertEqual(len(report.expired), 3)
+        self.assertEqual(report.compacted, 0)
+        self.assertEqual(self.names(self.episodic), before)
+        self.assertFalse(os.path.exists(os.path.join(self.episodic, ARCHIVE_DIR)))
+
+    def test_compacted_learnings_round_trip_through_digest_and_index(self):
+        texts = self.write_learnings()
+        self.configure({'learnings': {'enabled': True}})
+        [report] = apply_retention(self.root, ['learnings'], now=NOW)
+        self.assertFalse(report.dry_run)
+        self.assertEqual(report.compacted, 3)
+        self.assertEqual(report.digests, ['digest-2026-01.md', 'digest-2026-02.md'])
+        self.assertEqual(self.names(self.episodic), ["learning-2026-09-30-101010.md"])
+        self.assertEqual(count_archived_learnings(self.episodic), 3)
+
+        with open(os.path.join(self.episodic, ARCHIVE_DIR, ARCHIVE_INDEX)) as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(sorted(record['name'] for record in records), sorted(texts))
+        for record in records:
+            self.assertEqual(read_archived_learning(self.episodic, record), texts[record['name']].rstrip('\n'))
+            self.assertEqual(record['title'], 'Critical Learning Captured')
+
+    def test_rerun_skips_indexed_files_and_keeps_altered_ones(self):
+        self.write_learnings()
+        files = [f for f in iter_memory_files(self.episodic, prefix='learning-') if f.timestamp.month < 9]
+        compact_into_digests(self.episodic, files[:1])
+        self.write(self.episodic, files[0].name, "Rewritten after it was archived\n")
+        compacted, _ = compact_into_digests(self.episodic, files)
+        self.assertEqual(compacted, 2)  # Indexed already, but no longer matching its digest section
+        self.assertEqual(count_archived_learnings(self.episodic), 3)
+        self.assertTrue(os.path.exists(files[0].path))
+
+if __name__ == '__main__':
+    unittest.main()
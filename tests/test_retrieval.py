@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Memory Retrieval Index Test
+Checks that sync_index brings the BM25 index in line with episodic and semantic
+memory (new, deleted and compacted learnings), and that queries rank, filter by
+workspace and list recent learnings as expected.
+Run with: python3 tests/test_retrieval.py
+"""
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cns'))
+
+from cnslib.retention import ARCHIVE_DIR, ARCHIVE_INDEX
+from cnslib.retrieval import RetrievalIndex, get_index_path, sync_index
+from cnslib.semantic import SemanticMemory
+
+LEARNINGS = {
+    'learning-2026-03-01-101010.md': ('alpha', "Pin the terraform provider version before every plan"),
+    'learning-2026-03-02-101010.md': ('beta', "Rotate deployment secrets after an incident"),
+    'learning-2026-03-03-101010.md': ('alpha', "Write the changelog entry with the commit"),
+}
+
+class RetrievalIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.episodic = os.path.join(self.root, 'cns', 'memory', 'episodic')
+        os.makedirs(self.episodic)
+        for name, (workspace, summary) in LEARNINGS.items():
+            self.write_learning(name, workspace, summary)
+        self.index = RetrievalIndex(get_index_path(self.root))
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.root)
+
+    def write_learning(self, name, workspace, summary):
+        with open(os.path.join(self.episodic, name), 'w') as f:
+            f.write(f"# Critical Learning Captured\n**Workspace**: {workspace}\n\n## Summary\n{summary}\n")
+
+    def test_sync_indexes_new_learnings_once(self):
+        self.assertEqual(sync_index(self.root, self.index), (3, 0))
+        self.assertEqual(sync_index(self.root, self.index), (0, 0))
+        self.write_learning('learning-2026-03-04-101010.md', 'beta', "Review the terraform plan output")
+        self.assertEqual(sync_index(self.root, self.index), (1, 0))
+        self.assertEqual(len(self.index), 4)
+
+    def test_query_ranks_and_filters_by_workspace(self):
+        sync_index(self.root, self.index)
+        [best] = self.index.query("terraform provider", k=1)
+        self.assertEqual(best.doc_id, 'learning-2026-03-01-101010.md')
+        self.assertEqual(best.summary, LEARNINGS[best.doc_id][1])
+        self.assertEqual([hit.doc_id for hit in self.index.query("secrets", workspace='alpha')], [])
+        self.assertEqual([hit.doc_id for hit in self.index.query("secrets", workspace='beta')],
+                         ['learning-2026-03-02-101010.md'])
+        self.assertEqual(self.index.query("the with"), [])  # Stopwords only
+
+    def test_recent_lists_newest_first(self):
+        sync_index(self.root, self.index)
+        self.assertEqual([hit.doc_id for hit in self.index.recent(2, source='episodic', workspace='alpha')],
+                         ['learning-2026-03-03-101010.md', 'learning-2026-03-01-101010.md'])
+
+    def test_deleted_learnings_are_dropped_and_compacted_ones_repointed(self):
+        sync_index(self.root, self.index)
+        os.remove(os.path.join(self.episodic, 'learning-2026-03-02-101010.md'))
+
+        compacted = 'learning-2026-03-01-101010.md'
+        os.makedirs(os.path.join(self.episodic, ARCHIVE_DIR))
+        with open(os.path.join(self.episodic, ARCHIVE_DIR, ARCHIVE_INDEX), 'w') as f:
+            f.write(json.dumps({'name': compacted, 'digest': 'digest-2026-03.md', 'offset': 0, 'length': 1}) + '\n')
+        os.remove(os.path.join(self.episodic, compacted))
+
+        self.assertEqual(sync_index(self.root, self.index), (0, 1))
+        [hit] = self.index.query("terraform")
+        self.assertEqual(hit.doc_id, compacted)
+        self.assertEqual(hit.path, os.path.join(self.episodic, ARCHIVE_DIR, 'digest-2026-03.md'))
+
+    def test_semantic_entries_are_indexed(self):
+        semantic = SemanticMemory(os.path.join(self.root, 'cns', 'memory', 'semantic'))
+        semantic.add_entry("Keep database migrations reversible", '2026-03-05 10:10:10')
+        sync_index(self.root, self.index)
+        [hit] = self.index.query("reversible migrations", source='semantic')
+        self.assertEqual(hit.doc_id, 'semantic:best-practices:2026-03-05 10:10:10')
+        sync_index(self.root, self.index)
+        self.assertEqual(len(self.index.doc_ids('semantic')), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Shared File Storage Test
+Checks that per-file locks exclude other writers, that versioned writes refuse to
+overwrite a concurrent change, and that update_file re-applies its transform until
+it wins, so concurrent read-modify-write cycles lose nothing.
+Run with: python3 tests/test_storage.py
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+import subprocess
+
+CNS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cns')
+sys.path.insert(0, CNS_DIR)
+
+from cnslib.storage import VersionConflict, locked, read_versioned, update_file, write_atomic
+
+# Each process adds 1 to the counter file INCREMENTS times
+INCREMENT_SCRIPT = """
+import sys
+sys.path.insert(0, sys.argv[1])
+from cnslib.storage import update_file
+for _ in range(int(sys.argv[3])):
+    update_file(sys.argv[2], lambda text: str(int(text or '0') + 1), retries=1000)
+"""
+
+class StorageTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.path = os.path.join(self.root, 'shared.md')
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_versioned_write_refuses_a_concurrent_change(self):
+        write_atomic(self.path, 'first')
+        text, version = read_versioned(self.path)
+        self.assertEqual(text, 'first')
+        write_atomic(self.path, 'someone else')
+        with self.assertRaises(VersionConflict):
+            write_atomic(self.path, 'mine', version)
+        self.assertEqual(read_versioned(self.path)[0], 'someone else')
+
+    def test_expecting_no_file_refuses_an_existing_one(self):
+        write_atomic(self.path, 'created meanwhile')
+        with self.assertRaises(VersionConflict):
+            write_atomic(self.path, 'mine', None)
+
+    def test_update_reapplies_transform_after_a_conflict(self):
+        write_atomic(self.path, 'a')
+        seen = []
+
+        def transform(text):
+            seen.append(text)
+            if len(seen) == 1:
+                write_atomic(self.path, text + 'b')  # Another writer gets in first
+            return text + 'c'
+
+        self.assertEqual(update_file(self.path, transform), 'abc')
+        self.assertEqual(seen, ['a', 'ab'])
+        self.assertEqual(read_versioned(self.path)[0], 'abc')
+
+    def test_update_gives_up_when_the_file_keeps_changing(self):
+        write_atomic(self.path, '0')
+
+        def transform(text):
+            write_atomic(self.path, text + '!')
+            return 'never written'
+
+        with self.assertRaises(VersionConflict):
+            update_file(self.path, transform, retries=3)
+        self.assertEqual(read_versioned(self.path)[0], '0!!!')
+
+    def test_update_returning_none_leaves_the_file_alone(self):
+        self.assertIsNone(update_file(self.path, lambda text: None))
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_lock_excludes_other_threads_and_is_reentrant(self):
+        order = []
+        holding = threading.Event()
+
+        def holder():
+            with locked(self.path):
+                with locked(self.path):  # Nested on the same path: no deadlock
+                    holding.set()
+                    time.sleep(0.2)
+                    order.append('holder done')
+
+        thread = threading.Thread(target=holder)
+        thread.start()
+        holding.wait()
+        with locked(self.path):
+            order.append('waiter in')
+        thread.join()
+        self.assertEqual(order, ['holder done', 'waiter in'])
+
+    def test_concurrent_processes_lose_no_updates(self):
+        processes, increments = 4, 25
+        workers = [subprocess.Popen([sys.executable, '-c', INCREMENT_SCRIPT, CNS_DIR, self.path, str(increments)])
+                   for _ in range(processes)]
+        for worker in workers:
+            self.assertEqual(worker.wait(), 0)
+        self.assertEqual(read_versioned(self.path)[0], str(processes * increments))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Maintenance Task Graph Test
+Checks that tasks run after their dependencies, that unchanged tasks are skipped
+by input fingerprint (and re-run when an input changes, when forced, or when
+they did not finish), and that cancelling a run stops it from starting more tasks.
+Run with: python3 tests/test_taskgraph.py
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+from collections import namedtuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cns'))
+
+from cnslib.taskgraph import Task, TaskGraph, TaskGraphError, select_tasks, topological_order
+
+Result = namedtuple('Result', ['success', 'partial'])
+
+class TaskGraphTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.state_path = os.path.join(self.root, 'state.json')
+        os.makedirs(os.path.join(self.root, 'memory', 'episodic'))
+        self.ran = []
+        self.lock = threading.Lock()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def task(self, name, deps=(), result=True, **fields):
+        def run(upstream, budget):
+            with self.lock:
+                self.ran.append(name)
+            return result
+        return Task(name, name.title(), run, deps, **fields)
+
+    def graph(self, tasks):
+        return TaskGraph(tasks, self.root, self.state_path)
+
+    def statuses(self, outcomes):
+        return {name: outcome.status for name, outcome in outcomes.items()}
+
+    def test_dependencies_run_first_and_see_upstream_outcomes(self):
+        seen = {}
+
+        def report(upstream, budget):
+            seen.update({name: outcome.status for name, outcome in upstream.items()})
+            return True
+
+        tasks = [Task('report', 'Report', report, ('evaluate', 'learn')),
+                 self.task('evaluate', ('materialize',)),
+                 self.task('learn', ('materialize',)),
+                 self.task('materialize')]
+        self.assertEqual(topological_order(tasks), ['materialize', 'evaluate', 'learn', 'report'])
+        self.graph(tasks).run(jobs=4)
+        self.assertEqual(self.ran[0], 'materialize')
+        self.assertEqual(sorted(self.ran[1:]), ['evaluate', 'learn'])
+        self.assertEqual(seen, {'evaluate': 'success', 'learn': 'success'})
+
+    def test_malformed_graphs_are_rejected(self):
+        with self.assertRaises(TaskGraphError):
+            TaskGraph([self.task('a', ('b',)), self.task('b', ('a',))], self.root)
+        with self.assertRaises(TaskGraphError):
+            TaskGraph([self.task('a', ('missing',))], self.root)
+        with self.assertRaises(TaskGraphError):
+            TaskGraph([self.task('a', inputs=('memory',), outputs=('memory/features',))], self.root)
+        with self.assertRaises(TaskGraphError):
+            select_tasks([self.task('a')], only=['nope'])
+
+    def test_unchanged_inputs_are_skipped_until_one_changes(self):
+        tasks = [self.task('evaluate', inputs=('memory/episodic',)), self.task('report', always=True)]
+        self.graph(tasks).run()
+        self.assertEqual(self.statuses(self.graph(tasks).run()), {'evaluate': 'up_to_date', 'report': 'success'})
+
+        time.sleep(0.01)  # Coarse directory mtimes
+        with open(os.path.join(self.root, 'memory', 'episodic', 'learning-new.md'), 'w') as f:
+            f.write("# New\n")
+        self.assertEqual(self.statuses(self.graph(tasks).run())['evaluate'], 'success')
+        self.assertEqual(self.statuses(self.graph(tasks).run(force=True))['evaluate'], 'success')
+        self.assertEqual(self.ran.count('evaluate'), 3)
+
+    def test_failed_partial_and_stale_tasks_run_again(self):
+        tasks = [self.task('failing', result=False, inputs=('memory',)),
+                 self.task('partial', result=Result(True, True), inputs=('memory',)),
+                 self.task('daily', inputs=('memory',), max_age_hours=0)]
+        self.graph(tasks).run()
+        self.assertEqual(self.statuses(self.graph(tasks).run()),
+                         {'failing': 'failed', 'partial': 'partial', 'daily': 'success'})
+
+    def test_only_and_skip_treat_left_out_dependencies_as_satisfied(self):
+        tasks = [self.task('materialize'), self.task('evaluate', ('materialize',)), self.task('report', ('evaluate',))]
+        outcomes = self.graph(tasks).run(skip=['materialize'])
+        self.assertEqual(list(outcomes), ['evaluate', 'report'])
+        self.assertEqual(self.ran, ['evaluate', 'report'])
+
+    def test_cancel_stops_starting_tasks_and_cancels_running_budgets(self):
+        started = threading.Event()
+        budgets = {}
+
+        def long_running(upstream, budget):
+            budgets['long'] = budget
+            started.set()
+            while not budget.expired():
+                time.sleep(0.01)
+            return Result(True, True)
+
+        def cancelling(upstream, budget):
+            started.wait()
+            graph.cancel()
+            return True
+
+        graph = self.graph([Task('long', 'Long', long_running), Task('first', 'First', cancelling),
+                            self.task('later', ('first',))])
+        outcomes = graph.run(jobs=2)
+        self.assertEqual(self.statuses(outcomes), {'long': 'partial', 'first': 'success', 'later': 'cancelled'})
+        self.assertTrue(budgets['long'].cancelled)
+        self.assertNotIn('later', self.ran)
+
+if __name__ == '__main__':
+    unittest.main()